@@ -5,11 +5,32 @@ import os
 import sys
 import sqlite3
 import json
+import time
+import zipfile
 import logging
+import functools
+from contextlib import contextmanager
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-from pdf_processor import extract_questions_from_pdf
+from flask import (
+    Flask, render_template, request, jsonify, redirect, url_for, flash, g, session, Response, make_response,
+    send_from_directory, abort
+)
+from pdf_processor import configure_logging
+from metrics import observe_request, render_metrics
+from upload_stream import StreamingUploadRequest, InvalidUploadError
+from ingest import init_ingest_columns
+from batch_upload import init_batch_tables, expand_zip, start_batch, get_batch_progress, recover_orphaned_items
+from question_bank import SnapshotLoader, DatabaseQuestionBank
+from question_stats import init_count_tables, init_bank_version
+from exam_browse import init_exam_index, list_exam_years
+from http_cache import template_fingerprint, make_etag, not_modified, cacheable, no_store, compress_response
+from assets import ASSET_BUILD_DIR, ASSET_MAX_AGE, PRECOMPRESS_EXTENSIONS, get_manifest, manifest_version
+from werkzeug.exceptions import RequestEntityTooLarge
+from mock_exam import (
+    MOCK_EXAM_COMPOSITION, init_mock_exam_table, create_mock_exam,
+    get_mock_exam, get_mock_exam_page, save_mock_exam_answers, grade_mock_exam
+)
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -23,10 +44,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# PDF処理のログ（ファイル書き込みは別スレッド、レベルは環境変数で変更可能）
+configure_logging(level=getattr(logging, os.environ.get('PDF_LOG_LEVEL', 'INFO').upper(), logging.INFO))
+
 app = Flask(__name__)
-app.secret_key = 'your-secret-key-here'
+# アップロードされたファイルはチャンク単位で uploads/ に直接書き込む
+app.request_class = StreamingUploadRequest
+app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# アップロードサイズの上限（MB、環境変数 MAX_UPLOAD_MB で変更可能）
+app.config['MAX_UPLOAD_MB'] = int(os.environ.get('MAX_UPLOAD_MB', 512))
+app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_MB'] * 1024 * 1024
+# データベースファイル（環境変数 TAKKEN_DB で合成データのDBなどに切り替え可能）
+app.config['DATABASE'] = os.environ.get('TAKKEN_DB', 'takken_exam.db')
+# 問題バンクのスナップショットの保存先（設定すると出題・閲覧のページ（/・/question・/exam・/files）は
+# SQLiteを使わずスナップショットから表示する。データベースがなければ作成しない）
+app.config['QUESTION_SNAPSHOT_DIR'] = os.environ.get('QUESTION_SNAPSHOT_DIR')
+question_snapshots = SnapshotLoader(app.config['QUESTION_SNAPSHOT_DIR']) if app.config['QUESTION_SNAPSHOT_DIR'] else None
+# 静的ファイルをブラウザがキャッシュする秒数（環境変数 STATIC_MAX_AGE で変更可能）
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = int(os.environ.get('STATIC_MAX_AGE', 3600))
+
+# テンプレートの内容のハッシュ（テンプレートを変更するとページのETagも変わる）
+TEMPLATE_FINGERPRINT = template_fingerprint(os.path.join(app.root_path, app.template_folder))
 
 # 問題のジャンル定義
 GENRES = {
@@ -37,11 +76,25 @@ GENRES = {
     'random': 'ランダム'
 }
 
-def init_db():
-    """データベースの初期化"""
-    conn = sqlite3.connect('takken_exam.db')
+def init_db(db_path=None):
+    """
+    データベースの初期化
+    
+    複数のワーカープロセスから同時に呼び出されても安全なように、書き込みロックを
+    取得してからテーブル作成・列追加を行います
+    
+    Args:
+        db_path: データベースファイルのパス（省略時は app.config['DATABASE']）
+    """
+    conn = sqlite3.connect(db_path or app.config['DATABASE'], timeout=30)
     cursor = conn.cursor()
     
+    # 複数ワーカーの読み込みと取り込みの書き込みを並行できるようにWALモードにする（設定はDBファイルに保存される）
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
+    # 他のワーカーの初期化が終わるまで待つ
+    cursor.execute('BEGIN IMMEDIATE')
+    
     # PDFファイル管理テーブル
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS pdf_files (
@@ -49,7 +102,11 @@ def init_db():
             filename TEXT NOT NULL,
             original_name TEXT NOT NULL,
             upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            file_path TEXT NOT NULL
+            file_path TEXT NOT NULL,
+            content_hash TEXT,
+            extractor_version TEXT,
+            extractor_options TEXT,
+            extracted_hash TEXT
         )
     ''')
     
@@ -68,21 +125,36 @@ def init_db():
         )
     ''')
     
+    cursor.execute('PRAGMA table_info(questions)')
+    columns = {row[1] for row in cursor.fetchall()}
+    
     # 既存のテーブルにoptions列が存在しない場合は追加
-    try:
+    if 'options' not in columns:
         cursor.execute('ALTER TABLE questions ADD COLUMN options TEXT')
         logger.info('options列を追加しました')
-    except sqlite3.OperationalError:
-        # 列が既に存在する場合は無視
-        pass
     
     # 既存のテーブルにyear列が存在しない場合は追加
-    try:
+    if 'year' not in columns:
         cursor.execute('ALTER TABLE questions ADD COLUMN year TEXT')
         logger.info('year列を追加しました')
-    except sqlite3.OperationalError:
-        # 列が既に存在する場合は無視
-        pass
+    
+    # 既存のテーブルにハッシュと抽出時の情報（抽出処理のバージョン・設定）の列が存在しない場合は追加
+    init_ingest_columns(cursor)
+    
+    # PDF別・ジャンル別・年度別の問題数の集計テーブル（問題の変更時にトリガーで更新）
+    init_count_tables(cursor)
+    
+    # 問題バンクのバージョン（問題・PDFの変更時にトリガーで更新、ページのETagに使用）
+    init_bank_version(cursor)
+    
+    # 年度別の閲覧用の索引
+    init_exam_index(cursor)
+    
+    # 模擬試験テーブル
+    init_mock_exam_table(cursor)
+    
+    # 一括アップロードの進捗管理テーブル
+    init_batch_tables(cursor)
     
     conn.commit()
     conn.close()
@@ -91,7 +163,7 @@ def allowed_file(filename):
     """アップロード可能なファイル形式をチェック"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'pdf'
 
-# PDF処理は pdf_processor.py の extract_questions_from_pdf 関数を使用
+# PDF処理は batch_upload.py のワーカープールで pdf_processor.py の extract_questions_from_pdf 関数を使用
 
 def classify_question_genre(question_text):
     """問題文からジャンルを分類"""
@@ -104,12 +176,138 @@ def classify_question_genre(question_text):
     else:
         return 'others'
 
+@app.before_request
+def start_request_timer():
+    """リクエストの応答時間計測を開始"""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """リクエストの応答時間を記録"""
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint != 'metrics':
+        observe_request(request.endpoint or 'unknown', request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+@app.after_request
+def compress(response):
+    """Accept-Encodingに応じてレスポンスをbrotli / gzipで圧縮"""
+    return compress_response(response)
+
+def database_available():
+    """データベースを使えるか（スナップショットのみを置いた読み取り専用のサーバーではFalse）"""
+    return question_snapshots is None or os.path.exists(app.config['DATABASE'])
+
+def requires_database(view):
+    """データベースに書き込む画面（アップロード・模擬試験）を読み取り専用のサーバーでは表示しない"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not database_available():
+            flash('このサーバーは出題専用のため、この機能は利用できません')
+            return redirect(url_for('index'))
+        return view(*args, **kwargs)
+    return wrapper
+
+def current_snapshot():
+    """
+    スナップショットから表示する設定の場合は現在のスナップショット（設定していない場合はNone）
+    
+    スナップショットがまだ作成されていない場合は、データベースを読まずに503を返します
+    """
+    if question_snapshots is None:
+        return None
+    snapshot = question_snapshots.current()
+    if snapshot is None:
+        abort(503, description='問題バンクのスナップショットがまだ作成されていません')
+    return snapshot
+
+@contextmanager
+def open_question_bank():
+    """出題・閲覧のページが読む問題バンク（スナップショット、またはデータベース）"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        yield snapshot
+        return
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        yield DatabaseQuestionBank(conn.cursor())
+    finally:
+        conn.close()
+
+def page_etag(bank, *parts):
+    """
+    問題バンクのバージョンとURLから作成したページのETag
+    
+    表示待ちのメッセージ（flash）がある場合は、メッセージを含むページをキャッシュさせないためNone
+    """
+    if '_flashes' in session:
+        return None
+    return make_etag(
+        TEMPLATE_FINGERPRINT, manifest_version(), request.full_path, type(bank).__name__, bank.version, *parts
+    )
+
+@app.template_global()
+def asset_url(name):
+    """バンドル（app.css・app.js）のハッシュ付きのURL"""
+    return url_for('asset', filename=get_manifest()[name])
+
+@app.teardown_request
+def cleanup_uploads(exception=None):
+    """保存されなかったアップロードの一時ファイルを削除"""
+    request.discard_uncommitted_uploads()
+
+@app.errorhandler(InvalidUploadError)
+def handle_invalid_upload(error):
+    """PDF以外のファイルは受信途中で打ち切ってアップロード画面に戻す"""
+    flash('PDFファイルのみアップロード可能です')
+    return redirect(url_for('upload_file'))
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(error):
+    """上限サイズを超えるアップロードはアップロード画面に戻す"""
+    flash(f'ファイルサイズが上限（{app.config["MAX_UPLOAD_MB"]}MB）を超えています')
+    return redirect(url_for('upload_file'))
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """
+    ハッシュ付きの静的ファイル
+    
+    内容が変わるとファイル名も変わるため、期限なし（immutable）でキャッシュさせます。
+    CSS・JavaScriptは作成時に圧縮したファイル（.br / .gz）を返します
+    """
+    suffix = ''
+    if filename.endswith(PRECOMPRESS_EXTENSIONS):
+        for encoding, extension in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.exists(os.path.join(ASSET_BUILD_DIR, filename + extension)):
+                suffix = extension
+                break
+    response = send_from_directory(ASSET_BUILD_DIR, filename + suffix, max_age=ASSET_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus形式のメトリクス"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route('/')
 def index():
     """メインページ"""
-    return render_template('index.html', genres=GENRES)
+    with open_question_bank() as bank:
+        etag = page_etag(bank)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        counts = bank.question_counts()
+    return cacheable(make_response(render_template(
+        'index.html', genres=GENRES, counts=counts, exam_years=list_exam_years(counts)
+    )), etag)
 
 @app.route('/upload', methods=['GET', 'POST'])
+@requires_database
 def upload_file():
     """PDFファイルのアップロード"""
     if request.method == 'POST':
@@ -127,49 +325,97 @@ def upload_file():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
             filename = timestamp + filename
             
-            # アップロードフォルダが存在しない場合は作成
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
+            # 受信時に書き込み済みの一時ファイルを保存先に移動
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # データベースに保存
-            conn = sqlite3.connect('takken_exam.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO pdf_files (filename, original_name, file_path)
-                VALUES (?, ?, ?)
-            ''', (filename, file.filename, file_path))
-            pdf_id = cursor.lastrowid
+            file.stream.commit(file_path)
             
-            # PDFから問題を抽出
-            questions = extract_questions_from_pdf(file_path)
+            # 問題の抽出は一括アップロードと同じワーカープールで行う（リクエストのスレッドでは抽出しない）
+            batch_id = start_batch([(file.filename, file_path, file.stream.content_hash)], app.config['DATABASE'])
             
-            # 問題をデータベースに保存
-            for question in questions:
-                # 選択肢をJSON文字列として保存
-                # オプションをJSON形式で保存
-                options_json = json.dumps(question.get('options', []), ensure_ascii=False)
-                
-                cursor.execute(
-                    "INSERT INTO questions (pdf_id, question_number, question_text, genre, options, year) VALUES (?, ?, ?, ?, ?, ?)",
-                    (pdf_id, question['question_number'], question['question_text'], question['genre'], options_json, question.get('year', ''))
-                )
-            
-            conn.commit()
-            conn.close()
-            
-            flash(f'ファイルが正常にアップロードされました。{len(questions)}問の問題を抽出しました。')
-            return redirect(url_for('index'))
+            flash('ファイルが正常にアップロードされました。問題の抽出が完了するまでお待ちください。')
+            return redirect(url_for('batch_status', batch_id=batch_id))
         else:
             flash('PDFファイルのみアップロード可能です')
     
-    return render_template('upload.html')
+    return render_template('upload.html', max_upload_mb=app.config['MAX_UPLOAD_MB'])
+
+@app.route('/upload/batch', methods=['GET', 'POST'])
+@requires_database
+def upload_batch():
+    """複数のPDFまたはZIPの一括アップロード"""
+    if request.method == 'POST':
+        uploads = [file for file in request.files.getlist('files') if file.filename]
+        if not uploads:
+            flash('ファイルが選択されていません')
+            return redirect(request.url)
+        
+        files = []
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
+        for index, file in enumerate(uploads):
+            extension = file.filename.rsplit('.', 1)[-1].lower()
+            if extension == 'pdf':
+                file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{timestamp}{index}_{secure_filename(file.filename)}')
+                file.stream.commit(file_path)
+                files.append((file.filename, file_path, file.stream.content_hash))
+            elif extension == 'zip':
+                zip_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{timestamp}{index}.zip')
+                file.stream.commit(zip_path)
+                try:
+                    files.extend(expand_zip(zip_path, app.config['UPLOAD_FOLDER'], app.config['MAX_CONTENT_LENGTH']))
+                except zipfile.BadZipFile:
+                    flash(f'ZIPファイルを展開できませんでした: {file.filename}')
+                finally:
+                    os.remove(zip_path)
+        
+        if not files:
+            flash('PDFファイルが見つかりませんでした')
+            return redirect(request.url)
+        
+        batch_id = start_batch(files, app.config['DATABASE'], profile=request.form.get('profile') == '1')
+        return redirect(url_for('batch_status', batch_id=batch_id))
+    
+    return render_template('upload_batch.html', max_upload_mb=app.config['MAX_UPLOAD_MB'])
+
+@app.route('/upload/batch/<int:batch_id>')
+@requires_database
+def batch_status(batch_id):
+    """一括アップロードの進捗画面"""
+    recover_orphaned_items(app.config['DATABASE'])
+    conn = sqlite3.connect(app.config['DATABASE'])
+    progress = get_batch_progress(conn, batch_id)
+    conn.close()
+    
+    if not progress:
+        flash('一括アップロードが見つかりません')
+        return redirect(url_for('upload_batch'))
+    return render_template('batch_status.html', progress=progress)
+
+@app.route('/upload/batch/<int:batch_id>/progress')
+@requires_database
+def batch_progress(batch_id):
+    """一括アップロードの進捗（JSON）"""
+    recover_orphaned_items(app.config['DATABASE'])
+    conn = sqlite3.connect(app.config['DATABASE'])
+    progress = get_batch_progress(conn, batch_id)
+    conn.close()
+    
+    if not progress:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(progress)
 
 @app.route('/question/<genre>')
 def get_question(genre):
     """指定されたジャンルから問題を取得"""
-    conn = sqlite3.connect('takken_exam.db')
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        question_data = snapshot.random_question(genre)
+        if question_data is None:
+            flash('該当するジャンルの問題が見つかりません')
+            return redirect(url_for('index'))
+        question_data['genre'] = GENRES.get(question_data['genre'], question_data['genre'])
+        return no_store(make_response(render_template('question.html', question=question_data)))
+
+    conn = sqlite3.connect(app.config['DATABASE'])
     cursor = conn.cursor()
     
     if genre == 'random':
@@ -197,29 +443,123 @@ def get_question(genre):
             'question_number': question[7],      # question_number
             'year': question[8] if len(question) > 8 else ''  # year
         }
-        return render_template('question.html', question=question_data)
+        # 表示のたびに別の問題を出題するため、ブラウザに保存させない
+        return no_store(make_response(render_template('question.html', question=question_data)))
     else:
         flash('該当するジャンルの問題が見つかりません')
         return redirect(url_for('index'))
 
+@app.route('/exam/<year>/<int:number>')
+def browse_exam(year, number):
+    """年度の問題を問題番号順にページ単位で表示"""
+    with open_question_bank() as bank:
+        etag = page_etag(bank)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        page = bank.exam_page(year, number, request.args.get('id', 0, type=int))
+    
+    if not page['questions']:
+        flash(f'{year}の問{number}以降の問題が見つかりません')
+        return redirect(url_for('index'))
+    for question in page['questions']:
+        question['genre'] = GENRES.get(question['genre'], question['genre'])
+    return cacheable(make_response(render_template('exam_browse.html', page=page)), etag)
+
+@app.route('/mock_exam', methods=['POST'])
+@requires_database
+def start_mock_exam():
+    """本試験と同じジャンル構成で模擬試験を作成"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    exam_id = create_mock_exam(conn)
+    conn.close()
+    
+    if exam_id is None:
+        flash('模擬試験に出題できる問題がありません')
+        return redirect(url_for('index'))
+    return redirect(url_for('mock_exam_page', exam_id=exam_id, page=1))
+
+@app.route('/mock_exam/<int:exam_id>/<int:page>', methods=['GET', 'POST'])
+@requires_database
+def mock_exam_page(exam_id, page):
+    """模擬試験をページ単位で出題し、解答を保存"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    exam = get_mock_exam(conn, exam_id)
+    
+    if not exam or page < 1 or page > exam['page_count']:
+        conn.close()
+        flash('模擬試験が見つかりません')
+        return redirect(url_for('index'))
+    
+    if request.method == 'POST':
+        answers = {key[len('answer_'):]: value for key, value in request.form.items() if key.startswith('answer_')}
+        save_mock_exam_answers(conn, exam, answers)
+        conn.close()
+        
+        action = request.form.get('action', 'next')
+        if action == 'finish':
+            return redirect(url_for('mock_exam_result', exam_id=exam_id))
+        next_page = page - 1 if action == 'prev' else page + 1
+        next_page = min(max(next_page, 1), exam['page_count'])
+        return redirect(url_for('mock_exam_page', exam_id=exam_id, page=next_page))
+    
+    questions = get_mock_exam_page(conn, exam, page)
+    conn.close()
+    
+    for question in questions:
+        question['genre'] = GENRES.get(question['genre'], question['genre'])
+    return render_template('mock_exam.html', exam=exam, page=page, questions=questions)
+
+@app.route('/mock_exam/<int:exam_id>/result')
+@requires_database
+def mock_exam_result(exam_id):
+    """模擬試験の全解答を一括採点して結果を表示"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    exam = get_mock_exam(conn, exam_id)
+    
+    if not exam:
+        conn.close()
+        flash('模擬試験が見つかりません')
+        return redirect(url_for('index'))
+    
+    result = grade_mock_exam(conn, exam)
+    conn.close()
+    
+    for item in result['results']:
+        item['genre'] = GENRES.get(item['genre'], item['genre'])
+    by_genre = [
+        (GENRES.get(genre, genre), result['by_genre'].get(genre, {'correct': 0, 'total': 0}))
+        for genre in MOCK_EXAM_COMPOSITION
+    ]
+    return render_template('mock_exam_result.html', exam=exam, result=result, by_genre=by_genre)
+
 @app.route('/files')
 def list_files():
     """アップロード済みファイル一覧"""
-    conn = sqlite3.connect('takken_exam.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT pf.*, COUNT(q.id) as question_count
-        FROM pdf_files pf
-        LEFT JOIN questions q ON pf.id = q.pdf_id
-        GROUP BY pf.id
-        ORDER BY pf.upload_date DESC
-    ''')
-    files = cursor.fetchall()
-    conn.close()
+    with open_question_bank() as bank:
+        etag = page_etag(bank)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        files = bank.files()
+    
+    return cacheable(make_response(render_template('files.html', files=files)), etag)
+
+def create_app():
+    """
+    WSGIサーバー用のアプリケーションを返す
     
-    return render_template('files.html', files=files)
+    本番環境では wsgi.py 経由で gunicorn（Windowsでは waitress）から呼び出されます。
+    スナップショットから表示する読み取り専用のサーバー（データベースのファイルがない場合）では
+    空のデータベースを作成しないよう、データベースの初期化は行いません
+    """
+    if database_available():
+        init_db()
+    # CSS・JavaScriptのバンドルを作成（ワーカーの起動前に1回）
+    get_manifest()
+    return app
 
 if __name__ == '__main__':
-    init_db()
+    # 開発用サーバー（本番環境では gunicorn -c gunicorn.conf.py wsgi:application を使用）
     port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
+    create_app().run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+静的ファイル（CSS・JavaScript・フォント）のバンドル
+assets/ のCSSとJavaScriptを1つずつのファイルにまとめ、内容のハッシュを付けたファイル名で書き出します。
+Bootstrap と Font Awesome も assets/vendor/ に同梱しているため、CDNに接続できないネットワークでも
+ページの表示が止まりません
+
+ファイル名は内容が変わると変わるため、ブラウザには期限なし（immutable）でキャッシュさせられます。
+CSSが参照するフォントもハッシュ付きのファイル名でコピーし、参照先を書き換えます。
+gzip（とbrotli）で圧縮したファイルもあわせて作成するため、配信時に圧縮し直すことはありません
+
+使用方法:
+    python assets.py   # バンドルを作成（アプリの起動時にも自動で作成）
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:
+    # brotliがインストールされていない環境ではgzipのみを作成
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# バンドルの元ファイルと出力先
+ASSET_SOURCE_DIR = os.path.join(BASE_DIR, 'assets')
+ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR', os.path.join(BASE_DIR, 'build', 'assets'))
+
+MANIFEST_FILE = 'manifest.json'
+
+# ハッシュ付きのファイルをブラウザがキャッシュする秒数（1年）
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# バンドルごとの元ファイル（assets/ からの相対パス、記載順に連結）
+BUNDLES = {
+    'app.css': [
+        'vendor/bootstrap-5.1.3/bootstrap.min.css',
+        'vendor/fontawesome-6.0.0/css/fontawesome.min.css',
+        'vendor/fontawesome-6.0.0/css/solid.min.css',
+        'css/base.css',
+        'css/question.css',
+    ],
+    'app.js': [
+        'vendor/bootstrap-5.1.3/popper.min.js',
+        'vendor/bootstrap-5.1.3/bootstrap.min.js',
+        'js/question.js',
+    ],
+}
+
+# 事前に圧縮しておくファイルの拡張子（フォントは圧縮済みの形式のため除く）
+PRECOMPRESS_EXTENSIONS = ('.css', '.js')
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^)\'"]+)\1\s*\)')
+SOURCE_MAP = re.compile(r'^\s*(/\*# sourceMappingURL=.*?\*/|//# sourceMappingURL=\S+)\s*$', re.M)
+
+_manifest = None
+_manifest_version = None
+_manifest_lock = threading.Lock()
+
+
+def _fingerprint(name: str, data: bytes) -> str:
+    """ファイル名に内容のハッシュを付ける（app.css → app.<ハッシュ>.css）"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path: str, data: bytes):
+    """ファイルを書き出す（同じ名前のファイルは内容も同じため、既にあれば書き出さない）"""
+    if os.path.exists(path):
+        return
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def minify_css(text: str) -> str:
+    """コメント（ライセンス表記の /*! */ は残す）と余分な空白を取り除く"""
+    text = re.sub(r'/\*(?!!).*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{}:;,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text: str) -> str:
+    """行頭の字下げ・空行・コメントだけの行を取り除く（文字列を壊さないよう行内は変更しない）"""
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def _read_source(relative_path: str) -> str:
+    with open(os.path.join(ASSET_SOURCE_DIR, relative_path), encoding='utf-8') as f:
+        text = SOURCE_MAP.sub('', f.read())
+    if '.min.' in relative_path:
+        return text.strip()
+    return minify_css(text) if relative_path.endswith('.css') else minify_js(text)
+
+
+def _rewrite_css_urls(text: str, relative_path: str, build_dir: str, files: Dict[str, str]) -> str:
+    """CSSが参照するファイル（フォント）をハッシュ付きの名前でコピーし、参照先を書き換える"""
+    source_dir = os.path.dirname(os.path.join(ASSET_SOURCE_DIR, relative_path))
+
+    def replace(match):
+        url = match.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '/', '#')):
+            return match.group(0)
+        path = os.path.normpath(os.path.join(source_dir, url.split('?')[0].split('#')[0]))
+        if not os.path.exists(path):
+            return match.group(0)
+        name = os.path.basename(path)
+        if name not in files:
+            with open(path, 'rb') as f:
+                data = f.read()
+            files[name] = _fingerprint(name, data)
+            _write(os.path.join(build_dir, files[name]), data)
+        return f"url({files[name]})"
+
+    return CSS_URL.sub(replace, text)
+
+
+def build_assets(build_dir: str = ASSET_BUILD_DIR) -> Dict[str, str]:
+    """
+    バンドルを作成
+
+    Returns:
+        マニフェスト {バンドル名: ハッシュ付きのファイル名}（参照するフォントなども含む）
+    """
+    os.makedirs(build_dir, exist_ok=True)
+    files = {}
+    for bundle, sources in BUNDLES.items():
+        parts: List[str] = []
+        for relative_path in sources:
+            text = _read_source(relative_path)
+            if bundle.endswith('.css'):
+                # @charset はファイルの先頭にしか書けないため、連結前に取り除いて先頭に1つだけ付ける
+                text = re.sub(r'@charset\s+"[^"]*";', '', text)
+                text = _rewrite_css_urls(text, relative_path, build_dir, files)
+            parts.append(text)
+        if bundle.endswith('.css'):
+            data = ('@charset "UTF-8";' + '\n'.join(parts) + '\n').encode('utf-8')
+        else:
+            data = (';\n'.join(parts) + '\n').encode('utf-8')
+
+        files[bundle] = _fingerprint(bundle, data)
+        path = os.path.join(build_dir, files[bundle])
+        _write(path, data)
+        _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(data, quality=11))
+
+    manifest_path = os.path.join(build_dir, MANIFEST_FILE)
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(files, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+    return files
+
+
+def get_manifest() -> Dict[str, str]:
+    """マニフェストを取得（プロセスで最初に呼び出したときにバンドルを作成）"""
+    global _manifest, _manifest_version
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = build_assets()
+            _manifest_version = hashlib.sha1(json.dumps(_manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        return _manifest
+
+
+def manifest_version() -> str:
+    """バンドルの内容を表す値（ページのETagに含める）"""
+    get_manifest()
+    return _manifest_version
+
+
+if __name__ == "__main__":
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    for name, file_name in build_assets().items():
+        size = os.path.getsize(os.path.join(ASSET_BUILD_DIR, file_name))
+        print(f"{name}: {file_name}（{size / 1024:.0f}KB）")
@@ -0,0 +1,72 @@
+// 問題ページ（question.html）の選択肢のクリックと正解表示
+let selectedOption = null;
+let hasAnswered = false;
+
+// 正解はテンプレートが問題文の要素の data-correct-answer に出力する
+function getCorrectAnswer() {
+    const content = document.querySelector('.question-content');
+    return content ? content.dataset.correctAnswer : '';
+}
+
+function selectOption(optionNumber) {
+    if (hasAnswered) {
+        return; // 既に回答済みの場合は何もしない
+    }
+    
+    // 前の選択をクリア
+    document.querySelectorAll('.option-item').forEach(item => {
+        item.classList.remove('option-selected');
+    });
+    
+    // 選択した選択肢をハイライト
+    const selectedElement = document.querySelector(`[data-option-number="${optionNumber}"]`);
+    selectedElement.classList.add('option-selected');
+    
+    selectedOption = optionNumber;
+    
+    // 正解を表示
+    showAnswer(optionNumber);
+}
+
+function showAnswer(selectedOptionNumber) {
+    hasAnswered = true;
+    const correctAnswer = getCorrectAnswer();
+    
+    // すべての選択肢を無効化
+    document.querySelectorAll('.option-item').forEach(item => {
+        item.classList.add('option-disabled');
+    });
+    
+    // 正解の選択肢をハイライト
+    const correctElement = document.querySelector(`[data-option-number="${correctAnswer}"]`);
+    if (correctElement) {
+        correctElement.classList.add('option-correct');
+        correctElement.classList.remove('option-selected');
+    }
+    
+    // 選択した選択肢が間違っている場合は赤でハイライト
+    if (selectedOptionNumber.toString() !== correctAnswer) {
+        const selectedElement = document.querySelector(`[data-option-number="${selectedOptionNumber}"]`);
+        if (selectedElement) {
+            selectedElement.classList.add('option-incorrect');
+            selectedElement.classList.remove('option-selected');
+        }
+    }
+    
+    // 正解表示エリアを表示
+    const feedbackElement = document.getElementById('answer-feedback');
+    if (feedbackElement) {
+        feedbackElement.style.display = 'block';
+        feedbackElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    }
+    
+    // 正解番号を更新（空の場合はデフォルトメッセージ）
+    const correctAnswerDisplay = document.getElementById('correct-answer-display');
+    if (correctAnswerDisplay) {
+        if (correctAnswer && correctAnswer.trim() !== '') {
+            correctAnswerDisplay.textContent = correctAnswer;
+        } else {
+            correctAnswerDisplay.textContent = '不明';
+        }
+    }
+}
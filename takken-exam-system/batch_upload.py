@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+一括アップロードモジュール
+複数のPDFまたはPDFをまとめたZIPを受け付け、重複を除いてワーカープールで並列に問題を抽出します
+進捗はデータベースに記録するため、複数のワーカープロセスで動かしている場合も参照できます
+
+1件ずつのアップロードも同じワーカープールに投入し、リクエストのスレッドでは抽出しません。
+処理待ちの件数と予想待ち時間は、データベースに記録した処理待ちのPDFと最近の処理時間から求めます
+
+処理待ちのPDFはプールのメモリ上にしかないため、各ファイルには投入したプロセスを記録します。
+再起動・タイムアウトによる強制終了などでそのプロセスが終了していた場合は、プールの起動時と
+進捗の確認時に別のプロセスが処理し直します（recover_orphaned_items）
+"""
+
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import zipfile
+import threading
+import logging
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from ingest import find_pdf_by_hash, forget_pdf_hash, save_pdf_record, save_questions, record_extraction, resolve_pdf_path
+from ingest_pool import IngestPool, SharedSlots, init_slot_table, current_owner, owner_alive
+
+logger = logging.getLogger(__name__)
+
+# ZIP展開時の書き込み単位
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 抽出を並列実行するプロセス数（環境変数 INGEST_WORKERS で変更可能）
+# gunicorn のワーカープロセスごとにプールを起動しますが、同時に処理する数はホスト全体でこの数までです
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', os.cpu_count() or 1))
+
+# 処理時間の実績がない場合の1件あたりの予想処理時間（秒、テキストレイヤーあり / OCRが必要）
+DEFAULT_JOB_SECONDS = {0: 2.0, 1: 60.0}
+
+# 予想処理時間の計算に使う最近の処理件数
+ETA_HISTORY = 50
+
+# 処理していたプロセスが終了したファイルを確認する間隔（秒、進捗の確認時）
+RECOVERY_INTERVAL = 30.0
+
+_executor = None
+_executor_lock = threading.Lock()
+_recovered_at = None
+
+
+def init_batch_tables(cursor):
+    """一括アップロードの進捗管理テーブルを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS upload_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            total INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS upload_batch_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id INTEGER NOT NULL,
+            original_name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            pdf_id INTEGER,
+            question_count INTEGER,
+            error TEXT,
+            ocr INTEGER NOT NULL DEFAULT 0,
+            started_at REAL,
+            finished_at REAL,
+            profile TEXT,
+            FOREIGN KEY (batch_id) REFERENCES upload_batches (id)
+        )
+    ''')
+
+    # 既存のテーブルに処理の優先度・処理時間・プロファイルの列が存在しない場合は追加
+    # （started_at / finished_at はUNIX時刻、profile は段階別の処理時間と出力ファイルのJSON）
+    cursor.execute('PRAGMA table_info(upload_batch_items)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'ocr' not in columns:
+        cursor.execute('ALTER TABLE upload_batch_items ADD COLUMN ocr INTEGER NOT NULL DEFAULT 0')
+    for column in ('started_at', 'finished_at'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE upload_batch_items ADD COLUMN {column} REAL')
+    if 'profile' not in columns:
+        cursor.execute('ALTER TABLE upload_batch_items ADD COLUMN profile TEXT')
+    # 処理待ちに投入したプロセス（PIDと起動時刻、ingest_pool.current_owner()）
+    if 'owner_pid' not in columns:
+        cursor.execute('ALTER TABLE upload_batch_items ADD COLUMN owner_pid INTEGER')
+    if 'owner_started' not in columns:
+        cursor.execute('ALTER TABLE upload_batch_items ADD COLUMN owner_started REAL')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_batch_items_batch ON upload_batch_items (batch_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_batch_items_status ON upload_batch_items (status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pdf_files_content_hash ON pdf_files (content_hash)')
+    init_slot_table(cursor)
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（ログ書き込みスレッドはプロセスごとに起動が必要）"""
+    from pdf_processor import configure_logging
+    from ocr_engine import configure_ocr
+    configure_logging(level=getattr(logging, os.environ.get('PDF_LOG_LEVEL', 'INFO').upper(), logging.INFO))
+    # プロセス単位で並列化しているため、OCRはワーカーごとに1ページずつ行う
+    configure_ocr(workers=1)
+
+
+def _get_executor(db_path: str) -> IngestPool:
+    """
+    抽出用のワーカープールを取得（初回のみ起動、PDF1件ごとの処理時間・メモリの上限付き）
+
+    同時実行数の枠はデータベースで共有するため、ほかのプロセスのプールとあわせて INGEST_WORKERS 件までです
+    """
+    global _executor
+    with _executor_lock:
+        started = _executor is None
+        if started:
+            _executor = IngestPool(
+                INGEST_WORKERS, initializer=_init_worker, slots=SharedSlots(db_path, INGEST_WORKERS)
+            )
+            logger.info(f"抽出ワーカープールを起動: 最大{INGEST_WORKERS}プロセス（ホスト全体）")
+        executor = _executor
+    if started:
+        # 前回の起動時（終了したプロセス）の処理待ちを引き継ぐ
+        recover_orphaned_items(db_path, force=True)
+    return executor
+
+
+def _extract_job(file_path: str, profile_name: Optional[str] = None) -> Tuple[List[Dict[str, any]], Optional[Dict[str, any]]]:
+    """
+    ワーカープロセスで実行する抽出処理
+
+    Args:
+        profile_name: 指定した場合はプロファイルを取得し、この名前で profiles/ に保存する
+
+    Returns:
+        (問題のリスト, プロファイルの結果（取得しない場合はNone）)
+    """
+    from pdf_processor import extract_questions_from_pdf, map_pdf
+    with map_pdf(file_path) as data:
+        if profile_name is None:
+            return extract_questions_from_pdf(data), None
+        from profiling import run_profiled
+        return run_profiled(extract_questions_from_pdf, data, name=profile_name)
+
+
+def expand_zip(zip_path: str, upload_folder: str, max_member_size: int) -> List[Tuple[str, str, str]]:
+    """
+    ZIP内のPDFをアップロードフォルダに展開
+
+    1ファイルずつチャンク単位でコピーし、コピーしながらハッシュを計算します
+
+    Returns:
+        [(元のファイル名, 保存先パス, ハッシュ), ...]（PDFでないもの・上限を超えるものは除外）
+    """
+    expanded = []
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
+
+    with zipfile.ZipFile(zip_path) as archive:
+        for index, member in enumerate(archive.infolist()):
+            original_name = os.path.basename(member.filename)
+            if member.is_dir() or not original_name.lower().endswith('.pdf'):
+                continue
+            if member.file_size > max_member_size:
+                logger.warning(f"ZIP内のファイルが上限サイズを超えるためスキップ: {member.filename}")
+                continue
+
+            file_path = os.path.join(upload_folder, f"{timestamp}{index}_{secure_filename(original_name)}")
+            content_hash = hashlib.sha256()
+            with archive.open(member) as source, open(file_path, 'wb') as target:
+                head = source.read(COPY_CHUNK_SIZE)
+                if b'%PDF-' not in head[:1024]:
+                    logger.warning(f"ZIP内のファイルがPDFではないためスキップ: {member.filename}")
+                    target.close()
+                    os.remove(file_path)
+                    continue
+                chunk = head
+                while chunk:
+                    content_hash.update(chunk)
+                    target.write(chunk)
+                    chunk = source.read(COPY_CHUNK_SIZE)
+
+            expanded.append((original_name, file_path, content_hash.hexdigest()))
+
+    return expanded
+
+
+def start_batch(files: List[Tuple[str, str, str]], db_path: str, profile: bool = False) -> int:
+    """
+    一括取り込みを開始
+
+    重複（登録済みのPDF・同じバッチ内の同一内容）を除き、残りをワーカープールに投入します。
+    テキストレイヤーのないPDF（OCRが必要なもの）は、テキストレイヤーのあるものより後に処理します
+
+    Args:
+        files: [(元のファイル名, 保存先パス, ハッシュ), ...]
+        db_path: データベースファイルのパス
+        profile: 抽出のプロファイルを取得するか（段階別の処理時間をファイルごとの記録に保存）
+
+    Returns:
+        バッチID
+    """
+    from pdf_processor import needs_ocr
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('INSERT INTO upload_batches (total) VALUES (?)', (len(files),))
+    batch_id = cursor.lastrowid
+
+    jobs = []
+    seen_hashes = set()
+    for original_name, file_path, content_hash in files:
+        duplicate_of = find_pdf_by_hash(cursor, content_hash)
+        if duplicate_of is not None or content_hash in seen_hashes:
+            cursor.execute(
+                'INSERT INTO upload_batch_items (batch_id, original_name, status, pdf_id) VALUES (?, ?, ?, ?)',
+                (batch_id, original_name, 'duplicate', duplicate_of)
+            )
+            os.remove(file_path)
+            continue
+        seen_hashes.add(content_hash)
+
+        ocr = needs_ocr(file_path)
+        pdf_id = save_pdf_record(cursor, os.path.basename(file_path), original_name, file_path, content_hash)
+        cursor.execute(
+            '''INSERT INTO upload_batch_items (batch_id, original_name, status, pdf_id, ocr, owner_pid, owner_started)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (batch_id, original_name, 'queued', pdf_id, int(ocr), *current_owner())
+        )
+        profile_name = f"batch{batch_id}_{cursor.lastrowid}" if profile else None
+        jobs.append((cursor.lastrowid, pdf_id, file_path, ocr, profile_name))
+
+    conn.commit()
+    conn.close()
+
+    _submit_jobs(db_path, jobs)
+    logger.info(f"一括取り込みを開始: バッチ{batch_id} 全{len(files)}件 抽出{len(jobs)}件")
+    return batch_id
+
+
+def _submit_jobs(db_path: str, jobs: List[Tuple[int, int, str, bool, Optional[str]]]):
+    """ファイルをワーカープールに投入（jobs: [(ファイルのID, PDFのID, PDFのパス, OCRが必要か, プロファイル名), ...]）"""
+    if not jobs:
+        return
+    executor = _get_executor(db_path)
+    for item_id, pdf_id, file_path, ocr, profile_name in jobs:
+        future = executor.submit(
+            _extract_job, file_path, profile_name,
+            ocr=ocr, on_start=lambda item_id=item_id: _start_item(db_path, item_id)
+        )
+        future.add_done_callback(lambda f, item_id=item_id, pdf_id=pdf_id: _finish_item(f, db_path, item_id, pdf_id))
+
+
+def recover_orphaned_items(db_path: str, force: bool = False) -> int:
+    """
+    投入したプロセスが終了したため、処理待ち・処理中のまま止まったファイルを処理し直す
+
+    このプロセスのプールに投入し直し（プロファイルは取得しません）、PDFが見つからないものは失敗にします。
+    force を指定しない場合は、RECOVERY_INTERVAL に1回だけ確認します
+
+    Returns:
+        投入し直した件数
+    """
+    global _recovered_at
+    now = time.monotonic()
+    with _executor_lock:
+        if not force and _recovered_at is not None and now - _recovered_at < RECOVERY_INTERVAL:
+            return 0
+        _recovered_at = now
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('''
+        SELECT i.id, i.pdf_id, i.ocr, i.owner_pid, i.owner_started, pf.file_path
+        FROM upload_batch_items i
+        LEFT JOIN pdf_files pf ON pf.id = i.pdf_id
+        WHERE i.status IN ('queued', 'running')
+    ''')
+    owner = current_owner()
+    jobs = []
+    failed = 0
+    for item_id, pdf_id, ocr, owner_pid, owner_started, file_path in cursor.fetchall():
+        if owner_pid is not None and owner_alive(owner_pid, owner_started):
+            continue
+        path = resolve_pdf_path(file_path) if file_path else None
+        if path is None:
+            cursor.execute(
+                'UPDATE upload_batch_items SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                ('failed', 'PDFファイルが見つからないため処理し直せません', time.time(), item_id)
+            )
+            forget_pdf_hash(cursor, pdf_id)
+            failed += 1
+            continue
+        cursor.execute(
+            '''UPDATE upload_batch_items SET status = 'queued', started_at = NULL, owner_pid = ?, owner_started = ?
+               WHERE id = ?''',
+            (*owner, item_id)
+        )
+        jobs.append((item_id, pdf_id, path, bool(ocr), None))
+    conn.commit()
+    conn.close()
+
+    if jobs or failed:
+        logger.warning(f"処理が止まっていたファイルを引き継ぎました: 再投入{len(jobs)}件 失敗{failed}件")
+    _submit_jobs(db_path, jobs)
+    return len(jobs)
+
+
+def _start_item(db_path: str, item_id: int):
+    """ワーカープールで抽出を開始したファイルを処理中にする"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(
+        'UPDATE upload_batch_items SET status = ?, started_at = ? WHERE id = ?',
+        ('running', time.time(), item_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _finish_item(future, db_path: str, item_id: int, pdf_id: int):
+    """抽出が終わったファイルの問題を保存し、進捗を更新"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    try:
+        questions, profile = future.result()
+        save_questions(cursor, pdf_id, questions)
+        record_extraction(cursor, pdf_id)
+        cursor.execute(
+            'UPDATE upload_batch_items SET status = ?, question_count = ?, finished_at = ?, profile = ? WHERE id = ?',
+            ('done', len(questions), time.time(), json.dumps(profile) if profile else None, item_id)
+        )
+    except Exception as e:
+        logger.error(f"一括取り込みの抽出エラー (PDF {pdf_id}): {e}")
+        conn.rollback()
+        cursor.execute(
+            'UPDATE upload_batch_items SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+            ('failed', str(e), time.time(), item_id)
+        )
+        forget_pdf_hash(cursor, pdf_id)
+    conn.commit()
+    conn.close()
+
+
+def estimate_queue(cursor, batch_id: Optional[int] = None) -> Dict[str, any]:
+    """
+    取り込みの処理待ちの件数と予想待ち時間（目安）
+
+    処理待ち・処理中のPDFのうち、指定したバッチの最後のファイルまで（省略時は全件）の予想処理時間を
+    ホスト全体の同時実行数（INGEST_WORKERS、プロセスごとのプールの数ではない）で割って求めます。予想処理時間は、テキストレイヤーあり / OCRが必要のそれぞれについて
+    最近の ETA_HISTORY 件の平均処理時間を使います（処理中のものは経過時間を差し引きます）
+
+    Returns:
+        {'queued': 処理待ち, 'running': 処理中, 'ahead': 完了までに処理する件数, 'eta_seconds': 予想待ち時間（秒）}
+    """
+    job_seconds = dict(DEFAULT_JOB_SECONDS)
+    cursor.execute('''
+        SELECT ocr, AVG(finished_at - started_at)
+        FROM (
+            SELECT ocr, started_at, finished_at
+            FROM upload_batch_items
+            WHERE status = 'done' AND started_at IS NOT NULL AND finished_at IS NOT NULL
+            ORDER BY id DESC
+            LIMIT ?
+        )
+        GROUP BY ocr
+    ''', (ETA_HISTORY,))
+    for ocr, average in cursor.fetchall():
+        job_seconds[ocr] = average
+
+    cursor.execute('''
+        SELECT id, batch_id, status, ocr, started_at
+        FROM upload_batch_items
+        WHERE status IN ('queued', 'running')
+        ORDER BY id
+    ''')
+    active = cursor.fetchall()
+    ahead = active
+    if batch_id is not None:
+        last_id = max((row[0] for row in active if row[1] == batch_id), default=0)
+        ahead = [row for row in active if row[0] <= last_id]
+
+    now = time.time()
+    work = 0.0
+    for _, _, status, ocr, started_at in ahead:
+        if status == 'running' and started_at:
+            work += max(0.0, job_seconds[ocr] - (now - started_at))
+        else:
+            work += job_seconds[ocr]
+
+    return {
+        'queued': sum(1 for row in active if row[2] == 'queued'),
+        'running': sum(1 for row in active if row[2] == 'running'),
+        'ahead': len(ahead),
+        'eta_seconds': int(round(work / INGEST_WORKERS)),
+    }
+
+
+def get_batch_progress(conn, batch_id: int) -> Optional[Dict[str, any]]:
+    """バッチ全体の進捗と各ファイルの状態、取り込み全体の処理待ちの状況を取得"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, created_at, total FROM upload_batches WHERE id = ?', (batch_id,))
+    batch = cursor.fetchone()
+    if not batch:
+        return None
+
+    cursor.execute('''
+        SELECT original_name, status, pdf_id, question_count, error, ocr, profile
+        FROM upload_batch_items
+        WHERE batch_id = ?
+        ORDER BY id
+    ''', (batch_id,))
+    items = [
+        {
+            'original_name': row[0], 'status': row[1], 'pdf_id': row[2], 'question_count': row[3],
+            'error': row[4], 'ocr': bool(row[5]), 'profile': json.loads(row[6]) if row[6] else None,
+        }
+        for row in cursor.fetchall()
+    ]
+
+    counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'duplicate': 0}
+    for item in items:
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+
+    finished = len(items) - counts['queued'] - counts['running']
+    complete = finished == len(items)
+    return {
+        'id': batch[0],
+        'created_at': batch[1],
+        'total': batch[2],
+        'counts': counts,
+        'finished': finished,
+        'percent': int(finished * 100 / len(items)) if items else 100,
+        'complete': complete,
+        'question_count': sum(item['question_count'] or 0 for item in items),
+        'queue': None if complete else estimate_queue(cursor, batch_id),
+        'items': items,
+    }
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PDF抽出処理のベンチマーク
+uploads/ のPDFと合成した大規模PDF（synthetic_corpus.py で作成）に対して、抽出処理の各段階の実行時間・CPU時間・ピークメモリ・スループットを計測し、
+結果を履歴ファイル（JSON）に追記します。compare で直前の結果と比較し、しきい値を超えて悪化した項目を検出します
+
+使用方法:
+    python benchmark_extraction.py run [--rounds 3] [--synthetic-pages 1000] [--label メモ]
+    python benchmark_extraction.py compare [--threshold 0.10] [--baseline -2]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from pdf_processor import (
+    EnhancedPDFProcessor, analyze_pdf, extract_questions_from_pdf, parse_answer_key, configure_logging
+)
+from synthetic_corpus import iter_exams, write_exam_pdf
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 結果の履歴ファイル
+DEFAULT_HISTORY = 'benchmark_history.json'
+
+# 悪化とみなす変化率（10%）
+DEFAULT_THRESHOLD = 0.10
+
+# 比較する指標と、値が大きいほど良いかどうか
+COMPARED_METRICS = {
+    'wall_s': False,
+    'cpu_s': False,
+    'peak_mb': False,
+    'throughput': True,
+}
+
+def build_synthetic_pdf(file_path, pages):
+    """合成した問題を1ページに2問ずつ配置した、指定ページ数の試験PDFを作成"""
+    questions = [question for exam in iter_exams(pages * 2) for question in exam['questions']]
+    for number, question in enumerate(questions, 1):
+        question['question_number'] = number
+    write_exam_pdf(file_path, {'name': 'synthetic', 'year': questions[0]['year'], 'questions': questions})
+
+
+def measure(func, rounds):
+    """
+    処理を計測
+
+    実行時間とCPU時間は rounds 回の平均、ピークメモリは tracemalloc を有効にした別の1回で計測します
+    （tracemalloc は処理を遅くするため時間の計測とは分けています。PyMuPDF内部のC側の確保は含みません）
+
+    Returns:
+        (実行時間[秒], CPU時間[秒], ピークメモリ[MB], 戻り値の件数)
+    """
+    items = func()  # ウォームアップ（正規表現のコンパイルなどを除外）
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        func()
+    wall = (time.perf_counter() - wall_start) / rounds
+    cpu = (time.process_time() - cpu_start) / rounds
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return wall, cpu, peak / (1024 * 1024), items
+
+
+def prepare_inputs(pdf_files):
+    """段階別ベンチマーク用に、PDFを1回ずつ解析してテキストを用意"""
+    processor = EnhancedPDFProcessor(use_ocr=False)
+    texts, first_pages, last_pages, segments = [], [], [], []
+    for pdf_file in pdf_files:
+        analysis = analyze_pdf(pdf_file, use_ocr=False)
+        text = processor._preprocess_text(analysis.text)
+        texts.append(text)
+        first_pages.append(analysis.first_page_text)
+        last_pages.append(analysis.last_page_text)
+        segments.extend(
+            (int(number), body.strip()) for number, body in processor._segment_questions(text)
+            if len(body.strip()) >= 30
+        )
+    return processor, texts, first_pages, last_pages, segments
+
+
+def build_cases(pdf_files, synthetic_pdf, use_ocr):
+    """
+    ベンチマーク項目を作成
+
+    Returns:
+        [(項目名, 処理, 件数の単位), ...]（処理は件数を返す）
+    """
+    processor, texts, first_pages, last_pages, segments = prepare_inputs(pdf_files)
+    cases = []
+
+    def extract_all(paths, ocr):
+        def run():
+            for path in paths:
+                extract_questions_from_pdf(path, use_ocr=ocr)
+            return len(paths)
+        return run
+
+    cases.append(('extract_pdf', extract_all(pdf_files, False), 'pdf'))
+    if use_ocr:
+        cases.append(('extract_pdf_ocr', extract_all(pdf_files, True), 'pdf'))
+
+    def segment():
+        return sum(len(processor._segment_questions(text)) for text in texts)
+
+    def option_parse():
+        for number, body in segments:
+            processor._parse_question_and_options(number, body)
+        return len(segments)
+
+    def year():
+        for text in first_pages:
+            processor._extract_exam_year(text)
+        return len(first_pages)
+
+    def answer_key():
+        return sum(len(parse_answer_key(text)) for text in last_pages)
+
+    cases.append(('segment', segment, 'question'))
+    cases.append(('option_parse', option_parse, 'question'))
+    cases.append(('year', year, 'pdf'))
+    cases.append(('answer_key', answer_key, 'answer'))
+
+    if synthetic_pdf:
+        def extract_synthetic():
+            return len(extract_questions_from_pdf(synthetic_pdf, use_ocr=False))
+        cases.append(('extract_synthetic', extract_synthetic, 'question'))
+
+    return cases
+
+
+def git_revision():
+    """現在のコミット（取得できない場合は空文字）"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def run_benchmarks(args):
+    configure_logging(level=logging.WARNING, log_file=None, console=False)
+
+    pdf_files = sorted(glob.glob(os.path.join(args.uploads, '*.pdf')))
+    if not pdf_files:
+        print(f"PDFファイルが見つかりません: {args.uploads}")
+        return 1
+
+    use_ocr = not args.no_ocr and shutil.which('tesseract') is not None
+    if not use_ocr and not args.no_ocr:
+        print("Tesseractが見つからないため、OCRありの抽出は計測しません")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_pdf = None
+        if args.synthetic_pages > 0:
+            synthetic_pdf = os.path.join(tmp_dir, 'synthetic.pdf')
+            print(f"合成PDFを作成中... ({args.synthetic_pages}ページ)")
+            build_synthetic_pdf(synthetic_pdf, args.synthetic_pages)
+
+        print(f"対象PDF: {len(pdf_files)}件, 繰り返し: {args.rounds}回")
+        print()
+        print(f"{'項目':<20}{'実行時間(秒)':>14}{'CPU時間(秒)':>14}{'ピーク(MB)':>12}{'件数':>8}{'件/秒':>12}")
+
+        results = {}
+        for name, func, unit in build_cases(pdf_files, synthetic_pdf, use_ocr):
+            wall, cpu, peak_mb, items = measure(func, args.rounds)
+            results[name] = {
+                'wall_s': round(wall, 6),
+                'cpu_s': round(cpu, 6),
+                'peak_mb': round(peak_mb, 3),
+                'items': items,
+                'unit': unit,
+                'throughput': round(items / wall, 3) if wall > 0 else 0.0,
+            }
+            print(f"{name:<20}{wall:>14.4f}{cpu:>14.4f}{peak_mb:>12.2f}{items:>8}{results[name]['throughput']:>12.1f}")
+
+    history = load_history(args.history)
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'label': args.label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rounds': args.rounds,
+        'synthetic_pages': args.synthetic_pages,
+        'cases': results,
+    })
+    save_history(args.history, history)
+    print(f"\n結果を {args.history} に追記しました（{len(history)}件目）")
+    return 0
+
+
+def compare_runs(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        print("比較するには2件以上の計測結果が必要です")
+        return 1
+
+    try:
+        baseline = history[args.baseline]
+    except IndexError:
+        print(f"基準となる計測結果がありません: {args.baseline}")
+        return 1
+    current = history[-1]
+
+    print(f"基準: {baseline['timestamp']} {baseline.get('revision', '')} {baseline.get('label') or ''}")
+    print(f"今回: {current['timestamp']} {current.get('revision', '')} {current.get('label') or ''}")
+    print(f"しきい値: {args.threshold:.0%}")
+    if baseline.get('platform') != current.get('platform'):
+        print("注意: 計測した環境が異なります")
+    print()
+    print(f"{'項目':<20}{'指標':<12}{'基準':>12}{'今回':>12}{'変化':>10}")
+
+    regressions = []
+    for name, current_case in current['cases'].items():
+        baseline_case = baseline['cases'].get(name)
+        if baseline_case is None:
+            continue
+        if baseline_case.get('items') != current_case.get('items'):
+            # 対象データが異なる結果は比較できない
+            print(f"{name:<20}（対象の件数が異なるため比較しません: {baseline_case.get('items')} → {current_case.get('items')}）")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before = baseline_case.get(metric)
+            after = current_case.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            mark = ''
+            if worse > args.threshold:
+                mark = ' ← 悪化'
+                regressions.append((name, metric, change))
+            print(f"{name:<20}{metric:<12}{before:>12.4f}{after:>12.4f}{change:>+10.1%}{mark}")
+
+    print()
+    if regressions:
+        print(f"{len(regressions)}件の指標がしきい値を超えて悪化しました")
+        return 1
+    print("しきい値を超える悪化はありません")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF抽出処理のベンチマーク')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='結果の履歴ファイル')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='ベンチマークを実行して履歴に追記')
+    run_parser.add_argument('--rounds', type=int, default=3, help='繰り返し回数')
+    run_parser.add_argument('--uploads', default='uploads', help='対象PDFのディレクトリ')
+    run_parser.add_argument('--synthetic-pages', type=int, default=1000, help='合成PDFのページ数（0で省略）')
+    run_parser.add_argument('--no-ocr', action='store_true', help='OCRありの抽出を計測しない')
+    run_parser.add_argument('--label', default='', help='計測結果に付けるメモ')
+
+    compare_parser = subparsers.add_parser('compare', help='最新の結果を過去の結果と比較')
+    compare_parser.add_argument('--baseline', type=int, default=-2, help='基準にする履歴の位置（既定は直前の結果）')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='悪化とみなす変化率')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        return run_benchmarks(args)
+    return compare_runs(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
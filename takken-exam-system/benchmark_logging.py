@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ログ設定ごとのPDF取り込み速度ベンチマーク
+従来の設定（DEBUGレベル・同期ファイル書き込み）とINFOレベル・キュー経由の書き込みを比較します
+
+使用方法: python benchmark_logging.py [繰り返し回数]
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import tempfile
+
+import pdf_processor
+from pdf_processor import extract_questions_from_pdf, configure_logging, shutdown_logging
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def use_legacy_logging(log_file):
+    """従来と同じ設定（DEBUGレベル・抽出スレッドで直接ファイルに書き込み）"""
+    shutdown_logging()
+    logger = pdf_processor.logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.FileHandler(log_file, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return handler
+
+
+def run_ingest(pdf_files, rounds):
+    """全PDFの取り込みを指定回数繰り返し、1回あたりの平均秒数を返す"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for pdf_file in pdf_files:
+            extract_questions_from_pdf(pdf_file, use_ocr=False)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    pdf_files = sorted(glob.glob("uploads/*.pdf"))
+    if not pdf_files:
+        print("アップロード済みのPDFファイルが見つかりません")
+        return
+
+    print(f"対象PDF: {len(pdf_files)}件, 繰り返し: {rounds}回")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # ウォームアップ（PyMuPDFや正規表現の初期化コストを除外）
+        configure_logging(level=logging.WARNING, log_file=None, console=False)
+        run_ingest(pdf_files[:1], 1)
+
+        results = []
+
+        handler = use_legacy_logging(os.path.join(tmp_dir, 'legacy.log'))
+        results.append(("DEBUG・同期書き込み（従来）", run_ingest(pdf_files, rounds)))
+        pdf_processor.logger.removeHandler(handler)
+        handler.close()
+
+        configure_logging(level=logging.DEBUG, log_file=os.path.join(tmp_dir, 'debug.log'), console=False)
+        results.append(("DEBUG・キュー書き込み", run_ingest(pdf_files, rounds)))
+
+        configure_logging(level=logging.INFO, log_file=os.path.join(tmp_dir, 'info.log'), console=False)
+        results.append(("INFO・キュー書き込み", run_ingest(pdf_files, rounds)))
+
+        shutdown_logging()
+
+    baseline = results[0][1]
+    print()
+    print(f"{'設定':<28}{'取り込み時間(秒)':>16}{'速度比':>10}")
+    for name, seconds in results:
+        print(f"{name:<28}{seconds:>16.3f}{baseline / seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
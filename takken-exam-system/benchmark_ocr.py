@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCR前処理のベンチマーク
+テキストレイヤーのあるPDF（uploads/ と合成PDF）のページをOCRし、前処理と解像度とOCRの呼び出し方
+（ページごとに tesseract を起動する pytesseract / 常駐させたOCRエンジン）の組み合わせごとに
+スループット（ページ/秒）・文字の一致率（テキストレイヤーとの比較）・単語の平均信頼度・画像サイズを比較します
+
+正解表については、最終ページを画像のみにしたPDFで、ページ全体のOCRと表の範囲のみのOCR（extract_answer_key）の
+処理時間と正解の一致数を比較します
+
+使用方法:
+    python benchmark_ocr.py [--pages 2] [--synthetic 1] [--uploads uploads] [--no-answer-key]
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import shutil
+import difflib
+import logging
+import argparse
+import tempfile
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+
+from ocr_engine import DEFAULT_LANG, DEFAULT_PSM, get_ocr_engine, tesseract_command
+from ocr_preprocess import preprocess_for_ocr
+from pdf_processor import (
+    EnhancedPDFProcessor, OCR_DPI_STEPS, extract_answer_key, parse_answer_key, ocr_text_and_confidence,
+    configure_logging
+)
+from synthetic_corpus import iter_exams, write_exam_pdf
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def render(page, dpi, gray):
+    """ページを画像に変換"""
+    if gray:
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        return Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+    pixmap = page.get_pixmap(dpi=dpi)
+    return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def fixed_variant(dpi, gray, preprocess, resident):
+    """解像度と前処理とOCRの呼び出し方を固定してOCRする処理を作成"""
+    def run(page):
+        image = render(page, dpi, gray)
+        if preprocess:
+            image = preprocess_for_ocr(image)
+            if image is None:
+                return "", 100.0, 0
+        if resident:
+            data = get_ocr_engine().recognize(image)
+        else:
+            data = pytesseract.image_to_data(
+                image, lang=DEFAULT_LANG, config=f'--oem 3 --psm {DEFAULT_PSM}', output_type=pytesseract.Output.DICT
+            )
+        text, confidence = ocr_text_and_confidence(data)
+        return text, confidence, image.width * image.height
+    return run
+
+
+def adaptive_variant():
+    """抽出処理と同じOCR（常駐させたOCRエンジンで200dpiで読み、信頼度が低い場合のみ300dpiで読み直す）"""
+    processor = EnhancedPDFProcessor(use_ocr=True)
+
+    def run(page):
+        text, confidence, dpi = processor._ocr_pages([page])[0]
+        return text, confidence, dpi
+    return run
+
+
+# 比較する方式: (名前, 処理を作成する関数)
+VARIANTS = [
+    ('color_300dpi', lambda: fixed_variant(300, gray=False, preprocess=False, resident=False)),  # 従来の方式
+    ('gray_200dpi', lambda: fixed_variant(200, gray=True, preprocess=False, resident=False)),
+    ('preprocess_200dpi', lambda: fixed_variant(200, gray=True, preprocess=True, resident=False)),
+    ('preprocess_300dpi', lambda: fixed_variant(300, gray=True, preprocess=True, resident=False)),
+    ('resident_200dpi', lambda: fixed_variant(200, gray=True, preprocess=True, resident=True)),
+    ('adaptive', adaptive_variant),
+]
+
+
+def char_accuracy(expected, actual):
+    """空白を除いた文字列の一致率（0〜1）"""
+    expected = re.sub(r'\s+', '', expected)
+    actual = re.sub(r'\s+', '', actual)
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return difflib.SequenceMatcher(None, expected, actual, autojunk=False).ratio()
+
+
+def collect_pages(pdf_files, pages_per_pdf):
+    """各PDFからテキストレイヤーのあるページを選ぶ（表紙を除き、先頭から指定ページ数）"""
+    targets = []
+    for pdf_file in pdf_files:
+        doc = fitz.open(pdf_file)
+        selected = [
+            number for number in range(1, len(doc))
+            if len(doc[number].get_text().strip()) >= 100
+        ][:pages_per_pdf]
+        doc.close()
+        targets.extend((pdf_file, number) for number in selected)
+    return targets
+
+
+def image_only_last_page(pdf_file, dpi=150):
+    """最終ページをスキャンしたような画像のみのPDF（bytes）を作成"""
+    source = fitz.open(pdf_file)
+    page = source[-1]
+    output = fitz.open()
+    new_page = output.new_page(width=page.rect.width, height=page.rect.height)
+    new_page.insert_image(new_page.rect, pixmap=page.get_pixmap(dpi=dpi))
+    data = output.tobytes()
+    output.close()
+    source.close()
+    return data
+
+
+def benchmark_answer_keys(pdf_files):
+    """画像のみの正解表で、ページ全体のOCRと表の範囲のみのOCRを比較"""
+    processor = EnhancedPDFProcessor(use_ocr=True)
+    totals = {'page_ocr': [0.0, 0, 0], 'answer_key': [0.0, 0, 0]}  # [秒, 一致, 誤り]
+    expected_total = 0
+
+    for pdf_file in pdf_files:
+        doc = fitz.open(pdf_file)
+        expected = parse_answer_key(doc[-1].get_text())
+        doc.close()
+        if not expected:
+            continue
+        expected_total += len(expected)
+        data = image_only_last_page(pdf_file)
+
+        start = time.perf_counter()
+        with fitz.open(stream=data, filetype='pdf') as scanned:
+            text, _, _ = processor._ocr_pages(scanned)[0]
+        page_answers = parse_answer_key(text)
+        page_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        key_answers = extract_answer_key(data)
+        key_seconds = time.perf_counter() - start
+
+        for name, answers, seconds in (('page_ocr', page_answers, page_seconds), ('answer_key', key_answers, key_seconds)):
+            totals[name][0] += seconds
+            totals[name][1] += sum(1 for number, answer in answers.items() if expected.get(number) == answer)
+            totals[name][2] += sum(1 for number, answer in answers.items() if expected.get(number) != answer)
+
+    count = len(pdf_files)
+    print()
+    print(f"正解表（画像のみ、{count}件・{expected_total}問）")
+    print(f"{'方式':<20}{'秒/件':>10}{'一致':>8}{'誤り':>8}")
+    for name, (seconds, hits, errors) in totals.items():
+        print(f"{name:<20}{seconds / count:>10.3f}{hits:>8}{errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR前処理のベンチマーク')
+    parser.add_argument('--uploads', default='uploads', help='対象PDFのディレクトリ')
+    parser.add_argument('--pages', type=int, default=2, help='PDFごとに計測するページ数')
+    parser.add_argument('--synthetic', type=int, default=1, help='追加する合成PDFの数（0で省略）')
+    parser.add_argument('--no-answer-key', action='store_true', help='正解表のOCRを計測しない')
+    args = parser.parse_args()
+
+    pytesseract.pytesseract.tesseract_cmd = tesseract_command()
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        print("Tesseractが見つからないため計測できません")
+        return 1
+
+    configure_logging(level=logging.WARNING, log_file=None, console=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_files = sorted(glob.glob(os.path.join(args.uploads, '*.pdf')))
+        for exam in iter_exams(args.synthetic * 50):
+            path = os.path.join(tmp_dir, f"{exam['name']}.pdf")
+            write_exam_pdf(path, exam)
+            pdf_files.append(path)
+
+        targets = collect_pages(pdf_files, args.pages)
+        if not targets:
+            print("計測できるページがありません")
+            return 1
+        print(f"対象: {len(targets)}ページ（{len(pdf_files)}件のPDF）")
+        print()
+        print(f"{'方式':<20}{'ページ/秒':>10}{'一致率':>10}{'信頼度':>10}{'画像(MP)':>10}")
+
+        # 常駐させるOCRエンジンの起動（言語モデルの読み込み）は計測から除く
+        get_ocr_engine().recognize(Image.new('L', (64, 64), 255))
+
+        for name, factory in VARIANTS:
+            run = factory()
+            seconds = 0.0
+            accuracies, confidences, sizes = [], [], []
+            for pdf_file, number in targets:
+                doc = fitz.open(pdf_file)
+                page = doc[number]
+                start = time.perf_counter()
+                text, confidence, size = run(page)
+                seconds += time.perf_counter() - start
+                accuracies.append(char_accuracy(page.get_text(), text))
+                confidences.append(confidence)
+                sizes.append(size)
+                doc.close()
+
+            count = len(targets)
+            if name == 'adaptive':
+                # 採用した解像度の内訳を画像サイズの代わりに表示
+                size_text = f"{sum(1 for dpi in sizes if dpi != OCR_DPI_STEPS[0])}件再試行"
+            else:
+                size_text = f"{sum(sizes) / count / 1e6:.2f}"
+            print(
+                f"{name:<20}{count / seconds:>10.3f}{sum(accuracies) / count:>10.3f}"
+                f"{sum(confidences) / count:>10.1f}{size_text:>10}"
+            )
+
+        # 常駐させたOCRエンジンで全ページを並列にOCR（抽出処理と同じ呼び出し方）
+        engine = get_ocr_engine()
+        expected, sizes = [], []
+
+        def images():
+            for pdf_file, number in targets:
+                doc = fitz.open(pdf_file)
+                image = preprocess_for_ocr(render(doc[number], 200, gray=True))
+                expected.append(doc[number].get_text())
+                sizes.append(image.width * image.height)
+                doc.close()
+                yield image
+
+        start = time.perf_counter()
+        results = [ocr_text_and_confidence(data) for data in engine.map(images())]
+        seconds = time.perf_counter() - start
+        count = len(results)
+        accuracy = sum(char_accuracy(text, result[0]) for text, result in zip(expected, results)) / count
+        confidence = sum(result[1] for result in results) / count
+        print(
+            f"{f'parallel_x{engine.workers}':<20}{count / seconds:>10.3f}{accuracy:>10.3f}"
+            f"{confidence:>10.1f}{sum(sizes) / count / 1e6:>10.2f}"
+        )
+
+        if not args.no_answer_key:
+            get_ocr_engine('eng').recognize(Image.new('L', (64, 64), 255))
+            benchmark_answer_keys(pdf_files)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
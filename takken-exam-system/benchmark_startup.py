@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+起動時間ベンチマーク
+`python -X importtime` でWebアプリ・CLIスクリプトのインポート時間を計測し、
+問題の出題だけを行うプロセスでPDF/OCR関連のライブラリが読み込まれていないかを確認します
+
+使用方法: python benchmark_startup.py [繰り返し回数]
+"""
+
+import os
+import sys
+import re
+import statistics
+import subprocess
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 計測対象のモジュール（いずれもインポートしただけではPDF/OCR関連のライブラリを読み込まない）
+TARGETS = ['app', 'mock_exam', 'check_db', 'pdf_processor', 'reset_and_reprocess', 'question_bank']
+
+# 取り込み時にのみ必要な重いライブラリ
+HEAVY_MODULES = ('fitz', 'pytesseract', 'PIL', 'chardet', 'jaconv')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import(module, rounds):
+    """
+    モジュールのインポート時間を計測
+
+    Returns:
+        (累積インポート時間の中央値[ms], 読み込まれた重いライブラリ, 上位の子モジュール)
+    """
+    totals = []
+    heavy = set()
+    children = {}
+
+    for _ in range(rounds):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"{module} のインポートに失敗しました:\n{result.stderr[-1000:]}")
+
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative_us = int(match.group(2))
+            depth = len(match.group(3)) // 2
+            name = match.group(4)
+
+            if name.split('.')[0] in HEAVY_MODULES:
+                heavy.add(name.split('.')[0])
+            if name == module and depth == 0:
+                totals.append(cumulative_us / 1000)
+            elif depth == 1:
+                children.setdefault(name, []).append(cumulative_us / 1000)
+
+    top_children = sorted(
+        ((name, statistics.median(values)) for name, values in children.items()),
+        key=lambda item: item[1], reverse=True
+    )[:5]
+    return statistics.median(totals), sorted(heavy), top_children
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"繰り返し: {rounds}回（中央値を表示）")
+    print()
+
+    failed = False
+    for module in TARGETS:
+        total_ms, heavy, top_children = measure_import(module, rounds)
+        print(f"{module}: {total_ms:.1f} ms")
+        for name, child_ms in top_children:
+            print(f"    {name:<24}{child_ms:>8.1f} ms")
+        if heavy:
+            print(f"    読み込まれた重いライブラリ: {', '.join(heavy)}")
+            failed = True
+        print()
+
+    if failed:
+        print("⚠️  インポート時にPDF/OCR関連のライブラリが読み込まれています")
+        sys.exit(1)
+    print("✅ PDF/OCR関連のライブラリは取り込み処理の実行時にのみ読み込まれます")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@
 
 import sys
 import os
-from pdf_processor import EnhancedPDFProcessor
+import logging
+from pdf_processor import EnhancedPDFProcessor, configure_logging
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -20,27 +21,27 @@ def debug_extraction():
     # PDF処理器を初期化
     processor = EnhancedPDFProcessor(use_ocr=False)  # OCRは無効にしてテスト
     
-    # テキスト抽出
+    # PDFを解析（テキスト・年度・問題を1回の読み込みで抽出）
     print("=== テキスト抽出開始 ===")
-    text = processor.extract_text_from_pdf(pdf_path)
+    analysis = processor.analyze_pdf(pdf_path)
+    text = analysis.text
     print(f"抽出されたテキスト長: {len(text)}")
     print(f"最初の500文字: {text[:500]}")
     print()
     
     # 年度抽出テスト
     print("=== 年度抽出テスト ===")
-    if hasattr(processor, 'first_page_text'):
-        print(f"第1ページテキスト長: {len(processor.first_page_text)}")
-        print(f"第1ページの最初の200文字: {processor.first_page_text[:200]}")
-        year = processor._extract_exam_year(processor.first_page_text)
-        print(f"抽出された年度: '{year}'")
+    if analysis.page_texts:
+        print(f"第1ページテキスト長: {len(analysis.first_page_text)}")
+        print(f"第1ページの最初の200文字: {analysis.first_page_text[:200]}")
+        print(f"抽出された年度: '{analysis.exam_year}'")
     else:
         print("第1ページテキストが利用できません")
     print()
     
     # 問題抽出テスト
     print("=== 問題抽出テスト ===")
-    questions = processor.extract_questions_from_text(text)
+    questions = analysis.questions
     print(f"抽出された問題数: {len(questions)}")
     
     if questions:
@@ -61,4 +62,5 @@ def debug_extraction():
     print("\n=== デバッグ完了 ===")
 
 if __name__ == "__main__":
+    configure_logging(logging.DEBUG)
     debug_extraction()
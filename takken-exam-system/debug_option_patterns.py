@@ -4,7 +4,8 @@
 import sys
 import os
 import re
-from pdf_processor import EnhancedPDFProcessor
+import logging
+from pdf_processor import EnhancedPDFProcessor, configure_logging
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -63,4 +64,5 @@ def debug_option_patterns():
         print("問1が見つかりませんでした")
 
 if __name__ == "__main__":
+    configure_logging(logging.DEBUG)
     debug_option_patterns()
@@ -4,7 +4,8 @@
 import sys
 import os
 import re
-from pdf_processor import EnhancedPDFProcessor
+import logging
+from pdf_processor import EnhancedPDFProcessor, configure_logging
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -21,9 +22,10 @@ def debug_year_extraction():
     # PDF処理器を初期化
     processor = EnhancedPDFProcessor(use_ocr=False)
     
-    # テキスト抽出
-    full_text = processor.extract_text_from_pdf(pdf_path)
-    first_page_text = processor.first_page_text
+    # PDFを解析
+    analysis = processor.analyze_pdf(pdf_path)
+    full_text = analysis.text
+    first_page_text = analysis.first_page_text
     
     print("=== 年度抽出デバッグ ===")
     print(f"第1ページテキスト長: {len(first_page_text)}")
@@ -50,12 +52,12 @@ def debug_year_extraction():
     print()
     
     # 実際の抽出メソッドをテスト
-    extracted_year = processor._extract_exam_year(first_page_text)
-    print(f"抽出された年度: '{extracted_year}'")
+    print(f"抽出された年度: '{analysis.exam_year}'")
     
     # 全テキストからも試してみる
     extracted_year_full = processor._extract_exam_year(full_text)
     print(f"全テキストから抽出された年度: '{extracted_year_full}'")
 
 if __name__ == "__main__":
+    configure_logging(logging.DEBUG)
     debug_year_extraction()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+年度別の過去問の閲覧
+年度と問題番号で問題を指定し、問1から順にページ単位で表示します。
+ページの移動は (年度, 問題番号, 問題ID) の索引をたどるキーセット方式で行うため、
+後ろのページでも読み飛ばす行はなく、1ページの表示は索引の1回の検索で済みます
+"""
+
+import json
+from typing import Dict, List, Optional
+
+# 1ページあたりの問題数
+EXAM_PAGE_SIZE = 10
+
+
+def init_exam_index(cursor):
+    """年度・問題番号の索引を作成（問題IDは索引に含まれるため、同じ番号の問題の順序にも使える）"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_year_number ON questions (year, question_number)')
+
+
+def get_exam_page(cursor, year: str, number: int, start_id: int = 0, page_size: int = EXAM_PAGE_SIZE) -> Dict[str, any]:
+    """
+    年度の問題を、問題番号 number（同じ番号の問題が複数ある場合は問題ID start_id 以降）から1ページ分取得
+
+    1年度に複数回の試験がある場合（令和2年・令和3年の10月試験と12月試験など）は、同じ問題番号の問題が
+    問題ID順に並びます
+
+    Returns:
+        {'year': 年度, 'questions': [問題],
+         'next': 次のページの先頭 (問題番号, 問題ID) または None, 'prev': 前のページの先頭 または None}
+    """
+    # 次のページの先頭を知るため、1問多く読み込む
+    cursor.execute('''
+        SELECT id, question_text, options, correct_answer, genre, question_number
+        FROM questions
+        WHERE year = ? AND (question_number, id) >= (?, ?)
+        ORDER BY question_number, id
+        LIMIT ?
+    ''', (year, number, start_id, page_size + 1))
+    rows = cursor.fetchall()
+
+    questions = []
+    for question_id, text, options, answer, genre, question_number in rows[:page_size]:
+        try:
+            options = json.loads(options) if options else []
+        except (json.JSONDecodeError, TypeError):
+            options = []
+        questions.append({
+            'id': question_id,
+            'question_text': text,
+            'options': options,
+            'correct_answer': answer,
+            'genre': genre,
+            'question_number': question_number,
+        })
+
+    next_key = (rows[page_size][5], rows[page_size][0]) if len(rows) > page_size else None
+    return {
+        'year': year,
+        'questions': questions,
+        'next': next_key,
+        'prev': _previous_page_start(cursor, year, number, start_id, page_size),
+    }
+
+
+def _previous_page_start(cursor, year: str, number: int, start_id: int, page_size: int) -> Optional[tuple]:
+    """前のページの先頭 (問題番号, 問題ID)（索引のみを逆順にたどる）"""
+    cursor.execute('''
+        SELECT question_number, id
+        FROM questions
+        WHERE year = ? AND (question_number, id) < (?, ?)
+        ORDER BY question_number DESC, id DESC
+        LIMIT ?
+    ''', (year, number, start_id, page_size))
+    keys = cursor.fetchall()
+    return tuple(keys[-1]) if keys else None
+
+
+def list_exam_years(question_counts: Dict[str, any]) -> List[str]:
+    """閲覧できる年度（question_stats.get_question_counts の年度別集計から、新しい順）"""
+    return [year for year in question_counts['year'] if year]
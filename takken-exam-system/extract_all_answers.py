@@ -5,8 +5,8 @@ import sys
 import os
 import re
 import sqlite3
-import jaconv
-import fitz  # PyMuPDF
+from pdf_processor import extract_answer_key, read_last_page_text, ANSWER_KEY_PATTERNS
+from question_stats import init_count_tables, get_question_counts
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -19,52 +19,19 @@ def extract_all_answers_from_pdf(pdf_path):
         print(f"PDFファイルが見つかりません: {pdf_path}")
         return {}
     
-    # 最終ページのテキストを抽出
-    doc = fitz.open(pdf_path)
-    last_page_num = len(doc) - 1
-    last_page = doc[last_page_num]
-    last_page_text = last_page.get_text()
-    doc.close()
+    # 最終ページのみを読む（テキストがない場合は正解表の範囲のみをOCR）
+    answers = extract_answer_key(pdf_path)
+    last_page_text = read_last_page_text(pdf_path)
     
     print(f"=== {pdf_path} から全正解を抽出中 ===")
-    print(f"最終ページ（ページ {last_page_num + 1}）のテキスト長: {len(last_page_text)}")
-    
-    # 正解パターンを検索（より包括的に）
-    answer_patterns = [
-        # (1) １ や (1) 1 のような括弧付き番号形式（最も一般的）
-        r'\((\d+)\)\s*([1-4１-４])',
-        # 問1 １ のような形式
-        r'問(\d+)\s*([1-4１-４])',
-        # 1. １ のような形式
-        r'(\d+)[.．]\s*([1-4１-４])',
-        # 番号 正解 の表形式（改行を含む）
-        r'(\d+)\s*\n\s*([1-4１-４])',
-    ]
-    
-    answers = {}
-    best_pattern = None
-    max_matches = 0
-    
-    # 全パターンを試して最も多くマッチするものを選択
-    for i, pattern in enumerate(answer_patterns):
-        matches = re.findall(pattern, last_page_text, re.MULTILINE | re.DOTALL)
+    print(f"最終ページのテキスト長: {len(last_page_text)}")
+    
+    # パターンごとのマッチ数（最も多くマッチしたものが採用される）
+    for i, pattern in enumerate(ANSWER_KEY_PATTERNS):
+        matches = re.findall(pattern, last_page_text, re.MULTILINE)
         print(f"パターン {i+1} '{pattern}': {len(matches)} 件")
-        
-        if len(matches) > max_matches:
-            max_matches = len(matches)
-            best_pattern = i
-            answers = {}
-            
-            for match in matches:
-                question_num = int(match[0])
-                answer = match[1]
-                # 全角数字を半角に変換
-                answer = jaconv.z2h(answer, digit=True)
-                answers[question_num] = answer
-    
-    if best_pattern is not None:
-        print(f"採用パターン: {best_pattern + 1} ({max_matches} 件)")
-        
+    
+    if answers:
         # 抽出結果の詳細表示
         sorted_answers = sorted(answers.items())
         print("抽出された正解:")
@@ -156,28 +123,21 @@ def verify_final_results():
     conn = sqlite3.connect('takken_exam.db')
     cursor = conn.cursor()
     
-    # 正解データが設定された問題数を確認
-    cursor.execute('''
-        SELECT year, COUNT(*) as count
-        FROM questions 
-        WHERE correct_answer IS NOT NULL AND correct_answer != ''
-        GROUP BY year
-        ORDER BY year DESC
-    ''')
-    
-    results = cursor.fetchall()
+    # 正解データが設定された問題数を確認（集計テーブルから）
+    init_count_tables(cursor)
+    conn.commit()
+    counts = get_question_counts(cursor)
     
     print(f"\n=== 最終的な正解データ設定状況 ===")
-    total_with_answers = 0
-    for year, count in results:
-        print(f"{year}: {count}問")
-        total_with_answers += count
+    for year, (_, answered) in counts['year'].items():
+        if answered:
+            print(f"{year}: {answered}問")
     
+    total_with_answers = counts['answered']
     print(f"\n正解データありの総問題数: {total_with_answers}問")
     
     # 全体の問題数も確認
-    cursor.execute('SELECT COUNT(*) FROM questions')
-    total_questions = cursor.fetchone()[0]
+    total_questions = counts['total']
     print(f"データベース内の総問題数: {total_questions}問")
     
     # カバー率を計算
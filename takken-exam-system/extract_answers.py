@@ -3,8 +3,7 @@
 
 import sys
 import os
-import re
-from pdf_processor import EnhancedPDFProcessor
+from pdf_processor import extract_answer_key, read_last_page_text
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -17,52 +16,23 @@ def extract_answer_key_from_pdf(pdf_path):
         print(f"PDFファイルが見つかりません: {pdf_path}")
         return {}
     
-    # PDF処理器を初期化
-    processor = EnhancedPDFProcessor(use_ocr=False)
+    # 最終ページのみを読む（テキストがない場合は正解表の範囲のみをOCR）
+    answers = extract_answer_key(pdf_path)
+    last_page_text = read_last_page_text(pdf_path)
     
-    # 最終ページのテキストを抽出
-    import fitz  # PyMuPDF
-    doc = fitz.open(pdf_path)
-    last_page_num = len(doc) - 1
-    last_page = doc[last_page_num]
-    last_page_text = last_page.get_text()
-    doc.close()
-    
-    print(f"=== {pdf_path} の最終ページ（ページ {last_page_num + 1}）===")
+    print(f"=== {pdf_path} の最終ページ ===")
     print(f"テキスト長: {len(last_page_text)}")
     print("最終ページの内容:")
     print(last_page_text[:1500])  # 最初の1500文字を表示
     print("=" * 50)
     
-    # 正解パターンを検索（表形式に対応）
-    answer_patterns = [
-        # (1) １ や (1) 1 のような括弧付き番号形式
-        r'\((\d+)\)\s*([1-4１-４])',
-        # 問1 A、問2 B のような形式
-        r'問(\d+)\s*([A-E1-4])',
-        # 1. A、2. B のような形式
-        r'(\d+)[.．]\s*([A-E1-4])',
-        # 番号 正解 のような表形式
-        r'(\d+)\s+([A-E1-4])',
-        # 【問1】A のような形式
-        r'【問(\d+)】\s*([A-E1-4])',
-    ]
-    
-    answers = {}
-    
-    for i, pattern in enumerate(answer_patterns):
-        matches = re.findall(pattern, last_page_text, re.MULTILINE)
-        if matches:
-            print(f"\nパターン {i+1} '{pattern}' で {len(matches)} 件の正解を発見:")
-            for match in matches[:10]:  # 最初の10件を表示
-                question_num = int(match[0])
-                answer = match[1]
-                answers[question_num] = answer
-                print(f"  問{question_num}: {answer}")
-            
-            if len(matches) > 10:
-                print(f"  ... 他 {len(matches) - 10} 件")
-            break
+    if answers:
+        sorted_answers = sorted(answers.items())
+        print(f"\n{len(sorted_answers)} 件の正解を発見:")
+        for question_num, answer in sorted_answers[:10]:  # 最初の10件を表示
+            print(f"  問{question_num}: {answer}")
+        if len(sorted_answers) > 10:
+            print(f"  ... 他 {len(sorted_answers) - 10} 件")
     
     if not answers:
         print("正解データが見つかりませんでした。")
@@ -3,10 +3,8 @@
 
 import sys
 import os
-import re
 import sqlite3
-import jaconv
-import fitz  # PyMuPDF
+from pdf_processor import extract_answer_key, read_last_page_text
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -19,50 +17,22 @@ def extract_answer_key_from_pdf(pdf_path):
         print(f"PDFファイルが見つかりません: {pdf_path}")
         return {}
     
-    # 最終ページのテキストを抽出
-    doc = fitz.open(pdf_path)
-    last_page_num = len(doc) - 1
-    last_page = doc[last_page_num]
-    last_page_text = last_page.get_text()
-    doc.close()
+    # 最終ページのみを読む（テキストがない場合は正解表の範囲のみをOCR）
+    answers = extract_answer_key(pdf_path)
+    last_page_text = read_last_page_text(pdf_path)
     
     print(f"=== {pdf_path} から正解を抽出中 ===")
-    print(f"最終ページ（ページ {last_page_num + 1}）のテキスト長: {len(last_page_text)}")
+    print(f"最終ページのテキスト長: {len(last_page_text)}")
     
     # デバッグ用: 最終ページの内容を一部表示
     print("最終ページの内容（先頭500文字）:")
     print(last_page_text[:500])
     print("=" * 50)
     
-    # 正解パターンを検索（表形式に対応）
-    answer_patterns = [
-        # (1) １ や (1) 1 のような括弧付き番号形式
-        r'\((\d+)\)\s*([1-4１-４])',
-        # 問1 １ のような形式
-        r'問(\d+)\s*([1-4１-４])',
-        # 1. １ のような形式
-        r'(\d+)[.．]\s*([1-4１-４])',
-    ]
-    
-    answers = {}
-    
-    for i, pattern in enumerate(answer_patterns):
-        matches = re.findall(pattern, last_page_text, re.MULTILINE)
-        if matches:
-            print(f"パターン {i+1} '{pattern}' で {len(matches)} 件の正解を発見")
-            for match in matches[:10]:  # 最初の10件を表示
-                question_num = int(match[0])
-                answer = match[1]
-                # 全角数字を半角に変換
-                answer = jaconv.z2h(answer, digit=True)
-                answers[question_num] = answer
-                print(f"  問{question_num}: {answer}")
-            
-            if len(matches) > 10:
-                print(f"  ... 他 {len(matches) - 10} 件")
-            
-            if len(matches) >= 40:  # 40問以上あれば採用
-                break
+    for question_num, answer in sorted(answers.items())[:10]:  # 最初の10件を表示
+        print(f"  問{question_num}: {answer}")
+    if len(answers) > 10:
+        print(f"  ... 他 {len(answers) - 10} 件")
     
     print(f"抽出された正解数: {len(answers)}")
     return answers
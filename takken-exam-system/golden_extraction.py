@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽出精度のゴールデンテスト
+現在のデータベース（takken_exam.db）の問題文・選択肢・正解をPDFごとに正解データとして保存し、
+同梱のPDFから抽出し直した結果と比較して、問題・選択肢の適合率（precision）と再現率（recall）、
+正解表・年度の一致率、処理時間を表示します。抽出処理の変更で精度が下がっていないかの確認に使用します
+
+使用方法:
+    python golden_extraction.py build [--db takken_exam.db]   # 正解データを作成
+    python golden_extraction.py check [--min-score 1.0]        # 抽出し直して比較
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from typing import Dict, List, Set, Tuple
+
+from pdf_processor import analyze_pdf, configure_logging
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 正解データのファイル
+DEFAULT_GOLDEN = 'extraction_golden.json'
+
+
+def normalize(text: str) -> str:
+    """比較用に空白を除去（改行位置やPDFのレイアウトによる空白の違いを無視する）"""
+    return re.sub(r'\s+', '', text or '')
+
+
+def build_golden(db_path: str, upload_folder: str) -> List[Dict[str, any]]:
+    """
+    データベースの問題をPDFごとにまとめた正解データを作成
+
+    Returns:
+        [{'file': PDFファイル名, 'year': 年度, 'questions': [...]}, ...]（PDFが見つからないものは除外）
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, file_path FROM pdf_files ORDER BY id')
+    pdf_files = cursor.fetchall()
+
+    golden = []
+    for pdf_id, file_path in pdf_files:
+        # Windows環境で登録されたパスにも対応
+        file_name = file_path.replace('\\', '/').rsplit('/', 1)[-1]
+        if not os.path.exists(os.path.join(upload_folder, file_name)):
+            print(f"PDFが見つからないためスキップ: {file_name}")
+            continue
+
+        cursor.execute('''
+            SELECT question_number, question_text, options, correct_answer, genre, year
+            FROM questions
+            WHERE pdf_id = ?
+            ORDER BY question_number
+        ''', (pdf_id,))
+        questions = []
+        years = set()
+        for number, text, options, answer, genre, year in cursor.fetchall():
+            try:
+                options = json.loads(options) if options else []
+            except (json.JSONDecodeError, TypeError):
+                options = []
+            questions.append({
+                'question_number': number,
+                'question_text': text,
+                'options': options,
+                'correct_answer': answer or '',
+                'genre': genre,
+            })
+            years.add(year or '')
+
+        if questions:
+            golden.append({'file': file_name, 'year': sorted(years)[0], 'questions': questions})
+
+    conn.close()
+    return golden
+
+
+def question_keys(questions: List[Dict[str, any]]) -> Set[Tuple[int, str]]:
+    return {(q['question_number'], normalize(q['question_text'])) for q in questions}
+
+
+def option_keys(questions: List[Dict[str, any]]) -> Set[Tuple[int, int, str]]:
+    return {
+        (q['question_number'], index, normalize(option))
+        for q in questions
+        for index, option in enumerate(q.get('options', []))
+    }
+
+
+def score(expected: Set, actual: Set) -> Tuple[int, int, int]:
+    """(一致件数, 正解データの件数, 抽出結果の件数)"""
+    return len(expected & actual), len(expected), len(actual)
+
+
+def ratio(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator else 1.0
+
+
+def check_golden(golden: List[Dict[str, any]], upload_folder: str) -> Dict[str, any]:
+    """
+    同梱のPDFから抽出し直して正解データと比較
+
+    Returns:
+        全体の集計（適合率・再現率・一致率・処理時間）
+    """
+    totals = {
+        'questions': [0, 0, 0], 'options': [0, 0, 0],
+        'answers': [0, 0], 'genres': [0, 0], 'years': [0, 0], 'seconds': 0.0,
+    }
+
+    print(f"{'PDF':<32}{'問題P':>8}{'問題R':>8}{'選択肢P':>9}{'選択肢R':>9}{'正解':>8}{'年度':>6}{'秒':>8}")
+    for entry in golden:
+        start = time.perf_counter()
+        analysis = analyze_pdf(os.path.join(upload_folder, entry['file']), use_ocr=False)
+        seconds = time.perf_counter() - start
+
+        expected = entry['questions']
+        actual = analysis.questions
+        q_score = score(question_keys(expected), question_keys(actual))
+        o_score = score(option_keys(expected), option_keys(actual))
+
+        answer_total = sum(1 for q in expected if q['correct_answer'])
+        answer_hits = sum(
+            1 for q in expected
+            if q['correct_answer'] and analysis.answers.get(q['question_number']) == q['correct_answer']
+        )
+
+        actual_genres = {q['question_number']: q['genre'] for q in actual}
+        genre_hits = sum(1 for q in expected if actual_genres.get(q['question_number']) == q['genre'])
+
+        year_hit = int(analysis.exam_year == entry['year'])
+
+        for i in range(3):
+            totals['questions'][i] += q_score[i]
+            totals['options'][i] += o_score[i]
+        totals['answers'][0] += answer_hits
+        totals['answers'][1] += answer_total
+        totals['genres'][0] += genre_hits
+        totals['genres'][1] += len(expected)
+        totals['years'][0] += year_hit
+        totals['years'][1] += 1
+        totals['seconds'] += seconds
+
+        print(
+            f"{entry['file']:<32}"
+            f"{ratio(q_score[0], q_score[2]):>8.3f}{ratio(q_score[0], q_score[1]):>8.3f}"
+            f"{ratio(o_score[0], o_score[2]):>9.3f}{ratio(o_score[0], o_score[1]):>9.3f}"
+            f"{ratio(answer_hits, answer_total):>8.3f}{'OK' if year_hit else 'NG':>6}{seconds:>8.3f}"
+        )
+
+    questions, options = totals['questions'], totals['options']
+    return {
+        'question_precision': ratio(questions[0], questions[2]),
+        'question_recall': ratio(questions[0], questions[1]),
+        'option_precision': ratio(options[0], options[2]),
+        'option_recall': ratio(options[0], options[1]),
+        'answer_accuracy': ratio(*totals['answers']),
+        'genre_accuracy': ratio(*totals['genres']),
+        'year_accuracy': ratio(*totals['years']),
+        'seconds': totals['seconds'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='抽出精度のゴールデンテスト')
+    parser.add_argument('--golden', default=DEFAULT_GOLDEN, help='正解データのファイル')
+    parser.add_argument('--uploads', default='uploads', help='PDFのディレクトリ')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='データベースから正解データを作成')
+    build_parser.add_argument('--db', default='takken_exam.db', help='正解データの元にするデータベース')
+
+    check_parser = subparsers.add_parser('check', help='抽出し直して正解データと比較')
+    check_parser.add_argument('--min-score', type=float, default=None,
+                              help='問題・選択肢の適合率・再現率と正解表の一致率の下限（省略時は正解データ作成時の値）')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        golden = build_golden(args.db, args.uploads)
+        configure_logging(level=logging.WARNING, log_file=None, console=False)
+        baseline = check_golden(golden, args.uploads)
+        with open(args.golden, 'w', encoding='utf-8') as f:
+            json.dump({'baseline': baseline, 'pdfs': golden}, f, ensure_ascii=False, indent=1)
+        count = sum(len(entry['questions']) for entry in golden)
+        print(f"\n{len(golden)}件のPDF・{count}問の正解データを {args.golden} に保存しました")
+        return 0
+
+    with open(args.golden, encoding='utf-8') as f:
+        data = json.load(f)
+
+    configure_logging(level=logging.WARNING, log_file=None, console=False)
+    result = check_golden(data['pdfs'], args.uploads)
+    baseline = data.get('baseline', {})
+
+    print()
+    print(f"{'指標':<22}{'正解データ作成時':>16}{'今回':>10}")
+    failed = []
+    for key in ('question_precision', 'question_recall', 'option_precision', 'option_recall',
+                'answer_accuracy', 'genre_accuracy', 'year_accuracy'):
+        before = baseline.get(key)
+        limit = args.min_score if args.min_score is not None else before
+        mark = ''
+        if limit is not None and result[key] < limit - 1e-9:
+            mark = ' ← 低下'
+            failed.append(key)
+        before_text = f"{before:.3f}" if before is not None else '-'
+        print(f"{key:<22}{before_text:>16}{result[key]:>10.3f}{mark}")
+    before_seconds = baseline.get('seconds')
+    before_text = f"{before_seconds:.3f}" if before_seconds is not None else '-'
+    print(f"{'seconds':<22}{before_text:>16}{result['seconds']:>10.3f}")
+
+    print()
+    if failed:
+        print(f"精度が低下しました: {', '.join(failed)}")
+        return 1
+    print("精度は維持されています")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
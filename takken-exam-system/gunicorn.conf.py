@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+gunicorn の設定（gunicorn -c gunicorn.conf.py wsgi:application）
+
+環境変数で調整できます:
+    PORT: 待ち受けポート（既定 5000）
+    WEB_CONCURRENCY: ワーカープロセス数（既定 CPUコア数 × 2 + 1）
+    WEB_THREADS: ワーカーあたりのスレッド数（既定 4）
+"""
+
+import os
+import glob
+import tempfile
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# gthread ワーカーの timeout はリクエストの処理時間ではなく、ワーカーの応答（ハートビート）の監視に使われる。
+# PDFの取り込み・OCRは取り込みプール（ingest_pool.py）の別プロセスで行い、リクエストは待たないため既定値のまま
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# マスタープロセスでアプリを読み込み、DB初期化を1回だけ実行してからワーカーを起動
+# （マスターで起動したログ書き込みスレッドは fork で引き継がれないため、各ワーカーで
+#   pdf_processor が os.register_at_fork のフックで起動し直す）
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+# 全ワーカーのメトリクスを /metrics でまとめて返すためのディレクトリ
+# （preload_app ではフックより先にアプリが読み込まれるため、設定ファイルの読み込み時に準備する）
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'takken_exam_metrics')
+)
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+    # 前回起動時のメトリクスを削除
+    os.remove(path)
+
+
+def child_exit(server, worker):
+    """終了したワーカーのメトリクスを集計対象から外す"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
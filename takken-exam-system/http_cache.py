@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTPキャッシュと圧縮
+ページのETag（問題バンクのバージョンとテンプレートから作成）による条件付きリクエストへの対応と、
+レスポンスのgzip / brotli圧縮を行います
+
+ETagが一致した場合はテンプレートを描画せずに304を返すため、変更のないページの再表示では
+問題の読み込みもHTMLの生成も行いません
+"""
+
+import os
+import gzip
+import hashlib
+from typing import Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    # brotliがインストールされていない環境ではgzipのみを使用
+    brotli = None
+
+# レスポンスを圧縮するかどうか（環境変数 HTTP_COMPRESSION=0 で無効、リバースプロキシで圧縮する場合など）
+HTTP_COMPRESSION = os.environ.get('HTTP_COMPRESSION', '1') != '0'
+
+# 圧縮する最小サイズ（バイト、これより小さいレスポンスは圧縮しても効果が小さい）
+COMPRESS_MIN_BYTES = 1024
+
+# 圧縮するレスポンスの種類
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+
+# 圧縮レベル（リクエストごとに圧縮するため、圧縮率よりも速度を優先）
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# ETagを付けたページのCache-Control（ブラウザは保存するが、表示のたびにETagで確認する）
+PAGE_CACHE_CONTROL = 'no-cache'
+
+
+def template_fingerprint(template_dir: str) -> str:
+    """テンプレートの内容のハッシュ（テンプレートを変更したらETagも変わるように、ETagに含める）"""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(template_dir)):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(name.encode('utf-8'))
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def make_etag(*parts) -> str:
+    """ページを特定する値（問題バンクのバージョン・URLなど）からETagを作成"""
+    return hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """ブラウザのキャッシュが最新の場合は304のレスポンス（本文なし）、それ以外はNone"""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
+
+def cacheable(response: Response, etag: Optional[str]) -> Response:
+    """描画したページにETagとCache-Controlを設定（圧縮するため弱いETagにする）"""
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
+
+def _choose_encoding(accept_encodings) -> Optional[str]:
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    """Accept-Encodingに応じてレスポンスをbrotliまたはgzipで圧縮"""
+    if (
+        not HTTP_COMPRESSION
+        or response.status_code != 200
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or (response.is_streamed and not response.direct_passthrough)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding is None or request.method == 'HEAD':
+        return response
+
+    # 静的ファイル（send_fileの応答）はファイルを読み込んで圧縮する
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+
+    # 圧縮前と内容が異なるため、強いETagは弱いETagにする
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def no_store(response: Response) -> Response:
+    """ブラウザに保存させない（表示のたびに内容が変わるページ）"""
+    response.headers['Cache-Control'] = 'no-store'
+    return response
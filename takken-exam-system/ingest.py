@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+取り込み処理の共通モジュール
+PDFファイルの登録と抽出した問題のデータベース保存を行います
+
+PDFごとに抽出時の情報（抽出処理のバージョン・設定・抽出したPDFのハッシュ）を記録し、
+抽出し直すときは情報が古いPDFのみを対象に、問題を1トランザクションで置き換えます
+"""
+
+import os
+import re
+import json
+import hashlib
+from typing import List, Dict, Optional
+
+from metrics import stage_timer
+from pdf_processor import EXTRACTOR_VERSION, extraction_options
+
+# ハッシュ計算時の読み込み単位
+HASH_CHUNK_SIZE = 1024 * 1024
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def init_ingest_columns(cursor):
+    """pdf_files にハッシュと抽出時の情報の列を追加（既存のデータベース用）"""
+    cursor.execute('PRAGMA table_info(pdf_files)')
+    columns = {row[1] for row in cursor.fetchall()}
+    for column in ('content_hash', 'extractor_version', 'extractor_options', 'extracted_hash'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE pdf_files ADD COLUMN {column} TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_pdf_number ON questions (pdf_id, question_number)')
+
+
+def hash_file(file_path: str) -> str:
+    """ファイルのSHA-256（チャンク単位で読み込む）"""
+    content_hash = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def resolve_pdf_path(file_path: str) -> Optional[str]:
+    """登録されたパスのPDFを探す（Windows環境で登録された区切り文字にも対応、見つからない場合はNone）"""
+    for path in (file_path, file_path.replace('\\', '/')):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_pdf_by_hash(cursor, content_hash: str) -> Optional[int]:
+    """
+    同じ内容のPDFが登録済みであればそのIDを返す
+
+    抽出に失敗したPDFはハッシュを消しておく（forget_pdf_hash）ため、同じPDFをアップロードし直せば
+    もう一度取り込みます
+    """
+    cursor.execute('SELECT id FROM pdf_files WHERE content_hash = ? LIMIT 1', (content_hash,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def save_pdf_record(cursor, filename: str, original_name: str, file_path: str, content_hash: Optional[str]) -> int:
+    """PDFファイルを登録してIDを返す"""
+    cursor.execute('''
+        INSERT INTO pdf_files (filename, original_name, file_path, content_hash)
+        VALUES (?, ?, ?, ?)
+    ''', (filename, original_name, file_path, content_hash))
+    return cursor.lastrowid
+
+
+def forget_pdf_hash(cursor, pdf_id: int):
+    """抽出に失敗したPDFのハッシュを消す（問題のないPDFを、再アップロード時に重複として扱わないため）"""
+    cursor.execute('UPDATE pdf_files SET content_hash = NULL WHERE id = ?', (pdf_id,))
+
+
+def record_extraction(cursor, pdf_id: int, use_ocr: bool = True, content_hash: Optional[str] = None):
+    """
+    PDFの抽出時の情報を記録
+
+    Args:
+        use_ocr: 抽出時にOCRを有効にしていたか
+        content_hash: 抽出したPDFのハッシュ（省略時は登録時のハッシュ）
+    """
+    cursor.execute('''
+        UPDATE pdf_files
+        SET extractor_version = ?, extractor_options = ?,
+            content_hash = COALESCE(?, content_hash), extracted_hash = COALESCE(?, content_hash)
+        WHERE id = ?
+    ''', (EXTRACTOR_VERSION, extraction_options(use_ocr), content_hash, content_hash, pdf_id))
+
+
+def stale_reason(row, content_hash: str, use_ocr: bool = True) -> Optional[str]:
+    """
+    抽出し直す必要があればその理由を返す
+
+    Args:
+        row: pdf_files の (extractor_version, extractor_options, extracted_hash)
+        content_hash: 現在のPDFのハッシュ
+    """
+    version, options, extracted_hash = row
+    if version is None:
+        return '抽出時の情報なし'
+    if version != EXTRACTOR_VERSION:
+        return f'抽出処理のバージョン {version} → {EXTRACTOR_VERSION}'
+    if options != extraction_options(use_ocr):
+        return '抽出の設定が変更'
+    if extracted_hash != content_hash:
+        return 'PDFの内容が変更'
+    return None
+
+
+def replace_questions(conn, pdf_id: int, questions: List[Dict[str, any]],
+                      use_ocr: bool = True, content_hash: Optional[str] = None) -> Dict[str, int]:
+    """
+    抽出し直した問題でPDF1件分の問題を置き換える
+
+    問題番号が同じ問題は行（ID）を残したまま問題文・選択肢・ジャンル・年度を更新します
+    （模擬試験に記録した問題IDも有効なまま）。問題文が空白の違い以上に変わった場合は、
+    問題番号のずれなどで別の問題になった可能性があるため、正解と解説を消します。
+    新しい問題番号は追加し、抽出されなくなった問題は削除します。
+    抽出時の情報の記録までを1トランザクションで行うため、読み込み側からは置き換え前か
+    置き換え後のどちらかのみが見えます
+
+    Returns:
+        {'inserted': 追加, 'updated': 更新, 'unchanged': 変更なし, 'deleted': 削除,
+         'answers_cleared': 問題文が変わったため正解を消した問題} の件数
+    """
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'answers_cleared': 0}
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute('''
+            SELECT id, question_number, question_text, options, genre, year, correct_answer
+            FROM questions
+            WHERE pdf_id = ?
+            ORDER BY question_number, id
+        ''', (pdf_id,))
+        existing = {}
+        for row in cursor.fetchall():
+            existing.setdefault(row[1], []).append(row)
+
+        with stage_timer('db_write'):
+            for question in questions:
+                values = (
+                    question['question_text'],
+                    json.dumps(question.get('options', []), ensure_ascii=False),
+                    question['genre'],
+                    question.get('year', ''),
+                )
+                rows = existing.get(question['question_number'])
+                if not rows:
+                    cursor.execute(
+                        "INSERT INTO questions (pdf_id, question_number, question_text, options, genre, year) VALUES (?, ?, ?, ?, ?, ?)",
+                        (pdf_id, question['question_number']) + values
+                    )
+                    counts['inserted'] += 1
+                    continue
+                row = rows.pop(0)
+                if tuple(row[2:6]) == values:
+                    counts['unchanged'] += 1
+                    continue
+                if WHITESPACE.sub('', row[2] or '') != WHITESPACE.sub('', question['question_text']):
+                    cursor.execute(
+                        '''UPDATE questions SET question_text = ?, options = ?, genre = ?, year = ?,
+                                  correct_answer = NULL, explanation = NULL
+                           WHERE id = ?''',
+                        values + (row[0],)
+                    )
+                    counts['answers_cleared'] += bool(row[6])
+                else:
+                    cursor.execute(
+                        'UPDATE questions SET question_text = ?, options = ?, genre = ?, year = ? WHERE id = ?',
+                        values + (row[0],)
+                    )
+                counts['updated'] += 1
+
+            stale_ids = [row[0] for rows in existing.values() for row in rows]
+            for question_id in stale_ids:
+                cursor.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+            counts['deleted'] = len(stale_ids)
+
+            record_extraction(cursor, pdf_id, use_ocr, content_hash)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return counts
+
+
+def save_questions(cursor, pdf_id: int, questions: List[Dict[str, any]]):
+    """抽出した問題をデータベースに保存"""
+    with stage_timer('db_write'):
+        for question in questions:
+            # オプションをJSON形式で保存
+            options_json = json.dumps(question.get('options', []), ensure_ascii=False)
+
+            cursor.execute(
+                "INSERT INTO questions (pdf_id, question_number, question_text, genre, options, year) VALUES (?, ?, ?, ?, ?, ?)",
+                (pdf_id, question['question_number'], question['question_text'], question['genre'], options_json, question.get('year', ''))
+            )
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽出ワーカープールモジュール
+PDF1件ごとの処理時間・CPU時間・メモリ使用量（RSS）に上限を設けてワーカープロセスで抽出を実行します
+
+ワーカーの監視は親プロセスのスレッドから psutil で行い、上限を超えたワーカーはそのPDFの処理中でも
+強制終了して BudgetExceeded で失敗させます。失敗したワーカーは次のPDFの処理前に起動し直すため、
+正規表現の暴走や想定外に大きなPDFのOCRがあっても、後に続くPDFの取り込みは止まりません
+
+処理待ちのPDFは、テキストレイヤーのあるもの（数秒で終わる）をOCRが必要なものより先に処理し、
+OCRが必要なものは同時に INGEST_OCR_SLOTS 件までに制限します。2件目以降は、システム全体のCPU使用率と
+空きメモリに余裕がある場合のみ開始します（問題の出題などWebの応答を遅くしないため）。
+ワーカープロセスは優先度を下げて起動し、INGEST_IDLE_SECONDS の間処理がなければ終了します
+
+同時実行数の枠は SharedSlots（SQLiteのテーブル）で数えるため、gunicorn のワーカープロセスごとに
+プールがあっても、上限と「1件目は負荷に関係なく開始する」判定はホスト全体で1つです
+"""
+
+import os
+import sys
+import time
+import heapq
+import sqlite3
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple
+
+import psutil
+
+from metrics import INGEST_BUDGET_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+# PDF1件あたりの上限（環境変数で変更可能、0で無制限）
+#   INGEST_WALL_SECONDS: 経過時間（秒） / INGEST_CPU_SECONDS: CPU時間（秒、OCRの子プロセスを含む）
+#   INGEST_RSS_MB: メモリ使用量（MB、OCRの子プロセスを含む）
+INGEST_WALL_SECONDS = float(os.environ.get('INGEST_WALL_SECONDS', 600))
+INGEST_CPU_SECONDS = float(os.environ.get('INGEST_CPU_SECONDS', 600))
+INGEST_RSS_MB = float(os.environ.get('INGEST_RSS_MB', 1536))
+
+# ワーカーの使用量を確認する間隔（秒）
+WATCHDOG_INTERVAL = 0.5
+
+# 同時に処理するOCRが必要なPDFの数（環境変数 INGEST_OCR_SLOTS で変更可能、0で同時実行数の半分）
+INGEST_OCR_SLOTS = int(os.environ.get('INGEST_OCR_SLOTS', 0))
+
+# 2件目以降の処理を開始する条件（システム全体のCPU使用率（%）が上限未満、かつ空きメモリ（MB）が下限以上）
+INGEST_MAX_CPU_PERCENT = float(os.environ.get('INGEST_MAX_CPU_PERCENT', 85))
+INGEST_MIN_FREE_MB = float(os.environ.get('INGEST_MIN_FREE_MB', 512))
+
+# システムの負荷を確認する間隔（秒）
+ADMISSION_INTERVAL = 1.0
+
+# ワーカープロセスの優先度（nice値、Windowsでは「通常以下」）
+INGEST_NICE = int(os.environ.get('INGEST_NICE', 10))
+
+# 処理のないワーカープロセスを終了するまでの秒数（環境変数 INGEST_IDLE_SECONDS で変更可能、0で終了しない）
+INGEST_IDLE_SECONDS = float(os.environ.get('INGEST_IDLE_SECONDS', 60))
+
+
+# IngestPool._take() の戻り値（処理のないワーカーを終了する）
+_IDLE = object()
+
+
+class BudgetExceeded(Exception):
+    """PDF1件の処理が上限を超えたため、ワーカーを強制終了した"""
+
+    def __init__(self, resource: str, message: str):
+        super().__init__(message)
+        self.resource = resource
+
+
+class WorkerDied(Exception):
+    """ワーカープロセスが処理の途中で終了した"""
+
+
+def _lower_priority():
+    """ワーカープロセスの優先度を下げる（OCRで起動する tesseract コマンドにも引き継がれる）"""
+    try:
+        if sys.platform.startswith('win'):
+            psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        elif INGEST_NICE:
+            psutil.Process().nice(INGEST_NICE)
+    except psutil.Error as e:
+        logger.warning("ワーカープロセスの優先度を変更できません: %s", e)
+
+
+def _worker_main(conn, initializer: Optional[Callable]):
+    """ワーカープロセスの本体（親から受け取った処理を1件ずつ実行して結果を返す）"""
+    _lower_priority()
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # 結果や例外を親に送れない場合（pickleできない場合）は内容を文字列で返す
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def _usage(process: psutil.Process) -> Tuple[float, int]:
+    """プロセスと子プロセス（tesseract コマンドなど）のCPU時間（秒）とRSS（バイト）の合計"""
+    cpu_times = process.cpu_times()
+    cpu = cpu_times.user + cpu_times.system
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            child_times = child.cpu_times()
+            cpu += child_times.user + child_times.system
+            rss += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return cpu, rss
+
+
+def current_owner() -> Tuple[int, float]:
+    """このプロセスを特定する値（PIDと起動時刻、PIDが再利用されても区別できる）"""
+    return os.getpid(), psutil.Process().create_time()
+
+
+def owner_alive(pid: int, started: float) -> bool:
+    """current_owner() で記録したプロセスが動いているか"""
+    try:
+        return abs(psutil.Process(pid).create_time() - started) < 1.0
+    except psutil.Error:
+        return False
+
+
+def init_slot_table(cursor):
+    """取り込みの枠を共有するテーブルを作成（1行が処理中のPDF1件）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pid INTEGER NOT NULL,
+            started REAL NOT NULL,
+            ocr INTEGER NOT NULL DEFAULT 0,
+            acquired_at REAL NOT NULL
+        )
+    ''')
+
+
+class LocalSlots:
+    """プロセス内だけで数える同時実行数の枠（CLIやテストなど、単独のプロセスで使う場合）"""
+
+    def __init__(self, capacity: int, ocr_slots: int = INGEST_OCR_SLOTS):
+        self.capacity = max(1, capacity)
+        self.ocr_slots = ocr_slots or max(1, self.capacity // 2)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._running_ocr = 0
+
+    def acquire(self, ocr: bool, load_ok: Callable[[], bool]) -> Optional[int]:
+        """
+        枠を1つ取る（取れない場合はNone）
+
+        Args:
+            ocr: OCRが必要なPDFか
+            load_ok: システムの負荷に余裕があるか（ほかに処理中のものがある場合のみ呼び出す）
+        """
+        with self._lock:
+            if self._running >= self.capacity or (ocr and self._running_ocr >= self.ocr_slots):
+                return None
+            # 負荷が高くても1件ずつは処理を進める
+            if self._running and not load_ok():
+                return None
+            self._running += 1
+            self._running_ocr += int(ocr)
+            return int(ocr)
+
+    def release(self, slot: int):
+        with self._lock:
+            self._running -= 1
+            self._running_ocr -= slot
+
+
+class SharedSlots:
+    """
+    ホスト上の全プロセスで共有する同時実行数の枠（ingest_slots テーブル）
+
+    枠を取るときはテーブルをロックして処理中の行を数え、空きがあれば行を追加します。
+    行には枠を取ったプロセスを記録し、異常終了したプロセスの行は次に枠を取るときに削除します
+    """
+
+    def __init__(self, db_path: str, capacity: int, ocr_slots: int = INGEST_OCR_SLOTS):
+        self.db_path = db_path
+        self.capacity = max(1, capacity)
+        self.ocr_slots = ocr_slots or max(1, self.capacity // 2)
+
+    def _remove_dead(self, cursor):
+        cursor.execute('SELECT DISTINCT pid, started FROM ingest_slots')
+        for pid, started in cursor.fetchall():
+            if not owner_alive(pid, started):
+                logger.warning("終了したプロセス（PID %s）の取り込み枠を解放します", pid)
+                cursor.execute('DELETE FROM ingest_slots WHERE pid = ? AND started = ?', (pid, started))
+
+    def acquire(self, ocr: bool, load_ok: Callable[[], bool]) -> Optional[int]:
+        """枠を1つ取る（取れない場合はNone、引数は LocalSlots.acquire と同じ）"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            self._remove_dead(cursor)
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(ocr), 0) FROM ingest_slots')
+            running, running_ocr = cursor.fetchone()
+            if (
+                running >= self.capacity
+                or (ocr and running_ocr >= self.ocr_slots)
+                or (running and not load_ok())
+            ):
+                conn.rollback()
+                return None
+            pid, started = current_owner()
+            cursor.execute(
+                'INSERT INTO ingest_slots (pid, started, ocr, acquired_at) VALUES (?, ?, ?, ?)',
+                (pid, started, int(ocr), time.time())
+            )
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def release(self, slot: int):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('DELETE FROM ingest_slots WHERE id = ?', (slot,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class _Worker:
+    """ワーカープロセス1つ（親プロセス側の窓口）"""
+
+    def __init__(self, context, initializer: Optional[Callable]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.psutil_process = psutil.Process(self.process.pid)
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        """ワーカーと子プロセスを強制終了"""
+        try:
+            children = self.psutil_process.children(recursive=True)
+        except psutil.Error:
+            children = []
+        for process in children + [self.psutil_process]:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        """処理待ちのワーカーを終了"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class IngestPool:
+    """
+    PDF1件ごとの上限付きワーカープール
+
+    ProcessPoolExecutor と同じく submit() で Future を返します。ワーカー数と同じ数のスレッドが
+    それぞれ1つのワーカープロセスを受け持ち、処理待ちのPDFを優先度・枠の空き・システムの負荷に応じて
+    取り出して、処理中のワーカーの使用量を監視します
+
+    Args:
+        slots: 同時実行数の枠（省略時はこのプールだけで数える LocalSlots(workers, ocr_slots)）。
+            複数のプロセスでプールを使う場合は共通の SharedSlots を渡します
+    """
+
+    def __init__(self, workers: int, initializer: Optional[Callable] = None,
+                 wall_seconds: float = INGEST_WALL_SECONDS, cpu_seconds: float = INGEST_CPU_SECONDS,
+                 rss_mb: float = INGEST_RSS_MB, ocr_slots: int = INGEST_OCR_SLOTS,
+                 max_cpu_percent: float = INGEST_MAX_CPU_PERCENT, min_free_mb: float = INGEST_MIN_FREE_MB,
+                 slots=None, idle_seconds: float = INGEST_IDLE_SECONDS):
+        self.workers = max(1, workers)
+        self.initializer = initializer
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.rss_bytes = rss_mb * 1024 * 1024
+        self.slots = slots if slots is not None else LocalSlots(self.workers, ocr_slots)
+        self.max_cpu_percent = max_cpu_percent
+        self.min_free_bytes = min_free_mb * 1024 * 1024
+        self.idle_seconds = idle_seconds
+        self._context = multiprocessing.get_context()
+
+        # 処理待ち: (OCRが必要か, 投入順, Future, 処理, 引数, 開始時の処理) のヒープ（テキストレイヤーのあるものが先）
+        self._pending = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        # 枠が取れなかった場合は、ADMISSION_INTERVAL が経つまでどのスレッドも取り直さない
+        self._retry_at = 0.0
+        self._load_checked_at = 0.0
+        self._load_ok = True
+        psutil.cpu_percent(interval=None)  # 次回の呼び出しまでのCPU使用率を測り始める
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f'ingest-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args, ocr: bool = False, on_start: Optional[Callable[[], None]] = None) -> Future:
+        """
+        処理を投入（fn と引数はワーカープロセスに渡すため pickle できるものに限る）
+
+        Args:
+            ocr: OCRが必要なPDFか（テキストレイヤーのあるものを先に処理し、OCRが必要なものの同時実行数を制限する）
+            on_start: 処理を開始するときに呼び出す関数（このプールのスレッドで呼び出す）
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('ワーカープールは終了しています')
+            heapq.heappush(self._pending, (int(ocr), next(self._sequence), future, fn, args, on_start))
+            self._condition.notify_all()
+        return future
+
+    def shutdown(self):
+        """処理待ちのものを破棄してワーカーを終了"""
+        with self._condition:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            self._condition.notify_all()
+        for task in pending:
+            task[2].cancel()
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+    def _system_load_ok(self) -> bool:
+        """2件目以降の処理を開始してよいか（CPU使用率と空きメモリで判定、ADMISSION_INTERVAL ごとに確認）"""
+        now = time.monotonic()
+        if now - self._load_checked_at >= ADMISSION_INTERVAL:
+            cpu = psutil.cpu_percent(interval=None)
+            available = psutil.virtual_memory().available
+            self._load_ok = cpu < self.max_cpu_percent and available >= self.min_free_bytes
+            self._load_checked_at = now
+        return self._load_ok
+
+    def _take(self, idle: bool = False):
+        """
+        処理を開始できるものを処理待ちから取り出し、枠を取る
+
+        枠の取得（SharedSlots ではデータベースのロック待ちがある）は self._condition を離してから行うため、
+        その間も submit() は待たされません。枠が取れなかった場合は処理待ちに戻します
+
+        Returns:
+            (処理, 枠)、プールの終了時はNone、idle を指定して INGEST_IDLE_SECONDS の間処理がなかった場合は _IDLE
+        """
+        idle_since = time.monotonic()
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return None
+                    now = time.monotonic()
+                    if self._pending and now >= self._retry_at:
+                        task = heapq.heappop(self._pending)
+                        break
+                    if idle and self.idle_seconds and not self._pending and now - idle_since >= self.idle_seconds:
+                        return _IDLE
+                    self._condition.wait(ADMISSION_INTERVAL)
+
+            try:
+                slot = self.slots.acquire(bool(task[0]), self._system_load_ok)
+            except sqlite3.Error as e:
+                logger.error("取り込みの枠を取得できません: %s", e)
+                slot = None
+
+            with self._condition:
+                closed = self._closed
+                if not closed and slot is None:
+                    heapq.heappush(self._pending, task)
+                    self._retry_at = time.monotonic() + ADMISSION_INTERVAL
+            if closed:
+                # 枠の取得中に終了した場合は、shutdown() が破棄した処理待ちと同じく取り消す
+                task[2].cancel()
+                if slot is not None:
+                    self._release(slot)
+                return None
+            if slot is not None:
+                return task, slot
+
+    def _release(self, slot):
+        try:
+            self.slots.release(slot)
+        except sqlite3.Error as e:
+            logger.error("取り込みの枠を解放できません: %s", e)
+        with self._condition:
+            self._retry_at = 0.0
+            self._condition.notify_all()
+
+    def _run(self):
+        """1つのワーカープロセスを受け持つスレッド"""
+        worker = None
+        while True:
+            taken = self._take(idle=worker is not None)
+            if taken is None:
+                break
+            if taken is _IDLE:
+                worker.stop()
+                worker = None
+                continue
+            task, slot = taken
+            _, _, future, fn, args, on_start = task
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if on_start is not None:
+                    try:
+                        on_start()
+                    except Exception as e:
+                        logger.error("処理開始時の処理でエラー: %s", e)
+
+                if worker is None or not worker.alive():
+                    worker = _Worker(self._context, self.initializer)
+                try:
+                    future.set_result(self._execute(worker, fn, args))
+                except (BudgetExceeded, WorkerDied) as e:
+                    # 強制終了した（または終了していた）ワーカーは次の処理の前に起動し直す
+                    worker = None
+                    future.set_exception(e)
+                except Exception as e:
+                    future.set_exception(e)
+            finally:
+                self._release(slot)
+
+        if worker is not None:
+            worker.stop()
+
+    def _execute(self, worker: _Worker, fn: Callable, args: tuple):
+        """ワーカーで1件処理し、上限を超えた場合はワーカーを強制終了する"""
+        start = time.monotonic()
+        try:
+            cpu_start, _ = _usage(worker.psutil_process)
+            worker.conn.send((fn, args))
+        except (OSError, psutil.Error) as e:
+            worker.kill()
+            raise WorkerDied(f"ワーカープロセスを利用できません: {e}")
+
+        while True:
+            reply = None
+            try:
+                if worker.conn.poll(WATCHDOG_INTERVAL):
+                    reply = worker.conn.recv()
+                else:
+                    cpu, rss = _usage(worker.psutil_process)
+            except (EOFError, OSError, psutil.Error):
+                worker.kill()
+                raise WorkerDied(f"ワーカープロセスが終了しました（終了コード {worker.process.exitcode}）")
+
+            if reply is not None:
+                ok, value = reply
+                if ok:
+                    return value
+                raise value
+
+            exceeded = self._check_budget(time.monotonic() - start, cpu - cpu_start, rss)
+            if exceeded is not None:
+                worker.kill()
+                INGEST_BUDGET_EXCEEDED.labels(resource=exceeded.resource).inc()
+                logger.warning("抽出を中止しました（PID %s）: %s", worker.process.pid, exceeded)
+                raise exceeded
+
+    def _check_budget(self, wall: float, cpu: float, rss: int) -> Optional[BudgetExceeded]:
+        """上限を超えている場合は送出する例外を返す"""
+        if self.wall_seconds and wall > self.wall_seconds:
+            return BudgetExceeded('wall', f"処理時間が上限（{self.wall_seconds:g}秒）を超えたため中止しました")
+        if self.cpu_seconds and cpu > self.cpu_seconds:
+            return BudgetExceeded('cpu', f"CPU時間が上限（{self.cpu_seconds:g}秒）を超えたため中止しました")
+        if self.rss_bytes and rss > self.rss_bytes:
+            return BudgetExceeded(
+                'rss', f"メモリ使用量（{rss / 1024 / 1024:.0f}MB）が上限（{self.rss_bytes / 1024 / 1024:g}MB）を超えたため中止しました"
+            )
+        return None
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+負荷試験スクリプト
+起動中のサーバーに並列でリクエストを送り、URLごとの秒間リクエスト数とレイテンシ（p50/p99）を表示します
+
+使用方法:
+    python loadtest.py [--url http://127.0.0.1:5000] [--concurrency 16] [--duration 10]
+"""
+
+import sys
+import time
+import argparse
+import http.client
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 負荷をかけるパス
+DEFAULT_PATHS = [
+    '/question/takken_law',
+    '/question/civil_law',
+    '/question/legal_restrictions',
+    '/question/others',
+    '/question/random',
+    '/files',
+]
+
+
+def percentile(sorted_values, ratio):
+    """ソート済みの値から百分位数を求める"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_client(base_url, paths, deadline, worker_index):
+    """
+    1クライアント分の負荷をかける（Keep-Aliveで接続を使い回す）
+
+    Returns:
+        {パス: [(レイテンシ秒, ステータス), ...]}
+    """
+    parsed = urlparse(base_url)
+    results = {path: [] for path in paths}
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    i = worker_index
+
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+            status = 0
+        results[path].append((time.perf_counter() - start, status))
+
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='宅建過去問システムの負荷試験')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='対象サーバーのURL')
+    parser.add_argument('--concurrency', type=int, default=16, help='同時接続数')
+    parser.add_argument('--duration', type=float, default=10.0, help='計測時間（秒）')
+    parser.add_argument('--path', action='append', help='対象パス（複数指定可、省略時は出題ページとファイル一覧）')
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    print(f"対象: {args.url}  同時接続数: {args.concurrency}  計測時間: {args.duration}秒")
+
+    deadline = time.perf_counter() + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_client, args.url, paths, deadline, i)
+            for i in range(args.concurrency)
+        ]
+        all_results = [future.result() for future in futures]
+
+    print()
+    print(f"{'パス':<32}{'件数':>8}{'エラー':>8}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+    total_count = 0
+    for path in paths:
+        samples = [sample for results in all_results for sample in results[path]]
+        latencies = sorted(latency for latency, _ in samples)
+        # 出題ページは該当問題がない場合にトップへリダイレクトするため、3xxも成功として扱う
+        errors = sum(1 for _, status in samples if not 200 <= status < 400)
+        total_count += len(samples)
+        print(
+            f"{path:<32}{len(samples):>8}{errors:>8}{len(samples) / args.duration:>10.1f}"
+            f"{percentile(latencies, 0.50) * 1000:>10.1f}{percentile(latencies, 0.99) * 1000:>10.1f}"
+        )
+
+    print(f"\n合計: {total_count / args.duration:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
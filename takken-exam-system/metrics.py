@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+計測モジュール
+PDF処理の各段階の処理時間とWebリクエストの応答時間をPrometheus形式で集計します
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+# 正規表現1回分の短い段階からOCR全体まで計測できるようにバケットを設定
+STAGE_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float('inf')
+)
+
+# PDF処理の段階
+#   open: PDFを開く / page_text: 1ページのテキスト抽出 / rasterize: OCR用の画像変換
+#   ocr_preprocess: OCR用の画像の前処理 / ocr_page: 1ページのOCR / normalize: エンコーディング正規化 / segment: 問題単位への分割
+#   option_parse: 1問の選択肢解析 / classify: 1問のジャンル分類 / db_write: DBへの保存
+PIPELINE_STAGES = (
+    'open', 'page_text', 'rasterize', 'ocr_preprocess', 'ocr_page', 'normalize',
+    'segment', 'option_parse', 'classify', 'db_write',
+)
+
+PDF_STAGE_SECONDS = Histogram(
+    'takken_pdf_stage_seconds',
+    'PDF処理の段階別処理時間（秒）',
+    ['stage'],
+    buckets=STAGE_BUCKETS,
+)
+
+PDF_QUESTIONS_EXTRACTED = Counter(
+    'takken_pdf_questions_extracted_total',
+    'PDFから抽出した問題数',
+)
+
+OCR_DPI_ESCALATIONS = Counter(
+    'takken_ocr_dpi_escalations_total',
+    'OCRの信頼度が低く、解像度を上げて読み直したページ数',
+)
+
+INGEST_BUDGET_EXCEEDED = Counter(
+    'takken_ingest_budget_exceeded_total',
+    '処理時間・CPU時間・メモリ使用量の上限を超えて抽出を中止したPDF数',
+    ['resource'],
+)
+
+REQUEST_LATENCY_SECONDS = Histogram(
+    'takken_http_request_duration_seconds',
+    'Webリクエストの応答時間（秒）',
+    ['endpoint', 'method', 'status'],
+)
+
+
+# record_stages() で集計中の段階別処理時間（{段階: [回数, 秒]}）
+_stage_recorders = []
+_stage_recorders_lock = threading.Lock()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    PDF処理の1段階の処理時間を計測
+
+    使用例:
+        with stage_timer('normalize'):
+            text = normalize(text)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        PDF_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+        if _stage_recorders:
+            with _stage_recorders_lock:
+                for stages in _stage_recorders:
+                    entry = stages.setdefault(stage, [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += seconds
+
+
+@contextmanager
+def record_stages():
+    """
+    ブロック内の段階別の処理時間を集計（プロファイル用、OCRのスレッドなどプロセス内の全スレッドが対象）
+
+    使用例:
+        with record_stages() as stages:
+            analyze_pdf(path)
+        stages  # {'open': [1, 0.01], 'page_text': [20, 0.3], ...}
+    """
+    stages = {}
+    with _stage_recorders_lock:
+        _stage_recorders.append(stages)
+    try:
+        yield stages
+    finally:
+        with _stage_recorders_lock:
+            _stage_recorders[:] = [recorder for recorder in _stage_recorders if recorder is not stages]
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float):
+    """Webリクエスト1件の応答時間を記録"""
+    REQUEST_LATENCY_SECONDS.labels(endpoint=endpoint, method=method, status=str(status)).observe(seconds)
+
+
+def render_metrics():
+    """
+    Prometheus形式のメトリクスを (本文, Content-Type) で返す
+
+    gunicornで複数ワーカーを起動している場合（PROMETHEUS_MULTIPROC_DIR が設定されている場合）は
+    全ワーカーの値を合算して返します
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模擬試験モジュール
+本試験と同じジャンル構成の50問を一度に組み立て、ページ単位で出題し、最後にまとめて採点します
+"""
+
+import json
+import random
+import threading
+import logging
+from typing import List, Dict, Optional
+
+from question_stats import get_bank_version
+
+logger = logging.getLogger(__name__)
+
+# 本試験のジャンル構成（権利関係14問・法令上の制限8問・税その他8問・宅建業法20問）
+MOCK_EXAM_COMPOSITION = {
+    'civil_law': 14,
+    'legal_restrictions': 8,
+    'others': 8,
+    'takken_law': 20,
+}
+MOCK_EXAM_QUESTION_COUNT = sum(MOCK_EXAM_COMPOSITION.values())
+
+# 1ページあたりの問題数
+MOCK_EXAM_PAGE_SIZE = 10
+
+# ジャンル別の問題IDプール（正解データのある問題のみ）と、読み込んだときの問題バンクのバージョン
+_genre_pools = None
+_genre_pools_version = None
+_genre_pools_lock = threading.Lock()
+
+
+def init_mock_exam_table(cursor):
+    """模擬試験テーブルを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mock_exams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_ids TEXT NOT NULL,
+            answers TEXT,
+            score INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            graded_at DATETIME
+        )
+    ''')
+
+
+def load_genre_pools(conn) -> Dict[str, List[int]]:
+    """
+    ジャンル別の問題IDプールを取得
+
+    問題バンクのバージョン（bank_version テーブル）を毎回確認し、読み込んだときから変わっていれば
+    DBから読み込み直します。取り込み・再処理・正解データの登録スクリプトなど、どのプロセスで
+    問題を変更しても、次の模擬試験から反映されます
+    """
+    global _genre_pools, _genre_pools_version
+
+    cursor = conn.cursor()
+    version = get_bank_version(cursor)
+    with _genre_pools_lock:
+        if _genre_pools is None or _genre_pools_version != version:
+            cursor.execute('SELECT id, genre FROM questions WHERE correct_answer IS NOT NULL AND correct_answer != ""')
+            pools = {}
+            for question_id, genre in cursor.fetchall():
+                pools.setdefault(genre, []).append(question_id)
+            _genre_pools = pools
+            _genre_pools_version = version
+            logger.info(f"ジャンル別IDプールを構築: {sum(len(ids) for ids in pools.values())}問（バージョン {version}）")
+        return _genre_pools
+
+
+def select_paper_question_ids(pools: Dict[str, List[int]], rng: Optional[random.Random] = None) -> List[int]:
+    """
+    IDプールからジャンル構成に従って問題IDを選択
+
+    Args:
+        pools: ジャンル別の問題IDプール
+        rng: 乱数生成器（テスト時に固定したい場合に指定）
+
+    Returns:
+        出題順に並んだ問題IDのリスト
+    """
+    rng = rng or random.Random()
+    selected = []
+    shortage = 0
+
+    for genre, count in MOCK_EXAM_COMPOSITION.items():
+        pool = pools.get(genre, [])
+        if len(pool) < count:
+            shortage += count - len(pool)
+            count = len(pool)
+        selected.extend(rng.sample(pool, count))
+
+    # 問題数が不足するジャンルがある場合は残りの問題から補充
+    if shortage:
+        chosen = set(selected)
+        remaining = [qid for ids in pools.values() for qid in ids if qid not in chosen]
+        selected.extend(rng.sample(remaining, min(shortage, len(remaining))))
+
+    return selected
+
+
+def create_mock_exam(conn, rng: Optional[random.Random] = None) -> Optional[int]:
+    """
+    模擬試験を作成して保存
+
+    Returns:
+        作成した模擬試験のID（出題可能な問題がない場合はNone）
+    """
+    question_ids = select_paper_question_ids(load_genre_pools(conn), rng)
+    if not question_ids:
+        return None
+
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO mock_exams (question_ids, answers) VALUES (?, ?)',
+        (json.dumps(question_ids), json.dumps({}))
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def get_mock_exam(conn, exam_id: int) -> Optional[Dict[str, any]]:
+    """模擬試験の記録を取得"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, question_ids, answers, score, created_at, graded_at FROM mock_exams WHERE id = ?', (exam_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    question_ids = json.loads(row[1])
+    return {
+        'id': row[0],
+        'question_ids': question_ids,
+        'answers': json.loads(row[2]) if row[2] else {},
+        'score': row[3],
+        'created_at': row[4],
+        'graded_at': row[5],
+        'page_count': (len(question_ids) + MOCK_EXAM_PAGE_SIZE - 1) // MOCK_EXAM_PAGE_SIZE,
+    }
+
+
+def _fetch_questions(conn, question_ids: List[int]) -> Dict[int, tuple]:
+    """問題IDのリストから問題を一括取得"""
+    if not question_ids:
+        return {}
+    placeholders = ','.join('?' * len(question_ids))
+    cursor = conn.cursor()
+    cursor.execute(
+        f'SELECT id, question_text, options, correct_answer, genre, question_number, year FROM questions WHERE id IN ({placeholders})',
+        question_ids
+    )
+    return {row[0]: row for row in cursor.fetchall()}
+
+
+def get_mock_exam_page(conn, exam: Dict[str, any], page: int) -> List[Dict[str, any]]:
+    """
+    模擬試験の指定ページの問題を取得（1ページ分を1クエリで取得）
+
+    Args:
+        exam: get_mock_exam() の戻り値
+        page: ページ番号（1始まり）
+
+    Returns:
+        出題順の問題リスト
+    """
+    start = (page - 1) * MOCK_EXAM_PAGE_SIZE
+    page_ids = exam['question_ids'][start:start + MOCK_EXAM_PAGE_SIZE]
+    rows = _fetch_questions(conn, page_ids)
+
+    questions = []
+    for offset, question_id in enumerate(page_ids):
+        row = rows.get(question_id)
+        if not row:
+            continue
+        try:
+            options = json.loads(row[2]) if row[2] else []
+        except (json.JSONDecodeError, TypeError):
+            options = []
+        questions.append({
+            'id': row[0],
+            'position': start + offset + 1,
+            'question_text': row[1],
+            'options': options,
+            'genre': row[4],
+            'question_number': row[5],
+            'year': row[6] or '',
+            'selected': exam['answers'].get(str(row[0]), ''),
+        })
+    return questions
+
+
+def save_mock_exam_answers(conn, exam: Dict[str, any], answers: Dict[str, str]):
+    """ページで入力された解答を模擬試験の記録に反映"""
+    valid_ids = {str(qid) for qid in exam['question_ids']}
+    merged = dict(exam['answers'])
+    merged.update({qid: answer for qid, answer in answers.items() if qid in valid_ids and answer})
+    exam['answers'] = merged
+
+    cursor = conn.cursor()
+    cursor.execute('UPDATE mock_exams SET answers = ? WHERE id = ?', (json.dumps(merged), exam['id']))
+    conn.commit()
+
+
+def grade_mock_exam(conn, exam: Dict[str, any]) -> Dict[str, any]:
+    """
+    模擬試験の全解答を一括で採点し、得点を保存
+
+    Returns:
+        得点・ジャンル別の正答数・問題ごとの結果
+    """
+    rows = _fetch_questions(conn, exam['question_ids'])
+
+    score = 0
+    by_genre = {}
+    results = []
+    for position, question_id in enumerate(exam['question_ids'], start=1):
+        row = rows.get(question_id)
+        if not row:
+            continue
+        selected = exam['answers'].get(str(question_id), '')
+        correct = selected != '' and selected == row[3]
+        if correct:
+            score += 1
+
+        genre_stats = by_genre.setdefault(row[4], {'correct': 0, 'total': 0})
+        genre_stats['total'] += 1
+        if correct:
+            genre_stats['correct'] += 1
+
+        results.append({
+            'position': position,
+            'id': question_id,
+            'genre': row[4],
+            'question_number': row[5],
+            'year': row[6] or '',
+            'selected': selected,
+            'correct_answer': row[3],
+            'is_correct': correct,
+        })
+
+    cursor = conn.cursor()
+    cursor.execute(
+        'UPDATE mock_exams SET score = ?, graded_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (score, exam['id'])
+    )
+    conn.commit()
+    exam['score'] = score
+
+    return {
+        'score': score,
+        'total': len(results),
+        'by_genre': by_genre,
+        'results': results,
+    }
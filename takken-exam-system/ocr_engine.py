@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCRエンジンモジュール
+Tesseractの言語モデル（jpn）を1回だけ読み込み、複数ページのOCRで使い回します
+
+tesserocr（libtesseractの直接呼び出し）がインストールされている場合は、プロセス内に
+OCR_WORKERS 個のTesseractを常駐させてスレッドで並列にOCRします。インストールされていない場合は
+tesseract コマンドを1ページずつ起動します（画像は標準入力で渡すため一時ファイルは作りません）。
+どちらの場合も結果は pytesseract.image_to_data（Output.DICT）と同じ形式で返します
+
+tesserocr は requirements.txt でLinux/macOSのみインストールするため、Windowsでは従来どおり
+ページごとに tesseract コマンドを起動し、言語モデルもページごとに読み込みます
+（Windowsでも tesserocr をインストールすれば常駐させて使います）
+"""
+
+import io
+import os
+import abc
+import sys
+import queue
+import atexit
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# 同時にOCRするページ数（常駐させるTesseractの数。環境変数 OCR_WORKERS で変更可能）
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', min(4, os.cpu_count() or 1)))
+
+# tesseract コマンドのパス（tesserocr がない環境で使用。環境変数 TESSERACT_CMD または configure_ocr() で指定、
+# 未指定の場合はWindowsの一般的なインストール先、なければ PATH 上の tesseract）
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD')
+
+# Windows環境での一般的なTesseractのインストール先
+WINDOWS_TESSERACT_PATHS = (
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
+)
+
+# 既定の言語とページ分割モード（6: 1ブロックのテキストとして読む）
+DEFAULT_LANG = 'jpn'
+DEFAULT_PSM = 6
+
+# image_to_data のTSVの列（整数の列と、それ以外）
+TSV_INT_COLUMNS = (
+    'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+    'left', 'top', 'width', 'height',
+)
+TSV_COLUMNS = TSV_INT_COLUMNS + ('conf', 'text')
+
+_engines: Dict[str, 'OCREngine'] = {}
+_engine_lock = threading.Lock()
+
+
+def parse_tsv(tsv: str) -> Dict[str, list]:
+    """TesseractのTSV出力を pytesseract.Output.DICT と同じ形式の辞書に変換（見出し行は無視）"""
+    data = {column: [] for column in TSV_COLUMNS}
+    for line in tsv.splitlines():
+        values = line.split('\t')
+        if len(values) < len(TSV_COLUMNS) - 1 or values[0] == 'level':
+            continue
+        if len(values) == len(TSV_COLUMNS) - 1:
+            values.append('')
+        for column, value in zip(TSV_INT_COLUMNS, values):
+            data[column].append(int(value))
+        data['conf'].append(float(values[10]))
+        data['text'].append(values[11])
+    return data
+
+
+class OCREngine(abc.ABC):
+    """OCRエンジンの共通処理（複数ページを並列にOCRする）"""
+
+    name = ''
+
+    def __init__(self, lang: str = DEFAULT_LANG, workers: int = OCR_WORKERS):
+        self.lang = lang
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+
+    def recognize(self, image, psm: int = DEFAULT_PSM, variables: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        """
+        1枚の画像をOCR
+
+        Args:
+            image: PIL画像
+            psm: ページ分割モード
+            variables: Tesseractの設定（例: {'tessedit_char_whitelist': '0123456789'}）
+
+        Returns:
+            pytesseract.image_to_data（Output.DICT）と同じ形式の辞書
+        """
+        with stage_timer('ocr_page'):
+            return self._recognize(image, psm, variables)
+
+    @abc.abstractmethod
+    def _recognize(self, image, psm: int, variables: Optional[Dict[str, str]]) -> Dict[str, list]:
+        """1枚の画像をOCR（エンジンごとに実装）"""
+
+    def map(self, images: Iterable, psm: int = DEFAULT_PSM,
+            variables: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, list]]:
+        """
+        複数の画像を並列にOCRし、入力と同じ順に結果を返す
+
+        画像は必要な分だけ取り出すため（同時に保持するのは OCR_WORKERS の2倍まで）、
+        ページ画像を作りながら渡しても全ページ分の画像がメモリに載ることはありません
+        """
+        pending = deque()
+        for image in images:
+            pending.append(self._executor.submit(self.recognize, image, psm, variables))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class TesserocrEngine(OCREngine):
+    """tesserocr でプロセス内に常駐させたTesseractを使い回す（言語モデルの読み込みは1つにつき1回）"""
+
+    name = 'tesserocr'
+
+    def __init__(self, lang: str = DEFAULT_LANG, workers: int = OCR_WORKERS):
+        super().__init__(lang, workers)
+        self._apis = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        """空いているTesseractを取得（足りなければ OCR_WORKERS 個まで作成）"""
+        try:
+            return self._apis.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.workers
+            if create:
+                self._created += 1
+        if not create:
+            return self._apis.get()
+
+        import tesserocr
+        logger.info("Tesseractを起動: %s", self.lang)
+        try:
+            return tesserocr.PyTessBaseAPI(lang=self.lang, psm=DEFAULT_PSM, oem=tesserocr.OEM.DEFAULT)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _recognize(self, image, psm: int, variables: Optional[Dict[str, str]]) -> Dict[str, list]:
+        api = self._acquire()
+        saved = {}
+        try:
+            for key, value in (variables or {}).items():
+                saved[key] = api.GetVariableAsString(key)
+                api.SetVariable(key, value)
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            return parse_tsv(api.GetTSVText(0))
+        finally:
+            # 次のページに設定が残らないように元に戻す
+            for key, value in saved.items():
+                api.SetVariable(key, value or '')
+            api.Clear()
+            self._apis.put(api)
+
+    def close(self):
+        super().close()
+        while True:
+            try:
+                self._apis.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+class SubprocessEngine(OCREngine):
+    """
+    tesseract コマンドを1ページずつ起動（tesserocr がない環境用、主にWindows）
+
+    ページごとにプロセスの起動と言語モデルの読み込みが発生するため、TesserocrEngine より遅くなります
+    """
+
+    name = 'subprocess'
+
+    def __init__(self, lang: str = DEFAULT_LANG, workers: int = OCR_WORKERS, tesseract_cmd: str = 'tesseract'):
+        super().__init__(lang, workers)
+        self.tesseract_cmd = tesseract_cmd
+
+    def _recognize(self, image, psm: int, variables: Optional[Dict[str, str]]) -> Dict[str, list]:
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+
+        command: List[str] = [self.tesseract_cmd, 'stdin', 'stdout', '-l', self.lang, '--oem', '3', '--psm', str(psm)]
+        for key, value in (variables or {}).items():
+            command += ['-c', f'{key}={value}']
+        command.append('tsv')
+
+        result = subprocess.run(command, input=buffer.getvalue(), capture_output=True, check=True)
+        return parse_tsv(result.stdout.decode('utf-8', errors='ignore'))
+
+
+def tesseract_command() -> str:
+    """使用する tesseract コマンドのパス"""
+    if TESSERACT_CMD:
+        return TESSERACT_CMD
+    if sys.platform.startswith('win'):
+        for path in WINDOWS_TESSERACT_PATHS:
+            if os.path.exists(path):
+                return path
+    return 'tesseract'
+
+
+def create_engine(lang: str = DEFAULT_LANG, workers: int = OCR_WORKERS) -> OCREngine:
+    """利用できるOCRエンジンを作成（tesserocr を優先）"""
+    try:
+        import tesserocr  # noqa: F401
+        return TesserocrEngine(lang, workers)
+    except ImportError:
+        command = tesseract_command()
+        logger.info("tesserocrがインストールされていないため、tesseractコマンドでOCRします: %s", command)
+        return SubprocessEngine(lang, workers, command)
+
+
+def get_ocr_engine(lang: str = DEFAULT_LANG) -> OCREngine:
+    """プロセス内で共有するOCRエンジンを言語ごとに取得（初回のみ作成）"""
+    with _engine_lock:
+        engine = _engines.get(lang)
+        if engine is None:
+            engine = _engines[lang] = create_engine(lang, workers=OCR_WORKERS)
+            logger.info("OCRエンジン: %s %s（%s並列）", engine.name, lang, engine.workers)
+        return engine
+
+
+def configure_ocr(workers: Optional[int] = None, tesseract_cmd: Optional[str] = None):
+    """
+    OCRのプロセス全体の設定を変更（作成済みのエンジンは閉じ、次回の使用時に作り直す）
+
+    プロセスの起動時に一度だけ呼び出します。一括アップロードのワーカープロセスのように、
+    プロセス単位で並列化している場合は workers を1にします
+
+    Args:
+        workers: 同時にOCRするページ数
+        tesseract_cmd: tesseract コマンドのパス（tesserocr がない環境で使用）
+    """
+    global OCR_WORKERS, TESSERACT_CMD
+    if workers is not None:
+        OCR_WORKERS = max(1, workers)
+    if tesseract_cmd is not None:
+        TESSERACT_CMD = tesseract_cmd
+    shutdown_ocr()
+
+
+def shutdown_ocr():
+    """常駐させたTesseractを終了"""
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.close()
+        _engines.clear()
+
+
+atexit.register(shutdown_ocr)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCR前処理モジュール
+ページ画像の二値化・傾き補正・余白とフッターの除去を行い、Tesseractに渡す画像を小さく・読み取りやすくします
+（Pillowのみを使用し、画像はグレースケールで受け取ります）
+"""
+
+from typing import List, Optional, Tuple
+
+# 傾き補正で試す角度（度）
+DESKEW_ANGLES = (-2.0, -1.5, -1.0, -0.5, 0.5, 1.0, 1.5, 2.0)
+
+# 傾きの推定に使う縮小画像の幅（ピクセル）
+DESKEW_SAMPLE_WIDTH = 600
+
+# 文字とみなす行の黒画素の割合
+INK_ROW_RATIO = 0.002
+
+# フッターを探すページ下部の範囲と、本文との間に必要な空白の高さ（ページの高さに対する割合）
+FOOTER_REGION_RATIO = 0.10
+FOOTER_GAP_RATIO = 0.015
+
+# 切り抜き後に残す余白（ピクセル）
+CROP_PADDING = 16
+
+# 表の罫線とみなす行（薄い灰色の罫線も拾えるよう、この明るさ未満を線とし、行の幅のこの割合以上を占めるもの）
+RULE_GRAY_LEVEL = 230
+RULE_ROW_RATIO = 0.3
+
+# 罫線を消すときに上下に広げる幅（ピクセル、罫線の縁のにじみも消す）
+RULE_MARGIN = 3
+
+# 表の列の間とみなす空白の幅（表の幅に対する割合）と、列とみなす最小の幅（ピクセル、縦罫線を除外）
+COLUMN_GAP_RATIO = 0.012
+MIN_COLUMN_WIDTH = 8
+
+
+def otsu_threshold(image) -> int:
+    """大津の方法で二値化のしきい値を求める"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    if total == 0:
+        return 128
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+
+    best_threshold, best_variance = 128, -1.0
+    weight_background = 0
+    sum_background = 0
+    for level, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += level * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def binarize(image):
+    """グレースケール画像を白黒（L モード、0/255）に変換"""
+    threshold = otsu_threshold(image)
+    return image.point(lambda value: 255 if value > threshold else 0)
+
+
+def _row_ink(image) -> List[float]:
+    """行ごとの黒画素の割合（白黒画像を幅1に縮小して求める）"""
+    from PIL import Image, ImageOps
+
+    column = ImageOps.invert(image).resize((1, image.height), Image.Resampling.BOX)
+    return [value / 255 for value in column.getdata()]
+
+
+def _profile_score(image) -> float:
+    """行ごとの黒画素の割合の分散（文字の行が水平に揃っているほど大きい）"""
+    rows = _row_ink(image)
+    mean = sum(rows) / len(rows)
+    return sum((value - mean) ** 2 for value in rows)
+
+
+def estimate_skew(image) -> float:
+    """
+    投影プロファイル法で傾き（度）を推定
+
+    縮小した白黒画像を少しずつ回転させ、行の黒画素の分布が最もはっきりする角度を選びます
+    """
+    from PIL import Image
+
+    scale = DESKEW_SAMPLE_WIDTH / image.width if image.width > DESKEW_SAMPLE_WIDTH else 1.0
+    sample = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+
+    best_angle, best_score = 0.0, _profile_score(sample)
+    for angle in DESKEW_ANGLES:
+        rotated = sample.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=255)
+        score = _profile_score(rotated)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def rotate(image, angle: float):
+    """画像を回転（はみ出さないように拡大し、余白は白で埋める）"""
+    from PIL import Image
+
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def content_box(image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    余白とフッター（ページ番号・年度など）を除いた本文の範囲を求める
+
+    ページ下部の一定範囲にあり、本文との間に空白がある文字の行をフッターとみなします
+
+    Returns:
+        (左, 上, 右, 下)（白紙の場合はNone）
+    """
+    from PIL import ImageOps
+
+    box = ImageOps.invert(image).getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+
+    rows = _row_ink(image)
+    footer_top = int(image.height * (1 - FOOTER_REGION_RATIO))
+    min_gap = int(image.height * FOOTER_GAP_RATIO)
+
+    # 下から見て、フッター範囲内の文字の塊の上にある空白を探す
+    y = bottom - 1
+    while y > footer_top and rows[y] > INK_ROW_RATIO:
+        y -= 1
+    gap_end = y
+    while y > top and rows[y] <= INK_ROW_RATIO:
+        y -= 1
+    if y > top and gap_end > footer_top and gap_end - y >= min_gap:
+        bottom = y + 1
+
+    return (
+        max(0, left - CROP_PADDING), max(0, top - CROP_PADDING),
+        min(image.width, right + CROP_PADDING), min(image.height, bottom + CROP_PADDING),
+    )
+
+
+def table_region(image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    ページ内の表（正解表など）の範囲を求める
+
+    横罫線（ページ幅の一定割合以上に伸びる行）の最初と最後の間を表とみなします。
+    罫線が2本未満の場合は、余白とフッターを除いた本文の範囲を返します
+
+    Args:
+        image: グレースケールのページ画像
+
+    Returns:
+        (左, 上, 右, 下)（白紙の場合はNone）
+    """
+    lines = image.point(lambda value: 0 if value < RULE_GRAY_LEVEL else 255)
+    rules = [y for y, ink in enumerate(_row_ink(lines)) if ink >= RULE_ROW_RATIO]
+    if len(rules) < 2:
+        return content_box(binarize(image))
+
+    from PIL import ImageOps
+
+    top, bottom = rules[0], rules[-1] + 1
+    box = ImageOps.invert(lines.crop((0, top, image.width, bottom))).getbbox()
+    left, right = (box[0], box[2]) if box else (0, image.width)
+    return (
+        max(0, left - CROP_PADDING), max(0, top - CROP_PADDING),
+        min(image.width, right + CROP_PADDING), min(image.height, bottom + CROP_PADDING),
+    )
+
+
+def remove_rules(image):
+    """白黒画像から横罫線を消す（罫線が文字に接しているとOCRの精度が大きく下がるため）"""
+    cleaned = image.copy()
+    for y, ink in enumerate(_row_ink(image)):
+        if ink >= RULE_ROW_RATIO:
+            cleaned.paste(255, (0, max(0, y - RULE_MARGIN), image.width, min(image.height, y + RULE_MARGIN + 1)))
+    return cleaned
+
+
+def table_columns(image) -> List[Tuple[int, int]]:
+    """
+    罫線を消した表の白黒画像から列の範囲を求める（縦方向の黒画素の分布の空白で区切る）
+
+    Returns:
+        [(左, 右), ...]（左から順）
+    """
+    from PIL import Image, ImageOps
+
+    row = ImageOps.invert(image).resize((image.width, 1), Image.Resampling.BOX)
+    inked = [value > 0 for value in row.tobytes()]
+    min_gap = max(1, int(image.width * COLUMN_GAP_RATIO))
+
+    columns = []
+    start = end = None
+    for x, has_ink in enumerate(inked):
+        if has_ink:
+            if start is None:
+                start = x
+            end = x + 1
+        elif start is not None and x - end >= min_gap:
+            columns.append((start, end))
+            start = None
+    if start is not None:
+        columns.append((start, end))
+    return [(left, right) for left, right in columns if right - left >= MIN_COLUMN_WIDTH]
+
+
+def preprocess_for_ocr(image, use_binarize: bool = True, use_deskew: bool = True, use_crop: bool = True):
+    """
+    OCR用の前処理（グレースケール化 → 二値化 → 傾き補正 → 余白・フッターの除去）
+
+    傾きの推定と本文範囲の検出は、use_binarize が False の場合も白黒画像で行います
+
+    Args:
+        image: ページ画像（PIL）
+
+    Returns:
+        前処理済みの画像（白紙の場合はNone）
+    """
+    if image.mode != 'L':
+        image = image.convert('L')
+    mask = binarize(image)
+    if use_binarize:
+        image = mask
+
+    if use_deskew:
+        angle = estimate_skew(mask)
+        if angle != 0.0:
+            image = rotate(image, angle)
+            mask = image if use_binarize else binarize(image)
+
+    if use_crop:
+        box = content_box(mask)
+        if box is None:
+            return None
+        image = image.crop(box)
+    return image
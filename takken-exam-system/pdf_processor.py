@@ -4,14 +4,20 @@
 import os
 import sys
 import re
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-import pdf2image
-import chardet
-import jaconv
-from typing import List, Dict, Optional, Tuple
+import mmap
+import atexit
+import queue
+from contextlib import contextmanager
+from collections import Counter
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple, Union
 import logging
+import logging.handlers
+from metrics import stage_timer, PDF_QUESTIONS_EXTRACTED, OCR_DPI_ESCALATIONS
+
+# PyMuPDF・OCR関連のライブラリ（fitz, pytesseract, PIL, chardet, jaconv）は読み込みに
+# 時間がかかるため、実際に使用するメソッド内でインポートする（問題を出題するだけのプロセスでは読み込まない）
 
 # Windowsエンコーディング設定
 if sys.platform.startswith('win'):
@@ -19,159 +25,629 @@ if sys.platform.startswith('win'):
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
-# ログ設定
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('pdf_processing.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# configure_logging() で起動したログ書き込みスレッドと、その設定（fork後の子プロセスで同じ設定で起動し直す）
+_log_listener = None
+_log_config = None
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = 'pdf_processing.log', console: bool = True):
+    """
+    PDF処理のログ出力を設定
+
+    ファイルや標準出力への書き込みはQueueListenerのスレッドで行い、抽出処理のスレッドでは
+    キューへの追加のみを行います。インポート時には何も設定しないため、ログが必要な
+    プロセス（Webアプリ・CLI）の起動時に一度呼び出してください。
+
+    Args:
+        level: ログレベル（通常はINFO、パターン調査時のみDEBUG）
+        log_file: ログファイルのパス（Noneの場合はファイルに出力しない）
+        console: 標準出力にも出力するかどうか
+    """
+    global _log_listener, _log_config
+
+    shutdown_logging()
+    _log_config = (level, log_file, console)
+
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = []
+    if log_file:
+        # delay=True: 実際にログが出力されるまでファイルを開かない
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8', delay=True))
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _log_listener.start()
+
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def shutdown_logging():
+    """ログ書き込みスレッドを停止し、キューに残ったログを書き出す"""
+    global _log_listener
+
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+
+def _restart_logging_after_fork():
+    """
+    fork した子プロセスでログ書き込みスレッドを起動し直す
+
+    スレッドは fork で引き継がれないため、gunicorn の preload_app のように親プロセスで
+    configure_logging() を呼び出してから fork すると、子プロセスのログはキューに溜まるだけで
+    書き出されません。親のスレッドは子プロセスには存在しないため、停止せずに破棄します
+    """
+    global _log_listener
+
+    if _log_config is None:
+        return
+    _log_listener = None
+    configure_logging(*_log_config)
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    # Windowsには fork がない（子プロセスはモジュールの読み込みから始まる）
+    os.register_at_fork(after_in_child=_restart_logging_after_fork)
+
+# PDFの読み込み元（ファイルパス、またはメモリ上のPDFデータ）
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap]
+
+# 抽出処理のバージョン（問題の分割・選択肢の解析・OCRの設定など、抽出結果が変わる変更をしたら上げる）
+# 取り込んだPDFごとに記録し、reset_and_reprocess.py で古いバージョンで抽出したPDFのみを抽出し直す
+EXTRACTOR_VERSION = '1'
+
+# 最終ページの正解表のパターン（マッチ数が最も多いものを採用）
+ANSWER_KEY_PATTERNS = [
+    # (1) １ や (1) 1 のような括弧付き番号形式（最も一般的）
+    r'\((\d+)\)\s*([1-4１-４])',
+    # 問1 １ のような形式
+    r'問(\d+)\s*([1-4１-４])',
+    # 1. １ のような形式
+    r'(\d+)[.．]\s*([1-4１-４])',
+    # 番号 正解 の表形式（改行を含む）
+    r'(\d+)\s*\n\s*([1-4１-４])',
+]
+
+# OCRの解像度（最初の解像度で信頼度が低い場合のみ次の解像度で読み直す）
+OCR_DPI_STEPS = (200, 300)
+
+# 読み直しを行わない単語の平均信頼度（0〜100）
+OCR_MIN_CONFIDENCE = 70
+
+# 正解表のOCR設定（表の範囲を列ごとに、数字と括弧に限定して読む）
+# 数字と括弧のみのため英語の言語モデルを使用（日本語モデルでは文字の限定がほとんど効かない）
+ANSWER_KEY_OCR_DPI = 250
+ANSWER_KEY_OCR_LANG = 'eng'
+ANSWER_KEY_OCR_PSM = 6
+ANSWER_KEY_OCR_WHITELIST = '0123456789()'
+
+# OCRの要否の簡易判定に使う先頭のページ数（needs_ocr）
+OCR_PROBE_PAGES = 3
+
+
+def _freeze_question(question: Mapping[str, any]) -> Mapping[str, any]:
+    """問題の辞書を読み取り専用にする（選択肢のリストはタプルにする）"""
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value for key, value in question.items()
+    })
+
+
+def _thaw_question(question: Mapping[str, any]) -> Dict[str, any]:
+    """読み取り専用の問題から、呼び出し元で変更できる辞書を作成（選択肢はリストに戻す）"""
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in question.items()}
+
+
+@dataclass(frozen=True)
+class PDFAnalysis:
+    """
+    PDF1ファイル分の解析結果（変更不可）
+
+    PDFは1回だけ開き、ページごとのテキスト・年度・問題・正解表をまとめて保持します。
+    問題と正解表も作成時に読み取り専用（MappingProxyType）にするため、解析結果を共有しても
+    呼び出し元の変更が他に影響することはありません。
+    処理クラスのインスタンスには状態を残さないため、同じインスタンスを複数のスレッドから同時に使えます
+    """
+    file_path: str  # ファイルパス（メモリ上のデータから解析した場合は name で指定した名前）
+    page_texts: Tuple[str, ...] = ()  # ページごとのテキスト（PyMuPDF、正規化前）
+    text: str = ''  # 問題抽出に使用した全文（OCR採用時はOCRテキスト、正規化済み）
+    exam_year: str = ''
+    questions: Tuple[Mapping[str, any], ...] = ()
+    answers: Mapping[int, str] = field(default_factory=dict)  # {問題番号: 正解}
+
+    def __post_init__(self):
+        object.__setattr__(self, 'page_texts', tuple(self.page_texts))
+        object.__setattr__(self, 'questions', tuple(_freeze_question(question) for question in self.questions))
+        object.__setattr__(self, 'answers', MappingProxyType(dict(self.answers)))
+
+    def __reduce__(self):
+        # MappingProxyType はpickleできないため、通常の辞書に戻して渡す（受け取り側で再び読み取り専用にする）
+        return PDFAnalysis, (
+            self.file_path, self.page_texts, self.text, self.exam_year,
+            tuple(_thaw_question(question) for question in self.questions), dict(self.answers),
+        )
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_texts)
+
+    @property
+    def first_page_text(self) -> str:
+        """第1ページのテキスト（年度抽出用）"""
+        return self.page_texts[0] if self.page_texts else ''
+
+    @property
+    def last_page_text(self) -> str:
+        """最終ページのテキスト（正解表）"""
+        return self.page_texts[-1] if self.page_texts else ''
+
+
+def parse_answer_key(text: str) -> Dict[int, str]:
+    """
+    正解表のテキストから {問題番号: 正解} を抽出
+
+    Args:
+        text: 最終ページのテキスト
+
+    Returns:
+        問題番号と正解（半角数字）の辞書
+    """
+    import jaconv
+
+    best_matches = []
+    for pattern in ANSWER_KEY_PATTERNS:
+        matches = re.findall(pattern, text, re.MULTILINE)
+        if len(matches) > len(best_matches):
+            best_matches = matches
+
+    return {int(number): jaconv.z2h(answer, digit=True) for number, answer in best_matches}
+
+
+def _ocr_rows(data: Dict[str, list]) -> List[Tuple[str, int, int]]:
+    """
+    OCR結果の単語を行ごとにまとめる（1つの欄が複数の単語に分かれて読まれる場合があるため）
+
+    Returns:
+        [(行のテキスト, 上端, 下端), ...]（上から順）
+    """
+    words = sorted(
+        (top, left, top + height, text.strip())
+        for text, conf, left, top, height in zip(
+            data['text'], data['conf'], data['left'], data['top'], data['height']
+        )
+        if float(conf) >= 0 and text.strip()
+    )
+
+    rows = []
+    for top, left, bottom, text in words:
+        if rows and top <= (rows[-1][1] + rows[-1][2]) / 2 <= bottom:
+            rows[-1][0].append((left, text))
+            rows[-1][2] = max(rows[-1][2], bottom)
+        else:
+            rows.append([[(left, text)], top, bottom])
+    return [("".join(text for _, text in sorted(parts)), top, bottom) for parts, top, bottom in rows]
+
+
+def parse_answer_key_columns(columns: List[Dict[str, list]]) -> Dict[int, str]:
+    """
+    正解表の列ごとのOCR結果から {問題番号: 正解} を抽出
+
+    括弧を含む欄が多い列を問題番号の列、その右隣の列を正解の列とみなし、正解の列の行ごとに対応付けます。
+    問題番号は上から連番のため、読み取れた番号と行の位置の差の多数決で列の先頭の番号を決め、
+    読み取れなかった行の番号も補います（正解の欄が1〜4でない行は除外します）。
+    列の間隔が狭く番号と正解が1つの列として読まれた場合は、行の先頭の「(N)正解」から読み取ります
+
+    Args:
+        columns: 左の列から順の、pytesseract.image_to_data（Output.DICT）と同じ形式のOCR結果
+
+    Returns:
+        問題番号と正解（半角数字）の辞書
+    """
+    rows = [_ocr_rows(data) for data in columns]
+
+    answers = {}
+    for number_rows, answer_rows in zip(rows, rows[1:]):
+        numbers = []
+        for _, top, bottom in answer_rows:
+            middle = (top + bottom) / 2
+            numbers.append(next(
+                (text for text, number_top, number_bottom in number_rows if number_top <= middle <= number_bottom), ''
+            ))
+        if sum(1 for text in numbers if '(' in text or ')' in text) * 2 < len(numbers):
+            continue
+
+        # 両側の括弧まで読み取れた番号を優先（片側の括弧が欠けた番号は上の桁も欠けていることが多い）
+        offsets = Counter()
+        for pattern in (r'\((\d{1,3})\)', r'\(?(\d{1,3})\)?'):
+            offsets = Counter(
+                int(match.group(1)) - index
+                for index, text in enumerate(numbers)
+                for match in [re.fullmatch(pattern, text)]
+                if match and ('(' in text or ')' in text)
+            )
+            if offsets:
+                break
+        if not offsets:
+            continue
+        start = offsets.most_common(1)[0][0]
+
+        for index, (text, _, _) in enumerate(answer_rows):
+            if start + index >= 1 and re.fullmatch(r'[1-4]', text):
+                answers.setdefault(start + index, text)
+
+    for column_rows in rows:
+        for text, _, _ in column_rows:
+            match = re.match(r'\((\d{1,3})\)([1-4])', text)
+            if match:
+                answers.setdefault(int(match.group(1)), match.group(2))
+    return answers
+
+
+@contextmanager
+def _open_document(source: PDFSource):
+    """
+    PDFを開く（ファイルパス、またはメモリ上のPDFデータ）
+
+    mmap は PyMuPDF が直接受け付けないため memoryview 経由で渡します（コピーは発生しません）
+    """
+    import fitz  # PyMuPDF
+
+    view = memoryview(source) if isinstance(source, mmap.mmap) else None
+    try:
+        with stage_timer('open'):
+            if isinstance(source, (str, os.PathLike)):
+                doc = fitz.open(source)
+            else:
+                doc = fitz.open(stream=view if view is not None else source, filetype='pdf')
+        try:
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        # mmap を閉じられるように参照を解放
+        if view is not None:
+            view.release()
+
+
+@contextmanager
+def map_pdf(file_path: str):
+    """
+    保存済みのPDFを読み取り専用でメモリマップする
+    
+    アップロード直後のファイルはページキャッシュに載っているため、
+    コピーせずにそのまま analyze_pdf() に渡せます
+    
+    使用例:
+        with map_pdf(file_path) as data:
+            analysis = analyze_pdf(data)
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _join_ocr_words(words: List[str]) -> str:
+    """OCRの単語を1行につなぐ（英数字の単語どうしの間のみ空白を入れる）"""
+    line = words[0]
+    for word in words[1:]:
+        if line[-1].isascii() and line[-1].isalnum() and word[0].isascii() and word[0].isalnum():
+            line += " "
+        line += word
+    return line
+
+
+def ocr_text_and_confidence(data: Dict[str, list]) -> Tuple[str, float]:
+    """
+    OCRの結果（pytesseract.image_to_data と同じ形式）からテキストと単語の平均信頼度を求める
+    
+    単語は行ごとにつなぎ、行は改行で区切ります（信頼度が -1 の要素は単語ではないため除外）。
+    日本語は1文字ずつ単語として返されるため、空白を入れるのは英数字の単語どうしの間のみです
+    
+    Returns:
+        (テキスト, 平均信頼度)（単語がない場合の信頼度は0）
+    """
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for word, conf, block, par, line in zip(
+        data['text'], data['conf'], data['block_num'], data['par_num'], data['line_num']
+    ):
+        conf = float(conf)
+        if conf < 0 or not word.strip():
+            continue
+        lines.setdefault((block, par, line), []).append(word)
+        confidences.append(conf)
+    
+    text = "".join(_join_ocr_words(words) + "\n" for words in lines.values())
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, confidence
+
+
 class EnhancedPDFProcessor:
     """OCR機能付き高精度PDF処理クラス"""
     
-    def __init__(self, use_ocr: bool = True, tesseract_path: Optional[str] = None):
+    def __init__(self, use_ocr: bool = True):
         """
         初期化
         
+        インスタンスは設定（use_ocr）のみを保持し、抽出結果などの状態は持ちません。
+        Tesseractのパスなどプロセス全体の設定は ocr_engine.configure_ocr() で起動時に一度だけ行います
+        
         Args:
             use_ocr: OCRを使用するかどうか
-            tesseract_path: TesseractのパスWindows環境では必要な場合がある
         """
-        self.use_ocr = use_ocr
-        
-        # Windows環境でTesseractのパスを設定
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        elif sys.platform.startswith('win'):
-            # 一般的なWindows環境でのTesseractパス
-            possible_paths = [
-                r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-                r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-                r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', ''))
-            ]
-            for path in possible_paths:
-                if os.path.exists(path):
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    logger.info(f"Tesseractパスを設定: {path}")
-                    break
+        self._use_ocr = use_ocr
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
+    @property
+    def use_ocr(self) -> bool:
+        return self._use_ocr
+    
+    def analyze_pdf(self, source: PDFSource, name: Optional[str] = None) -> PDFAnalysis:
+        """
+        PDFを1回だけ開き、テキスト・年度・問題・正解表をまとめて抽出
+        
+        Args:
+            source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
+            name: ログと解析結果に使う名前（省略時はファイルパス）
+            
+        Returns:
+            解析結果（テキストが抽出できなかった場合は空の結果）
+        """
+        name = name or _source_name(source)
+        page_texts, text = self._read_document(source, name)
+        
+        if not text.strip():
+            logger.warning("テキストが抽出されませんでした")
+            return PDFAnalysis(file_path=name, page_texts=tuple(page_texts), text=text)
+        
+        # 年度は第1ページのみから抽出
+        exam_year = self._extract_exam_year((page_texts[0] if page_texts else '') or text[:1000])
+        return PDFAnalysis(
+            file_path=name,
+            page_texts=tuple(page_texts),
+            text=text,
+            exam_year=exam_year,
+            questions=tuple(self._build_questions(text, exam_year)),
+            answers=parse_answer_key(page_texts[-1] if page_texts else ''),
+        )
+    
+    def extract_text_from_pdf(self, source: PDFSource) -> str:
         """
         PDFからテキストを抽出（PyMuPDF + OCR）
         
         Args:
-            file_path: PDFファイルのパス
+            source: PDFファイルのパス、またはPDFのデータ
             
         Returns:
-            抽出されたテキスト
+            抽出されたテキスト（年度や問題も必要な場合は analyze_pdf() を使用）
+        """
+        _, text = self._read_document(source, _source_name(source))
+        return text
+    
+    def _read_document(self, source: PDFSource, name: str) -> Tuple[List[str], str]:
         """
-        text = ""
-        self.first_page_text = ""  # 年度抽出用に1ページ目のテキストを保存
+        PDFを開いてページごとのテキストと正規化済みの全文を返す
         
+        OCRが必要な場合も同じドキュメントからページ画像を作成するため、PDFの読み込みは1回です。
+        メモリ上のデータはコピーせずにそのまま PyMuPDF に渡します
+        """
         try:
-            # まずPyMuPDFでテキスト抽出を試行
-            logger.info(f"PyMuPDFでテキスト抽出開始: {file_path}")
-            text, self.first_page_text = self._extract_with_pymupdf(file_path)
-            
-            # テキストが少ない場合やOCRが有効な場合はOCRも実行
-            if self.use_ocr and (len(text.strip()) < 100 or self._needs_ocr(text)):
-                logger.info("OCRによる追加テキスト抽出を実行")
-                ocr_text = self._extract_with_ocr(file_path)
-                if len(ocr_text) > len(text):
-                    text = ocr_text
-                    logger.info("OCRテキストを採用")
-                else:
-                    logger.info("PyMuPDFテキストを採用")
+            logger.info("PyMuPDFでテキスト抽出開始: %s", name)
+            with _open_document(source) as doc:
+                page_texts = self._extract_with_pymupdf(doc)
+                text = "".join(page_text + "\n" for page_text in page_texts)
+                
+                # テキストが少ない場合やOCRが有効な場合はOCRも実行
+                if self.use_ocr and (len(text.strip()) < 100 or self._needs_ocr(text)):
+                    logger.info("OCRによる追加テキスト抽出を実行")
+                    ocr_text = self._extract_with_ocr(doc)
+                    if len(ocr_text) > len(text):
+                        text = ocr_text
+                        logger.info("OCRテキストを採用")
+                    else:
+                        logger.info("PyMuPDFテキストを採用")
             
             # エンコーディング正規化
-            text = self._normalize_encoding(text)
+            with stage_timer('normalize'):
+                text = self._normalize_encoding(text)
             
-            logger.info(f"テキスト抽出完了。文字数: {len(text)}")
-            return text
+            logger.info("テキスト抽出完了。文字数: %s", len(text))
+            return page_texts, text
             
         except Exception as e:
-            logger.error(f"PDF処理エラー: {e}")
-            return ""
+            logger.error("PDF処理エラー: %s", e)
+            return [], ""
+    
+    def extract_answer_key(self, source: PDFSource, name: Optional[str] = None) -> Dict[int, str]:
+        """
+        最終ページの正解表のみを読み取る
+        
+        最終ページのテキストから読み取れない場合（画像のみのPDFなど）は、OCRが有効であれば
+        最終ページだけを画像化し、表の範囲を数字と括弧に限定してOCRします（文書全体のOCRは行いません）
+        
+        Args:
+            source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
+            name: ログに使う名前（省略時はファイルパス）
+            
+        Returns:
+            問題番号と正解（半角数字）の辞書
+        """
+        name = name or _source_name(source)
+        try:
+            with _open_document(source) as doc:
+                if len(doc) == 0:
+                    return {}
+                page = doc[-1]
+                with stage_timer('page_text'):
+                    answers = parse_answer_key(page.get_text("text"))
+                if answers or not self.use_ocr:
+                    return answers
+                
+                logger.info("正解表をOCRで読み取り: %s（%sページ目）", name, len(doc))
+                return self._ocr_answer_key(page)
+                
+        except Exception as e:
+            logger.error("正解表の読み取りエラー: %s", e)
+            return {}
     
-    def _extract_with_pymupdf(self, file_path: str) -> Tuple[str, str]:
-        """PyMuPDFでテキスト抽出（全テキストと第1ページを返す）"""
-        text = ""
-        first_page_text = ""
+    def _ocr_answer_key(self, page) -> Dict[int, str]:
+        """
+        正解表のページの表の範囲のみをOCR
+        
+        表の範囲を切り出して横罫線を消し、列ごとに数字と括弧に限定してOCRして、
+        問題番号の列と右隣の正解の列を行ごとに対応付けます
+        """
+        import fitz  # PyMuPDF
+        from PIL import Image
+        from ocr_engine import get_ocr_engine
+        from ocr_preprocess import CROP_PADDING, binarize, remove_rules, table_columns, table_region
+        
+        with stage_timer('rasterize'):
+            pixmap = page.get_pixmap(dpi=ANSWER_KEY_OCR_DPI, colorspace=fitz.csGRAY)
+            image = Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+        
+        with stage_timer('ocr_preprocess'):
+            box = table_region(image)
+            if box is None:
+                return {}
+            table = remove_rules(binarize(image.crop(box)))
+            columns = table_columns(table)
+        
+        # 文字が画像の端に接するとOCRの精度が下がるため、列の左右に余白を付けて切り出す
+        strips = (
+            table.crop((max(0, left - CROP_PADDING), 0, min(table.width, right + CROP_PADDING), table.height))
+            for left, right in columns
+        )
+        results = get_ocr_engine(ANSWER_KEY_OCR_LANG).map(
+            strips, psm=ANSWER_KEY_OCR_PSM, variables={'tessedit_char_whitelist': ANSWER_KEY_OCR_WHITELIST}
+        )
+        
+        answers = parse_answer_key_columns(list(results))
+        logger.info("正解表のOCR結果: %s件（%s列）", len(answers), len(columns))
+        return answers
+    
+    def _extract_with_pymupdf(self, doc) -> List[str]:
+        """PyMuPDFでページごとのテキストを抽出"""
+        page_texts = []
         try:
-            doc = fitz.open(file_path)
-            logger.info(f"ページ数: {len(doc)}")
+            import fitz  # PyMuPDF
+            
+            logger.info("ページ数: %s", len(doc))
             
             for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                # より詳細なテキスト抽出オプションを使用
-                page_text = page.get_text("text", flags=fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_LIGATURES)
+                with stage_timer('page_text'):
+                    page = doc.load_page(page_num)
+                    # より詳細なテキスト抽出オプションを使用
+                    page_text = page.get_text("text", flags=fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_LIGATURES)
                 
                 # エンコーディング問題を解決
                 if isinstance(page_text, bytes):
                     try:
                         page_text = page_text.decode('utf-8')
                     except UnicodeDecodeError:
+                        import chardet
                         detected = chardet.detect(page_text)
                         encoding = detected['encoding'] if detected['encoding'] else 'utf-8'
                         page_text = page_text.decode(encoding, errors='ignore')
                 
-                # 第1ページのテキストを保存（年度抽出用）
-                if page_num == 0:
-                    first_page_text = page_text
-                
-                text += page_text + "\n"
+                page_texts.append(page_text)
             
-            doc.close()
-            return text, first_page_text
+            return page_texts
             
         except Exception as e:
-            logger.error(f"PyMuPDF抽出エラー: {e}")
-            return "", ""
+            logger.error("PyMuPDF抽出エラー: %s", e)
+            return []
     
-    def _extract_with_ocr(self, file_path: str) -> str:
-        """OCRでテキスト抽出"""
-        text = ""
+    def _extract_with_ocr(self, doc) -> str:
+        """OCRでテキスト抽出（開いているドキュメントの全ページを _ocr_pages で読む）"""
         try:
-            # PDFを画像に変換
-            logger.info("PDFを画像に変換中...")
-            images = pdf2image.convert_from_path(
-                file_path,
-                dpi=300,  # 高解像度で変換
-                fmt='PNG'
-            )
+            from ocr_engine import get_ocr_engine
             
-            logger.info(f"変換された画像数: {len(images)}")
-            
-            # 各画像をOCR処理
-            for i, image in enumerate(images):
-                logger.debug(f"ページ {i + 1} OCR処理中...")
-                
-                # 日本語OCR設定
-                custom_config = r'--oem 3 --psm 6 -l jpn'
-                page_text = pytesseract.image_to_string(
-                    image, 
-                    config=custom_config,
-                    lang='jpn'
-                )
-                
-                text += page_text
-                logger.debug(f"ページ {i + 1}: {len(page_text)} 文字抽出")
-            
-            return text
+            logger.info("ページを画像に変換してOCR処理中... (%sページ, %s)", len(doc), get_ocr_engine().name)
+            return "".join(page_text for page_text, _, _ in self._ocr_pages(doc))
             
         except Exception as e:
-            logger.error(f"OCR抽出エラー: {e}")
+            logger.error("OCR抽出エラー: %s", e)
             logger.info("Tesseractがインストールされていない可能性があります")
             return ""
     
+    def _ocr_pages(self, pages) -> List[Tuple[str, float, int]]:
+        """
+        ページをOCR（抽出処理と benchmark_ocr.py で共通）
+        
+        グレースケールで画像化して前処理（二値化・傾き補正・余白とフッターの除去）をし、作成しながら
+        常駐しているOCRエンジン（ocr_engine.py）に渡して複数ページを並列にOCRします。
+        すべてのページを OCR_DPI_STEPS の最初の解像度で読んだあと、単語の平均信頼度が
+        OCR_MIN_CONFIDENCE 未満のページのみ次の解像度で読み直します
+        
+        Args:
+            pages: ページの並び（開いているドキュメント、またはページのリスト）
+            
+        Returns:
+            ページごとの (テキスト, 平均信頼度, 採用した解像度)
+        """
+        from ocr_engine import get_ocr_engine
+        
+        engine = get_ocr_engine()
+        results = {}  # {ページ番号: (テキスト, 平均信頼度, 解像度)}
+        targets = list(range(len(pages)))
+        for dpi in OCR_DPI_STEPS:
+            rendered = []
+            
+            def images():
+                for i in targets:
+                    image = self._render_for_ocr(pages[i], dpi)
+                    if image is None:
+                        # 白紙のページ
+                        results[i] = ("", 100.0, dpi)
+                        continue
+                    rendered.append(i)
+                    yield image
+            
+            for n, data in enumerate(engine.map(images())):
+                i = rendered[n]  # 結果が返る時点で対応するページ画像は作成済み
+                page_text, confidence = ocr_text_and_confidence(data)
+                if i not in results or confidence > results[i][1]:
+                    results[i] = (page_text, confidence, dpi)
+                logger.debug("ページ %s: %s 文字抽出（%sdpi, 信頼度 %.1f）", i + 1, len(page_text), dpi, confidence)
+            
+            targets = [i for i in rendered if results[i][1] < OCR_MIN_CONFIDENCE]
+            if not targets or dpi == OCR_DPI_STEPS[-1]:
+                break
+            OCR_DPI_ESCALATIONS.inc(len(targets))
+            logger.info("OCRの信頼度が低い %sページを解像度を上げて再試行", len(targets))
+        
+        return [results[i] for i in range(len(pages))]
+    
+    def _render_for_ocr(self, page, dpi: int):
+        """ページをグレースケールで画像化し、OCR用の前処理をする（白紙の場合はNone）"""
+        import fitz  # PyMuPDF
+        from PIL import Image
+        from ocr_preprocess import preprocess_for_ocr
+        
+        with stage_timer('rasterize'):
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            image = Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+        
+        with stage_timer('ocr_preprocess'):
+            return preprocess_for_ocr(image)
+    
     def _needs_ocr(self, text: str) -> bool:
         """OCRが必要かどうかを判定"""
         # 日本語文字の割合が低い場合はOCRが必要
-        japanese_chars = len(re.findall(r'[ひらがなカタカナ漢字]', text))
+        japanese_chars = len(re.findall(r'[\u3040-\u30ff\u4e00-\u9fff]', text))
         total_chars = len(text.strip())
         
         if total_chars == 0:
@@ -183,9 +659,12 @@ class EnhancedPDFProcessor:
     def _normalize_encoding(self, text: str) -> str:
         """エンコーディングを正規化"""
         try:
+            import jaconv
+            
             # 文字化け修正
             if isinstance(text, bytes):
                 # バイト列の場合、エンコーディングを検出
+                import chardet
                 detected = chardet.detect(text)
                 encoding = detected.get('encoding', 'utf-8')
                 text = text.decode(encoding, errors='ignore')
@@ -203,74 +682,36 @@ class EnhancedPDFProcessor:
             return text
             
         except Exception as e:
-            logger.error(f"エンコーディング正規化エラー: {e}")
+            logger.error("エンコーディング正規化エラー: %s", e)
             return text
     
-    def extract_questions_from_text(self, text: str) -> List[Dict[str, any]]:
+    def extract_questions_from_text(self, text: str, first_page_text: Optional[str] = None) -> List[Dict[str, any]]:
         """
         テキストから問題を抽出（選択肢も含む）
         
         Args:
             text: 抽出されたテキスト
+            first_page_text: 年度の抽出に使う第1ページのテキスト（省略時はテキストの先頭1000文字）
             
         Returns:
             問題のリスト
         """
+        exam_year = self._extract_exam_year(first_page_text or text[:1000])
+        return self._build_questions(text, exam_year)
+    
+    def _build_questions(self, text: str, exam_year: str) -> List[Dict[str, any]]:
+        """テキストを問題単位に分割し、選択肢を解析して年度を付与"""
         questions = []
         
         try:
             # テキストの前処理
             text = self._preprocess_text(text)
             
-            # 年度を抽出（第1ページのみから）
-            exam_year = self._extract_exam_year(self.first_page_text if hasattr(self, 'first_page_text') else text[:1000])
-            
             logger.info("問題抽出開始")
             
-            # 問題パターンを定義（複数のパターンを試行）
-            question_patterns = [
-                # 【問1】、【問2】... 形式（最も一般的）
-                r'【問\s*(\d+)】\s*([\s\S]+?)(?=【問\s*\d+】|\Z)',
-                # 問1、問2... 形式（括弧なし）
-                r'問\s*(\d+)[^\d]*?([\s\S]*?)(?=問\s*\d+|$)',
-                # 第1問、第2問... 形式
-                r'第\s*(\d+)\s*問[^\d]*?([\s\S]*?)(?=第\s*\d+\s*問|$)',
-                # [問1]、[問2]... 形式
-                r'\[問\s*(\d+)\]\s*([\s\S]*?)(?=\[問\s*\d+\]|$)',
-                # 1.、2.、3.、4. 形式
-                r'(\d+)\s*[.．]\s*([\s\S]*?)(?=\d+\s*[.．]|$)',
-                # [1]、[2]、[3]、[4] 形式
-                r'\[(\d+)\]\s*([\s\S]*?)(?=\[\d+\]|$)',
-                # 1)、2)、3)、4) 形式
-                r'(\d+)\s*[）)]\s*([\s\S]*?)(?=\d+\s*[）)]|$)',
-                # 1-、2-、3-、4- 形式
-                r'(\d+)\s*[-－]\s*([\s\S]*?)(?=\d+\s*[-－]|$)',
-                # No.1、No.2... 形式
-                r'No\.?\s*(\d+)\s*([\s\S]*?)(?=No\.?\s*\d+|$)',
-                # 1:、2:、3:、4: 形式
-                r'(\d+)\s*[:：]\s*([\s\S]*?)(?=\d+\s*[:：]|$)',
-                # 単純な番号+スペース形式
-                r'(\d{1,2})\s+([\s\S]*?)(?=\d{1,2}\s+|$)',
-            ]    
-            
-            # 各パターンを試行
-            all_matches = []
-            for i, pattern in enumerate(question_patterns):
-                try:
-                    matches = re.findall(pattern, text, re.MULTILINE | re.DOTALL)
-                    logger.debug(f"パターン {i+1}: {len(matches)} 件マッチ")
-                    
-                    if matches and len(matches) > 1:  # 複数問題が見つかった場合のみ採用
-                        all_matches = matches
-                        logger.info(f"パターン {i+1} を採用: {len(matches)} 問題")
-                        break
-                except Exception as e:
-                    logger.error(f"パターン {i+1} 処理エラー: {e}")
-            
-            # マッチしなかった場合は単純分割を試行
-            if not all_matches:
-                logger.info("パターンマッチ失敗、単純分割を試行")
-                all_matches = self._simple_question_split(text)
+            # 問題単位に分割
+            with stage_timer('segment'):
+                all_matches = self._segment_questions(text)
             
             # 問題を処理
             for match in all_matches:
@@ -290,15 +731,65 @@ class EnhancedPDFProcessor:
                         questions.append(question_data)
                         
                 except (ValueError, IndexError) as e:
-                    logger.debug(f"問題処理スキップ: {e}")
+                    logger.debug("問題処理スキップ: %s", e)
             
-            logger.info(f"最終抽出問題数: {len(questions)}")
+            logger.info("最終抽出問題数: %s", len(questions))
+            PDF_QUESTIONS_EXTRACTED.inc(len(questions))
             
         except Exception as e:
-            logger.error(f"問題抽出エラー: {e}")
+            logger.error("問題抽出エラー: %s", e)
         
         return questions
     
+    def _segment_questions(self, text: str) -> List[tuple]:
+        """前処理済みテキストを (問題番号, 問題テキスト) のリストに分割"""
+        # 問題パターンを定義（複数のパターンを試行）
+        question_patterns = [
+            # 【問1】、【問2】... 形式（最も一般的）
+            r'【問\s*(\d+)】\s*([\s\S]+?)(?=【問\s*\d+】|\Z)',
+            # 問1、問2... 形式（括弧なし）
+            r'問\s*(\d+)[^\d]*?([\s\S]*?)(?=問\s*\d+|$)',
+            # 第1問、第2問... 形式
+            r'第\s*(\d+)\s*問[^\d]*?([\s\S]*?)(?=第\s*\d+\s*問|$)',
+            # [問1]、[問2]... 形式
+            r'\[問\s*(\d+)\]\s*([\s\S]*?)(?=\[問\s*\d+\]|$)',
+            # 1.、2.、3.、4. 形式
+            r'(\d+)\s*[.．]\s*([\s\S]*?)(?=\d+\s*[.．]|$)',
+            # [1]、[2]、[3]、[4] 形式
+            r'\[(\d+)\]\s*([\s\S]*?)(?=\[\d+\]|$)',
+            # 1)、2)、3)、4) 形式
+            r'(\d+)\s*[）)]\s*([\s\S]*?)(?=\d+\s*[）)]|$)',
+            # 1-、2-、3-、4- 形式
+            r'(\d+)\s*[-－]\s*([\s\S]*?)(?=\d+\s*[-－]|$)',
+            # No.1、No.2... 形式
+            r'No\.?\s*(\d+)\s*([\s\S]*?)(?=No\.?\s*\d+|$)',
+            # 1:、2:、3:、4: 形式
+            r'(\d+)\s*[:：]\s*([\s\S]*?)(?=\d+\s*[:：]|$)',
+            # 単純な番号+スペース形式
+            r'(\d{1,2})\s+([\s\S]*?)(?=\d{1,2}\s+|$)',
+        ]    
+        
+        # 各パターンを試行
+        all_matches = []
+        for i, pattern in enumerate(question_patterns):
+            try:
+                matches = re.findall(pattern, text, re.MULTILINE | re.DOTALL)
+                logger.debug("パターン %s: %s 件マッチ", i+1, len(matches))
+                
+                if matches and len(matches) > 1:  # 複数問題が見つかった場合のみ採用
+                    all_matches = matches
+                    logger.info("パターン %s を採用: %s 問題", i+1, len(matches))
+                    break
+            except Exception as e:
+                logger.error("パターン %s 処理エラー: %s", i+1, e)
+        
+        # マッチしなかった場合は単純分割を試行
+        if not all_matches:
+            logger.info("パターンマッチ失敗、単純分割を試行")
+            all_matches = self._simple_question_split(text)
+        
+        return all_matches
+    
     def _preprocess_text(self, text: str) -> str:
         """テキストの前処理"""
         # 不要な空白や改行を整理
@@ -309,6 +800,8 @@ class EnhancedPDFProcessor:
     
     def _extract_exam_year(self, text: str) -> str:
         """テキストから試験年度を抽出"""
+        import jaconv
+        
         # 優先度の高い順にパターンを定義（全角数字も含む）
         priority_patterns = [
             # 1. 最優先: 「令和６年度」のような独立した年度表記
@@ -423,44 +916,46 @@ class EnhancedPDFProcessor:
             best_split_pos = len(full_text)  # 最初の選択肢位置
             
             # 選択肢を抽出
-            for i, pattern in enumerate(option_patterns):
-                matches = re.findall(pattern, full_text, re.MULTILINE | re.DOTALL)
-                logger.debug(f"パターン {i+1}: {len(matches)} マッチ")
+            with stage_timer('option_parse'):
+                for i, pattern in enumerate(option_patterns):
+                    matches = re.findall(pattern, full_text, re.MULTILINE | re.DOTALL)
+                    logger.debug("パターン %s: %s マッチ", i+1, len(matches))
                 
-                if len(matches) >= 3:  # 3つ以上の選択肢があれば採用
-                    logger.debug(f"パターン {i+1} を採用: {len(matches)} マッチ")
+                    if len(matches) >= 3:  # 3つ以上の選択肢があれば採用
+                        logger.debug("パターン %s を採用: %s マッチ", i+1, len(matches))
                     
-                    # 選択肢をクリーンアップ（タプルの2番目要素がテキスト）
-                    raw_options = [match[1] for match in matches if len(match) >= 2 and match[1].strip()]
-                    logger.debug(f"生の選択肢数: {len(raw_options)}")
+                        # 選択肢をクリーンアップ（タプルの2番目要素がテキスト）
+                        raw_options = [match[1] for match in matches if len(match) >= 2 and match[1].strip()]
+                        logger.debug("生の選択肢数: %s", len(raw_options))
                     
-                    options = [self._clean_option_text(opt) for opt in raw_options]
-                    options = [opt for opt in options if opt.strip()]  # 空の選択肢を除去
-                    logger.debug(f"クリーンアップ後の選択肢数: {len(options)}")
+                        options = [self._clean_option_text(opt) for opt in raw_options]
+                        options = [opt for opt in options if opt.strip()]  # 空の選択肢を除去
+                        logger.debug("クリーンアップ後の選択肢数: %s", len(options))
                     
-                    if options:  # クリーンアップ後に選択肢が残っているかチェック
-                        # 最初の選択肢の位置を見つけて問題文を分離
-                        first_option_match = re.search(pattern, full_text, re.MULTILINE | re.DOTALL)
-                        if first_option_match:
-                            split_pos = first_option_match.start()
-                            if split_pos < best_split_pos:
-                                best_split_pos = split_pos
-                                question_text = full_text[:split_pos].strip()
+                        if options:  # クリーンアップ後に選択肢が残っているかチェック
+                            # 最初の選択肢の位置を見つけて問題文を分離
+                            first_option_match = re.search(pattern, full_text, re.MULTILINE | re.DOTALL)
+                            if first_option_match:
+                                split_pos = first_option_match.start()
+                                if split_pos < best_split_pos:
+                                    best_split_pos = split_pos
+                                    question_text = full_text[:split_pos].strip()
                         
-                        logger.debug(f"パターン {i+1} 最終採用: {len(options)} 選択肢抽出")
-                        break
-                    else:
-                        logger.debug(f"パターン {i+1}: クリーンアップ後に選択肢が空")
+                            logger.debug("パターン %s 最終採用: %s 選択肢抽出", i+1, len(options))
+                            break
+                        else:
+                            logger.debug("パターン %s: クリーンアップ後に選択肢が空", i+1)
                 
-                # 問題文が空の場合は全テキストを使用
-                if not question_text.strip():
-                    question_text = full_text
+                    # 問題文が空の場合は全テキストを使用
+                    if not question_text.strip():
+                        question_text = full_text
             
             # 問題文の最後の整理（不完全な文を除去）
             question_text = self._clean_question_text(question_text)
             
             # ジャンル分類
-            genre = self._classify_question_genre(question_text)
+            with stage_timer('classify'):
+                genre = self._classify_question_genre(question_text)
             
             result = {
                 'question_number': question_num,
@@ -469,11 +964,11 @@ class EnhancedPDFProcessor:
                 'genre': genre
             }
             
-            logger.debug(f"問題 {question_num}: テキスト長={len(question_text)}, 選択肢数={len(options)}")
+            logger.debug("問題 %s: テキスト長=%s, 選択肢数=%s", question_num, len(question_text), len(options))
             return result
             
         except Exception as e:
-            logger.error(f"問題解析エラー (問題{question_num}): {e}")
+            logger.error("問題解析エラー (問題%s): %s", question_num, e)
             return None
     
     def _clean_question_text(self, text: str) -> str:
@@ -533,7 +1028,8 @@ class EnhancedPDFProcessor:
         text = text.strip()
         
         # デバッグ情報
-        logger.debug(f"オプションテキストクリーンアップ後: {len(text)} 文字 - {text[:50]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("オプションテキストクリーンアップ後: %s 文字 - %s...", len(text), text[:50])
         
         return text
     
@@ -564,43 +1060,150 @@ class EnhancedPDFProcessor:
             return 'others'
 
 
-def extract_questions_from_pdf(file_path: str, use_ocr: bool = True) -> List[Dict[str, any]]:
+def _source_name(source: PDFSource) -> str:
+    """ログ用の名前（メモリ上のデータはサイズで表す）"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return f"<memory {len(source)} bytes>"
+
+
+# 共有する処理クラスのインスタンス（状態を持たないため、スレッドやプロセスをまたいで使い回せる）
+_processors = {use_ocr: EnhancedPDFProcessor(use_ocr=use_ocr) for use_ocr in (True, False)}
+
+
+def get_processor(use_ocr: bool = True) -> EnhancedPDFProcessor:
+    """共有の処理クラスのインスタンスを取得"""
+    return _processors[bool(use_ocr)]
+
+
+def extraction_options(use_ocr: bool = True) -> str:
+    """
+    抽出結果に影響する設定（取り込んだPDFごとに EXTRACTOR_VERSION とあわせて記録する）
+
+    Returns:
+        設定のJSON文字列（同じ設定からは同じ文字列）
+    """
+    import json
+
+    options = {'use_ocr': bool(use_ocr)}
+    if use_ocr:
+        options.update({
+            'ocr_dpi_steps': list(OCR_DPI_STEPS),
+            'ocr_min_confidence': OCR_MIN_CONFIDENCE,
+        })
+    return json.dumps(options, sort_keys=True)
+
+
+def extract_questions_from_pdf(source: PDFSource, use_ocr: bool = True) -> List[Dict[str, any]]:
     """
     PDFから問題を抽出する関数（既存のapp.pyとの互換性維持）
     
     Args:
-        file_path: PDFファイルのパス
+        source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
         use_ocr: OCRを使用するかどうか
         
     Returns:
         問題のリスト
     """
-    processor = EnhancedPDFProcessor(use_ocr=use_ocr)
-    
-    # テキスト抽出
-    text = processor.extract_text_from_pdf(file_path)
-    
-    if not text.strip():
-        logger.warning("テキストが抽出されませんでした")
-        return []
+    return [_thaw_question(question) for question in get_processor(use_ocr).analyze_pdf(source).questions]
+
+
+def analyze_pdf(source: PDFSource, use_ocr: bool = True, name: Optional[str] = None) -> PDFAnalysis:
+    """
+    PDFを1回だけ開いて問題・年度・正解表をまとめて抽出する関数
     
-    # 問題抽出
-    questions = processor.extract_questions_from_text(text)
+    Args:
+        source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
+        use_ocr: OCRを使用するかどうか
+        name: ログと解析結果に使う名前
+        
+    Returns:
+        解析結果
+    """
+    return get_processor(use_ocr).analyze_pdf(source, name=name)
+
+
+def needs_ocr(source: PDFSource, sample_pages: int = OCR_PROBE_PAGES) -> bool:
+    """
+    抽出にOCRが必要になりそうか（テキストレイヤーがないか）を先頭の数ページのみで判定
+
+    取り込みの順番を決めるための簡易な判定です（ページ画像の作成やOCRは行いません）
+
+    Args:
+        source: PDFファイルのパス、またはPDFのデータ
+        sample_pages: 判定に使うページ数
+    """
+    try:
+        with _open_document(source) as doc:
+            text = "".join(doc[number].get_text() for number in range(min(sample_pages, len(doc))))
+    except Exception as e:
+        logger.warning("PDFを開けないためOCRの要否を判定できません: %s", e)
+        return False
+    return len(text.strip()) < 100 or get_processor(True)._needs_ocr(text)
+
+
+def extract_answer_key(source: PDFSource, use_ocr: bool = True, name: Optional[str] = None) -> Dict[int, str]:
+    """
+    最終ページの正解表のみを読み取る関数（画像のみの正解表は表の範囲だけをOCR）
     
-    return questions
+    Args:
+        source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
+        use_ocr: テキストから読み取れない場合にOCRを使用するかどうか
+        name: ログに使う名前
+        
+    Returns:
+        問題番号と正解（半角数字）の辞書
+    """
+    return get_processor(use_ocr).extract_answer_key(source, name=name)
 
 
-if __name__ == "__main__":
-    # テスト用
-    import sys
-    if len(sys.argv) > 1:
-        test_file = sys.argv[1]
-        if os.path.exists(test_file):
-            questions = extract_questions_from_pdf(test_file)
-            print(f"抽出された問題数: {len(questions)}")
-            for q in questions[:3]:  # 最初の3問を表示
-                print(f"問題 {q['question_number']}: {q['question_text'][:100]}...")
-        else:
-            print(f"ファイルが見つかりません: {test_file}")
+def read_last_page_text(source: PDFSource) -> str:
+    """
+    最終ページ（正解表）のテキストのみを読み込む（正解の抽出スクリプトでの確認用）
+
+    Args:
+        source: PDFファイルのパス、またはPDFのデータ（bytes / memoryview / mmap）
+    """
+    with _open_document(source) as doc:
+        return doc[-1].get_text("text") if len(doc) else ''
+
+
+def main():
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description='PDFから問題を抽出して件数と先頭の問題を表示')
+    parser.add_argument('pdf', help='PDFファイルのパス')
+    parser.add_argument('--no-ocr', action='store_true', help='OCRを使用しない')
+    parser.add_argument('--profile', action='store_true',
+                        help='cProfileとスタックのサンプリングで計測し、段階別の処理時間を表示')
+    parser.add_argument('--profile-dir', default=None, help='プロファイルの出力先（省略時は profiles/）')
+    args = parser.parse_args()
+
+    configure_logging()
+    if not os.path.exists(args.pdf):
+        print(f"ファイルが見つかりません: {args.pdf}")
+        return 1
+
+    if args.profile:
+        from profiling import PROFILE_DIR, run_profiled, print_report
+
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.path.splitext(os.path.basename(args.pdf))[0]}"
+        questions, report = run_profiled(
+            extract_questions_from_pdf, args.pdf, not args.no_ocr,
+            name=name, output_dir=args.profile_dir or PROFILE_DIR
+        )
     else:
-        print("使用方法: python pdf_processor.py <PDFファイルパス>")
+        questions = extract_questions_from_pdf(args.pdf, use_ocr=not args.no_ocr)
+
+    print(f"抽出された問題数: {len(questions)}")
+    for q in questions[:3]:  # 最初の3問を表示
+        print(f"問題 {q['question_number']}: {q['question_text'][:100]}...")
+
+    if args.profile:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+プロファイルモジュール
+PDF1件の処理を cProfile とスタックのサンプリングで計測し、次のファイルを出力します
+
+- <名前>.prof: cProfile の統計（`python -m pstats` や snakeviz で確認、正規表現1回ごとの呼び出し元も分かる）
+- <名前>.collapsed: サンプリングしたスタック（flamegraph.pl や speedscope でフレームグラフとして表示）
+
+あわせて、処理の段階（metrics.PIPELINE_STAGES）ごとの回数と処理時間を集計します
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from typing import Callable, Dict, Tuple
+
+from metrics import record_stages
+
+# プロファイルの出力先（環境変数 PROFILE_DIR で変更可能）
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+# スタックをサンプリングする間隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# 待機中のスレッドとみなす最も内側の関数（ファイル名, 関数名）。ログ書き込みやOCRの待機中のスレッドは記録しない
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('queue.py', 'get'),
+    ('handlers.py', 'dequeue'),
+    ('thread.py', '_worker'),
+}
+
+
+class StackSampler:
+    """
+    一定間隔で全スレッドのスタックを記録する（OCRのスレッドも含む、待機中のスレッドは除く）
+
+    C言語で実装された処理（正規表現のマッチなど）の実行中はサンプリングできないため、
+    その時間は直後に記録したスタックにまとめて計上されます。関数ごとの正確な時間は .prof で確認します
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (
+                    (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+                ):
+                    continue
+                labels = []
+                while frame is not None:
+                    code = frame.f_code
+                    labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(label.replace(';', ':') for label in reversed(labels))] += 1
+
+    def write_collapsed(self, path: str):
+        """折りたたみ形式（1行に「呼び出し元;...;関数 回数」）で書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def run_profiled(fn: Callable, *args, name: str, output_dir: str = PROFILE_DIR) -> Tuple[any, Dict[str, any]]:
+    """
+    処理を計測しながら実行
+
+    Args:
+        fn: 実行する処理
+        name: 出力ファイル名（拡張子なし）
+        output_dir: 出力先のディレクトリ
+
+    Returns:
+        (処理の戻り値, {'seconds': 全体の秒数, 'stages': {段階: {'count': 回数, 'seconds': 秒}},
+                        'samples': サンプル数, 'stats_file': .prof のパス, 'collapsed_file': .collapsed のパス})
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats_file = os.path.join(output_dir, f"{name}.prof")
+    collapsed_file = os.path.join(output_dir, f"{name}.collapsed")
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    start = time.perf_counter()
+    with record_stages() as stages:
+        sampler.start()
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+            sampler.stop()
+    seconds = time.perf_counter() - start
+
+    profiler.dump_stats(stats_file)
+    sampler.write_collapsed(collapsed_file)
+
+    return result, {
+        'seconds': round(seconds, 4),
+        'stages': {
+            stage: {'count': count, 'seconds': round(total, 4)}
+            for stage, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1])
+        },
+        'samples': sum(sampler.stacks.values()),
+        'stats_file': stats_file,
+        'collapsed_file': collapsed_file,
+    }
+
+
+def print_report(report: Dict[str, any], top: int = 15):
+    """段階別の処理時間と、累積時間の上位の関数を表示"""
+    print(f"\n処理時間: {report['seconds']:.3f}秒")
+    print(f"{'段階':<16}{'回数':>8}{'秒':>10}{'割合':>8}")
+    for stage, entry in report['stages'].items():
+        share = entry['seconds'] / report['seconds'] * 100 if report['seconds'] else 0
+        print(f"{stage:<16}{entry['count']:>8}{entry['seconds']:>10.3f}{share:>7.1f}%")
+
+    print(f"\n累積時間の上位{top}件（{report['stats_file']}）")
+    pstats.Stats(report['stats_file'], stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+    print(f"フレームグラフ用のスタック: {report['collapsed_file']}（{report['samples']}サンプル）")
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+問題バンクのスナップショット
+問題（選択肢を含む）と、出題・閲覧用の索引（正解データのある問題のジャンル別IDプール、年度・問題番号順の並び）、
+ホーム画面とファイル一覧の問題数を、読み取り専用の1ファイルに書き出します。
+Webサーバーはこのファイルをメモリマップして読むため、出題・閲覧のページでSQLiteを使いません。
+取り込みを行うサーバーとデータベースを共有せずに、複数台のWebサーバーで出題できます
+
+ファイルの構成（数値はリトルエンディアン、各セクションは8バイト境界から）:
+    ヘッダー: マジック b'TKQB'・形式のバージョン（uint32）・メタデータの長さ（uint32）
+    メタデータ: JSON（スナップショットのバージョン・作成日時・問題数・ジャンル別プールと年度の範囲・
+               問題数の集計・ファイル一覧・各セクションの位置）
+    ids: 問題ID（uint32、昇順）
+    offsets: 各問題のデータの開始位置（uint64、問題数+1個）
+    pools: ジャンル別の正解データのある問題の番号（uint32、ジャンルごとに連続）
+    exam: 年度別の問題の番号（uint32、年度ごとに連続し、年度内は問題番号・問題ID順）
+    exam_numbers: exam の各問題の問題番号（int32）
+    records: 問題ごとのJSON（UTF-8）
+
+読み込み時に解析するのはヘッダーとメタデータのみで、問題は出題時に1問ずつ読みます。
+新しいスナップショットは別名で書き出してから、現在のファイル名を記録した CURRENT を置き換えるため、
+出題中のWebサーバーは CURRENT の変更を検知して次のリクエストから新しいファイルに切り替えます
+
+使用方法:
+    python question_bank.py build [--db takken_exam.db] [--dir snapshots]   # スナップショットを作成
+    python question_bank.py info [--dir snapshots]                          # 現在のスナップショットを表示
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import bisect
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from exam_browse import EXAM_PAGE_SIZE, get_exam_page
+from question_stats import get_bank_version, get_question_counts
+
+logger = logging.getLogger(__name__)
+
+# スナップショットの保存先（環境変数 QUESTION_SNAPSHOT_DIR を指定するとWebアプリはスナップショットから出題する）
+SNAPSHOT_DIR = os.environ.get('QUESTION_SNAPSHOT_DIR', 'snapshots')
+
+# 現在のスナップショットのファイル名を記録するファイル
+CURRENT_FILE = 'CURRENT'
+
+# 残しておく古いスナップショットの数（切り替え前のファイルを読んでいるサーバーのため）
+SNAPSHOT_KEEP = 3
+
+# 新しいスナップショットの有無を確認する間隔（秒）
+SNAPSHOT_CHECK_INTERVAL = 5.0
+
+MAGIC = b'TKQB'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sII')
+
+# IDプールのうち、全ジャンルの問題（ランダム出題用）
+ALL_GENRES = 'random'
+
+# 数値のセクションと型（records 以外）
+NUMERIC_SECTIONS = (('ids', 'I'), ('offsets', 'Q'), ('pools', 'I'), ('exam', 'I'), ('exam_numbers', 'i'))
+
+
+def _align(position: int) -> int:
+    return (position + 7) & ~7
+
+
+def _pack(values: array) -> bytes:
+    """配列をリトルエンディアンのバイト列にする"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_current(directory: str) -> Optional[str]:
+    """現在のスナップショットのファイル名（未作成の場合はNone）"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _count(counts: Dict[str, list], key: str, answered: bool):
+    total = counts.setdefault(key, [0, 0])
+    total[0] += 1
+    total[1] += answered
+
+
+def build_snapshot(db_path: str, directory: str = SNAPSHOT_DIR, keep: int = SNAPSHOT_KEEP) -> Optional[str]:
+    """
+    データベースから問題バンクのスナップショットを作成
+
+    内容が現在のスナップショットと同じ場合は作成しません
+
+    Returns:
+        作成したスナップショットのパス（作成しなかった場合はNone）
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, pdf_id, question_text, options, correct_answer, genre, question_number, year
+        FROM questions
+        ORDER BY id
+    ''')
+    rows = cursor.fetchall()
+    cursor.execute('SELECT id, original_name, upload_date FROM pdf_files ORDER BY upload_date DESC')
+    pdf_files = cursor.fetchall()
+    conn.close()
+
+    ids = array('I')
+    offsets = array('Q', [0])
+    pools: Dict[str, List[int]] = {}
+    exam: Dict[str, List[Tuple[int, int, int]]] = {}
+    counts = {'all': {}, 'pdf': {}, 'genre': {}, 'year': {}}
+    records = bytearray()
+    for index, (question_id, pdf_id, text, options, answer, genre, number, year) in enumerate(rows):
+        try:
+            options = json.loads(options) if options else []
+        except (json.JSONDecodeError, TypeError):
+            options = []
+        records += json.dumps({
+            'id': question_id,
+            'question_text': text,
+            'options': options,
+            'correct_answer': answer,
+            'genre': genre,
+            'question_number': number,
+            'year': year or '',
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ids.append(question_id)
+        offsets.append(len(records))
+
+        # 集計のキーは question_stats の question_counts テーブルと同じ（NULLは空文字）
+        answered = bool(answer)
+        _count(counts['all'], '', answered)
+        _count(counts['pdf'], str(pdf_id) if pdf_id is not None else '', answered)
+        _count(counts['genre'], genre or '', answered)
+        _count(counts['year'], year or '', answered)
+        if answered:
+            pools.setdefault(genre, []).append(index)
+            pools.setdefault(ALL_GENRES, []).append(index)
+        if year and number is not None:
+            exam.setdefault(year, []).append((number, question_id, index))
+
+    pool_array = array('I')
+    genres = {}
+    for genre, indexes in pools.items():
+        genres[genre] = [len(pool_array), len(indexes)]
+        pool_array.extend(indexes)
+
+    exam_array = array('I')
+    exam_numbers = array('i')
+    years = {}
+    for year, keys in exam.items():
+        keys.sort()
+        years[year] = [len(exam_array), len(keys)]
+        exam_array.extend(index for _, _, index in keys)
+        exam_numbers.extend(number for number, _, _ in keys)
+
+    files = []
+    for pdf_id, original_name, upload_date in pdf_files:
+        total, answered = counts['pdf'].get(str(pdf_id), (0, 0))
+        files.append({
+            'id': pdf_id, 'original_name': original_name, 'upload_date': upload_date,
+            'question_count': total, 'answered_count': answered,
+        })
+
+    digest = hashlib.sha256(records + json.dumps(files, ensure_ascii=False).encode('utf-8')).hexdigest()
+    os.makedirs(directory, exist_ok=True)
+    current = _read_current(directory)
+    previous = None
+    if current:
+        try:
+            previous = QuestionBankSnapshot(os.path.join(directory, current))
+        except (OSError, ValueError) as e:
+            logger.warning("現在のスナップショットを読み込めません: %s", e)
+    if previous is not None:
+        previous_version, previous_digest = previous.version, previous.digest
+        previous.close()
+        if previous_digest == digest:
+            return None
+    else:
+        previous_version = 0
+
+    version = previous_version + 1
+    sections = [
+        ('ids', _pack(ids)), ('offsets', _pack(offsets)), ('pools', _pack(pool_array)),
+        ('exam', _pack(exam_array)), ('exam_numbers', _pack(exam_numbers)), ('records', bytes(records)),
+    ]
+    meta = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'question_count': len(rows),
+        'digest': digest,
+        'genres': genres,
+        'years': years,
+        'counts': {scope: {key: list(total) for key, total in keys.items()} for scope, keys in counts.items() if scope != 'pdf'},
+        'files': files,
+        'sections': {},
+    }
+    # メタデータの長さはセクションの位置によって変わるため、位置が確定するまで計算し直す
+    meta_length = 0
+    while True:
+        position = _align(HEADER.size + meta_length)
+        for name, data in sections:
+            meta['sections'][name] = [position, len(data)]
+            position = _align(position + len(data))
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(meta_bytes) == meta_length:
+            break
+        meta_length = len(meta_bytes)
+
+    file_name = f"question_bank_{version:06d}.snapshot"
+    path = os.path.join(directory, file_name)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, meta_length))
+        f.write(meta_bytes)
+        for name, data in sections:
+            f.write(b'\0' * (meta['sections'][name][0] - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+    # 書き出しが完了してから CURRENT を置き換える
+    current_temp = os.path.join(directory, CURRENT_FILE + '.tmp')
+    with open(current_temp, 'w', encoding='utf-8') as f:
+        f.write(file_name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(current_temp, os.path.join(directory, CURRENT_FILE))
+
+    _remove_old_snapshots(directory, keep)
+    return path
+
+
+def _remove_old_snapshots(directory: str, keep: int):
+    """古いスナップショットを削除（使用中で削除できないもの（Windows）は次回に削除）"""
+    snapshots = sorted(name for name in os.listdir(directory) if name.endswith('.snapshot'))
+    for name in snapshots[:-keep] if keep > 0 else []:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+class QuestionBankSnapshot:
+    """メモリマップしたスナップショット（読み取り専用のため複数のスレッドから同時に使える）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format_version, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"スナップショットの形式が正しくありません: {path}")
+        meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_length])
+
+        self.version = meta['version']
+        self.created_at = meta['created_at']
+        self.question_count = meta['question_count']
+        self.digest = meta['digest']
+        self.genres = {genre: tuple(pool) for genre, pool in meta['genres'].items()}
+        self.years = {year: tuple(pool) for year, pool in meta['years'].items()}
+        self._counts = meta['counts']
+        self._files = meta['files']
+
+        view = memoryview(self._mmap)
+        sections = {name: view[start:start + length] for name, (start, length) in meta['sections'].items()}
+        numeric = {}
+        for name, typecode in NUMERIC_SECTIONS:
+            if sys.byteorder == 'little':
+                numeric[name] = sections[name].cast(typecode)
+            else:
+                # ビッグエンディアンの環境では数値の配列のみ変換して読み込む
+                numeric[name] = self._swapped(sections[name], typecode)
+        self._ids = numeric['ids']
+        self._offsets = numeric['offsets']
+        self._pools = numeric['pools']
+        self._exam = numeric['exam']
+        self._exam_numbers = numeric['exam_numbers']
+        self._records = sections['records']
+        self._views = [view, *sections.values(), *numeric.values()]
+
+    @staticmethod
+    def _swapped(section, typecode: str) -> array:
+        values = array(typecode, bytes(section))
+        values.byteswap()
+        return values
+
+    def question_at(self, index: int) -> Dict[str, any]:
+        """番号（ID順）で問題を取得"""
+        return json.loads(self._records[self._offsets[index]:self._offsets[index + 1]].tobytes())
+
+    def get(self, question_id: int) -> Optional[Dict[str, any]]:
+        """IDで問題を取得"""
+        index = bisect.bisect_left(self._ids, question_id)
+        if index < len(self._ids) and self._ids[index] == question_id:
+            return self.question_at(index)
+        return None
+
+    def pool(self, genre: str) -> List[int]:
+        """ジャンル別の正解データのある問題IDプール（'random' は全ジャンル）"""
+        start, count = self.genres.get(genre, (0, 0))
+        return [self._ids[index] for index in self._pools[start:start + count]]
+
+    def random_question(self, genre: str, rng: Optional[random.Random] = None) -> Optional[Dict[str, any]]:
+        """ジャンルから1問をランダムに取得（'random' は全ジャンルから）"""
+        start, count = self.genres.get(genre, (0, 0))
+        if count == 0:
+            return None
+        return self.question_at(self._pools[start + (rng or random).randrange(count)])
+
+    def question_counts(self) -> Dict[str, any]:
+        """全体・ジャンル別・年度別の問題数（question_stats.get_question_counts と同じ形式）"""
+        total, answered = self._counts['all'].get('', (0, 0))
+        return {
+            'total': total,
+            'answered': answered,
+            'genre': {key: tuple(value) for key, value in self._counts['genre'].items()},
+            'year': {key: tuple(value) for key, value in sorted(self._counts['year'].items(), reverse=True)},
+        }
+
+    def files(self) -> List[Dict[str, any]]:
+        """取り込んだPDFの一覧（アップロード日時の新しい順、問題数つき）"""
+        return [dict(file) for file in self._files]
+
+    def _exam_key(self, position: int) -> Tuple[int, int]:
+        return self._exam_numbers[position], self._ids[self._exam[position]]
+
+    def exam_page(self, year: str, number: int, start_id: int = 0, page_size: int = EXAM_PAGE_SIZE) -> Dict[str, any]:
+        """年度の問題を1ページ分取得（exam_browse.get_exam_page と同じ形式）"""
+        start, count = self.years.get(year, (0, 0))
+        end = start + count
+
+        # (問題番号, 問題ID) が指定以上の最初の位置を二分探索
+        low, high = start, end
+        while low < high:
+            middle = (low + high) // 2
+            if self._exam_key(middle) < (number, start_id):
+                low = middle + 1
+            else:
+                high = middle
+        stop = min(low + page_size, end)
+
+        questions = []
+        for position in range(low, stop):
+            record = self.question_at(self._exam[position])
+            record.pop('year', None)
+            questions.append(record)
+        return {
+            'year': year,
+            'questions': questions,
+            'next': self._exam_key(stop) if stop < end else None,
+            'prev': self._exam_key(max(start, low - page_size)) if low > start else None,
+        }
+
+    def close(self):
+        """メモリマップを閉じる（出題中のリクエストがない場合のみ）"""
+        for view in reversed(self._views):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+
+
+class DatabaseQuestionBank:
+    """QuestionBankSnapshot と同じ窓口でデータベースから読む（スナップショットを使わない設定の場合）"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.version = get_bank_version(cursor)
+
+    def question_counts(self) -> Dict[str, any]:
+        return get_question_counts(self.cursor)
+
+    def files(self) -> List[Dict[str, any]]:
+        """取り込んだPDFの一覧（問題数は集計テーブルから読み、問題テーブルは走査しない）"""
+        self.cursor.execute('''
+            SELECT pf.id, pf.original_name, pf.upload_date, COALESCE(c.total, 0), COALESCE(c.answered, 0)
+            FROM pdf_files pf
+            LEFT JOIN question_counts c ON c.scope = 'pdf' AND c.key = CAST(pf.id AS TEXT)
+            ORDER BY pf.upload_date DESC
+        ''')
+        return [
+            {'id': row[0], 'original_name': row[1], 'upload_date': row[2], 'question_count': row[3], 'answered_count': row[4]}
+            for row in self.cursor.fetchall()
+        ]
+
+    def exam_page(self, year: str, number: int, start_id: int = 0, page_size: int = EXAM_PAGE_SIZE) -> Dict[str, any]:
+        return get_exam_page(self.cursor, year, number, start_id, page_size)
+
+
+class SnapshotLoader:
+    """
+    現在のスナップショットを読み込み、新しいものが作成されたら切り替える
+
+    CURRENT の確認は SNAPSHOT_CHECK_INTERVAL ごとに行います。切り替え前のスナップショットは
+    参照がなくなった時点で閉じられるため、読み込み中のリクエストには影響しません
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, check_interval: float = SNAPSHOT_CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._file_name = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[QuestionBankSnapshot]:
+        """現在のスナップショット（未作成の場合はNone）"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._reload()
+                self._checked_at = now
+        return self._snapshot
+
+    def _reload(self):
+        file_name = _read_current(self.directory)
+        if file_name is None or file_name == self._file_name:
+            return
+        try:
+            snapshot = QuestionBankSnapshot(os.path.join(self.directory, file_name))
+        except (OSError, ValueError) as e:
+            logger.error("スナップショットを読み込めません: %s", e)
+            return
+        self._snapshot, self._file_name = snapshot, file_name
+        logger.info("問題バンクのスナップショットを読み込みました: %s（%s問）", file_name, snapshot.question_count)
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--dir', default=SNAPSHOT_DIR, help='スナップショットの保存先')
+    parser = argparse.ArgumentParser(description='問題バンクのスナップショット')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', parents=[common], help='データベースからスナップショットを作成')
+    build_parser.add_argument('--db', default='takken_exam.db', help='データベースファイル')
+    build_parser.add_argument('--keep', type=int, default=SNAPSHOT_KEEP, help='残しておくスナップショットの数')
+    subparsers.add_parser('info', parents=[common], help='現在のスナップショットを表示')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        path = build_snapshot(args.db, args.dir, args.keep)
+        if path is None:
+            print("問題バンクに変更がないため、スナップショットは作成しませんでした")
+            return 0
+        print(f"スナップショットを作成しました: {path}（{os.path.getsize(path) / 1024:.0f}KB、"
+              f"{time.perf_counter() - start:.2f}秒）")
+
+    snapshot = SnapshotLoader(args.dir).current()
+    if snapshot is None:
+        print(f"スナップショットがありません: {args.dir}")
+        return 1
+    print(f"バージョン: {snapshot.version}（{snapshot.created_at}）")
+    counts = snapshot.question_counts()
+    print(f"問題数: {counts['total']}問（正解あり {counts['answered']}問）")
+    for genre, (_, count) in snapshot.genres.items():
+        print(f"  {genre}: {count}問")
+    print(f"年度: {len(snapshot.years)}年度 / PDF: {len(snapshot.files())}件")
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
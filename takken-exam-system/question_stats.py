@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+問題数の集計テーブル
+PDF別・ジャンル別・年度別・全体の問題数と正解データのある問題数を question_counts テーブルに保持します。
+集計は questions テーブルのトリガーで更新するため、取り込み・再処理・正解データの登録スクリプトなど
+どこから問題を変更しても、その変更と同じトランザクションで反映されます。
+ファイル一覧やホーム画面は問題を数え直さず、この集計を読むだけで表示できます
+
+あわせて、問題またはPDFが変更されるたびに上がる問題バンクのバージョン（bank_version テーブル）を
+保持します（ページのETagに使用）
+
+使用方法:
+    python question_stats.py [--db takken_exam.db]            # 集計を表示
+    python question_stats.py [--db takken_exam.db] --rebuild  # 問題テーブルから集計を作り直す
+"""
+
+import sys
+import sqlite3
+import argparse
+from typing import Dict, List, Tuple
+
+# 集計の単位と、問題の行から集計のキーを求める式
+COUNT_SCOPES = {
+    'all': "''",
+    'pdf': "COALESCE(CAST({row}.pdf_id AS TEXT), '')",
+    'genre': "COALESCE({row}.genre, '')",
+    'year': "COALESCE({row}.year, '')",
+}
+
+# 正解データのある問題かどうか（1 / 0）
+ANSWERED = "({row}.correct_answer IS NOT NULL AND {row}.correct_answer != '')"
+
+COUNT_TRIGGERS = ('questions_count_insert', 'questions_count_delete', 'questions_count_update')
+
+
+def _add_statements(row: str) -> List[str]:
+    answered = ANSWERED.format(row=row)
+    return [
+        f"INSERT INTO question_counts (scope, key, total, answered) "
+        f"VALUES ('{scope}', {key.format(row=row)}, 1, {answered}) "
+        f"ON CONFLICT(scope, key) DO UPDATE SET total = total + 1, answered = answered + excluded.answered;"
+        for scope, key in COUNT_SCOPES.items()
+    ]
+
+
+def _remove_statements(row: str) -> List[str]:
+    answered = ANSWERED.format(row=row)
+    statements = []
+    for scope, key in COUNT_SCOPES.items():
+        key = key.format(row=row)
+        statements.append(
+            f"UPDATE question_counts SET total = total - 1, answered = answered - {answered} "
+            f"WHERE scope = '{scope}' AND key = {key};"
+        )
+        if scope != 'all':
+            # 問題がなくなったPDF・ジャンル・年度の行は残さない
+            statements.append(f"DELETE FROM question_counts WHERE scope = '{scope}' AND key = {key} AND total <= 0;")
+    return statements
+
+
+def create_count_triggers(cursor):
+    """問題の追加・削除・更新時に集計を更新するトリガーを作成"""
+    changed = ' OR '.join(
+        [f"OLD.{column} IS NOT NEW.{column}" for column in ('pdf_id', 'genre', 'year')]
+        + [f"{ANSWERED.format(row='OLD')} != {ANSWERED.format(row='NEW')}"]
+    )
+    definitions = {
+        'questions_count_insert': ('AFTER INSERT ON questions', _add_statements('NEW')),
+        'questions_count_delete': ('AFTER DELETE ON questions', _remove_statements('OLD')),
+        # 問題文や選択肢のみの更新（再処理など）では集計を変更しない
+        'questions_count_update': (
+            f'AFTER UPDATE OF pdf_id, genre, year, correct_answer ON questions WHEN {changed}',
+            _remove_statements('OLD') + _add_statements('NEW'),
+        ),
+    }
+    for name, (event, statements) in definitions.items():
+        body = '\n    '.join(statements)
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event}\nBEGIN\n    {body}\nEND")
+
+
+def drop_count_triggers(cursor):
+    """集計のトリガーを削除（大量の問題を一括登録してから rebuild_counts で集計する場合）"""
+    for name in COUNT_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def rebuild_counts(cursor):
+    """問題テーブルを集計し直す"""
+    cursor.execute('DELETE FROM question_counts')
+    for scope, key in COUNT_SCOPES.items():
+        key = key.format(row='questions')
+        cursor.execute(f'''
+            INSERT INTO question_counts (scope, key, total, answered)
+            SELECT '{scope}', {key}, COUNT(*), SUM({ANSWERED.format(row='questions')})
+            FROM questions
+            GROUP BY {key}
+        ''')
+    # 問題が1問もない場合も全体の行は用意しておく
+    cursor.execute("INSERT OR IGNORE INTO question_counts (scope, key, total, answered) VALUES ('all', '', 0, 0)")
+
+
+def init_count_tables(cursor):
+    """
+    集計テーブルとトリガーを作成
+
+    集計テーブルを新しく作成した場合は、既存の問題から集計します（初回のみ問題テーブルを走査）
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_counts'")
+    exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS question_counts (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            answered INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    ''')
+    create_count_triggers(cursor)
+    if not exists:
+        rebuild_counts(cursor)
+
+
+def init_bank_version(cursor):
+    """問題バンクのバージョンのテーブルと、問題・PDFの変更時にバージョンを上げるトリガーを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bank_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO bank_version (id, version) VALUES (1, 0)')
+    for table in ('questions', 'pdf_files'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE bank_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+
+def get_bank_version(cursor) -> int:
+    """問題バンクのバージョン"""
+    cursor.execute('SELECT version FROM bank_version WHERE id = 1')
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def get_question_counts(cursor) -> Dict[str, any]:
+    """
+    全体・ジャンル別・年度別の問題数
+
+    Returns:
+        {'total': 問題数, 'answered': 正解データのある問題数,
+         'genre': {ジャンル: (問題数, 正解あり)}, 'year': {年度: (問題数, 正解あり)}}
+    """
+    cursor.execute("SELECT scope, key, total, answered FROM question_counts WHERE scope IN ('all', 'genre', 'year')")
+    counts = {'total': 0, 'answered': 0, 'genre': {}, 'year': {}}
+    for scope, key, total, answered in cursor.fetchall():
+        if scope == 'all':
+            counts['total'], counts['answered'] = total, answered
+        else:
+            counts[scope][key] = (total, answered)
+    counts['year'] = dict(sorted(counts['year'].items(), reverse=True))
+    return counts
+
+
+def get_pdf_counts(cursor) -> Dict[int, Tuple[int, int]]:
+    """PDF別の問題数 {PDFのID: (問題数, 正解あり)}"""
+    cursor.execute("SELECT key, total, answered FROM question_counts WHERE scope = 'pdf' AND key != ''")
+    return {int(key): (total, answered) for key, total, answered in cursor.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='問題数の集計を表示')
+    parser.add_argument('--db', default='takken_exam.db', help='データベースファイル')
+    parser.add_argument('--rebuild', action='store_true', help='問題テーブルから集計を作り直す')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    init_count_tables(cursor)
+    if args.rebuild:
+        rebuild_counts(cursor)
+    conn.commit()
+
+    counts = get_question_counts(cursor)
+    conn.close()
+
+    coverage = counts['answered'] / counts['total'] * 100 if counts['total'] else 0
+    print(f"問題数: {counts['total']}問（正解あり {counts['answered']}問、カバー率 {coverage:.1f}%）")
+    print("\nジャンル別（うち正解あり）:")
+    for genre, (total, answered) in counts['genre'].items():
+        print(f"  {genre}: {total}問（{answered}問）")
+    print("\n年度別（うち正解あり）:")
+    for year, (total, answered) in counts['year'].items():
+        print(f"  {year or '不明'}: {total}問（{answered}問）")
+
+
+if __name__ == "__main__":
+    if sys.platform.startswith('win'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+登録済みPDFの再処理
+抽出時の情報（抽出処理のバージョン・設定・PDFのハッシュ）が現在と異なるPDFのみを抽出し直し、
+PDFごとに1トランザクションで問題を置き換えます。問題番号が同じ問題の正解はそのまま残り、
+再処理中も他のPDFの問題は出題できます
+
+使用方法:
+    python reset_and_reprocess.py [--db takken_exam.db] [--force] [--dry-run] [--no-ocr]
+"""
+
 import sys
 import os
 import sqlite3
-import glob
+import argparse
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Windows環境での文字エンコーディング設定
@@ -13,70 +23,103 @@ if sys.platform.startswith('win'):
     sys.stderr.reconfigure(encoding='utf-8')
 
 # 拡張PDF処理モジュールを使用
-from pdf_processor import extract_questions_from_pdf
-
-def reset_database():
-    """データベースをリセットし、PDFファイルを再処理する"""
-    print("データベースをリセット中...")
-    
-    # データベース接続
-    conn = sqlite3.connect('takken_exam.db')
+from pdf_processor import extract_questions_from_pdf, configure_logging, map_pdf
+from ingest import init_ingest_columns, hash_file, resolve_pdf_path, stale_reason, replace_questions
+from question_stats import init_count_tables, get_question_counts
+
+
+def reprocess_database(db_path: str = 'takken_exam.db', use_ocr: bool = True, force: bool = False, dry_run: bool = False):
+    """
+    抽出時の情報が古いPDFを抽出し直す
+
+    Args:
+        db_path: データベースファイルのパス
+        use_ocr: OCRを使用するかどうか
+        force: 抽出時の情報によらず全てのPDFを抽出し直す
+        dry_run: 抽出し直すPDFの一覧のみを表示する
+    """
+    print("抽出し直すPDFを確認中...")
+
+    conn = sqlite3.connect(db_path, timeout=30)
     cursor = conn.cursor()
-    
-    # 既存の問題データを削除
-    cursor.execute('DELETE FROM questions')
-    print("既存の問題データを削除しました")
-    
-    # PDFファイル情報を取得
-    cursor.execute('SELECT id, file_path FROM pdf_files')
-    pdf_files = cursor.fetchall()
-    
-    total_questions = 0
-    
-    for pdf_id, file_path in pdf_files:
-        print(f"\n処理中: {file_path}")
-        
-        if os.path.exists(file_path):
-            # PDFから問題を抽出
-            questions = extract_questions_from_pdf(file_path)
-            
-            # 問題をデータベースに保存
-            for question in questions:
-                import json
-                # オプションをJSON形式で保存
-                options_json = json.dumps(question.get('options', []), ensure_ascii=False)
-            
-                cursor.execute(
-                    "INSERT INTO questions (pdf_id, question_number, question_text, genre, options, year) VALUES (?, ?, ?, ?, ?, ?)",
-                    (pdf_id, question['question_number'], question['question_text'], question['genre'], options_json, question.get('year', ''))
-                )
-            
-            print(f"  → {len(questions)}問を抽出・保存しました")
-            total_questions += len(questions)
-        else:
-            print(f"  → ファイルが見つかりません: {file_path}")
-    
+    init_ingest_columns(cursor)
+    init_count_tables(cursor)
     conn.commit()
-    conn.close()
-    
-    print(f"\n完了！総問題数: {total_questions}")
-    
-    # 各ジャンルの問題数を表示
-    conn = sqlite3.connect('takken_exam.db')
-    cursor = conn.cursor()
+
     cursor.execute('''
-        SELECT genre, COUNT(*) as count 
-        FROM questions 
-        GROUP BY genre 
-        ORDER BY count DESC
+        SELECT id, file_path, extractor_version, extractor_options, extracted_hash
+        FROM pdf_files
+        ORDER BY id
     ''')
-    genre_counts = cursor.fetchall()
-    
-    print("\nジャンル別問題数:")
-    for genre, count in genre_counts:
-        print(f"  {genre}: {count}問")
-    
+    pdf_files = cursor.fetchall()
+
+    totals = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'answers_cleared': 0}
+    processed = skipped = 0
+
+    for pdf_id, file_path, *provenance in pdf_files:
+        path = resolve_pdf_path(file_path)
+        if path is None:
+            print(f"\nファイルが見つかりません: {file_path}")
+            continue
+
+        content_hash = hash_file(path)
+        reason = '--force 指定' if force else stale_reason(provenance, content_hash, use_ocr)
+        if reason is None:
+            skipped += 1
+            continue
+
+        print(f"\n処理中: {file_path}（{reason}）")
+        if dry_run:
+            continue
+
+        with map_pdf(path) as data:
+            questions = extract_questions_from_pdf(data, use_ocr=use_ocr)
+        if not questions:
+            # 抽出に失敗した場合（OCRが使えない環境など）に既存の問題を消さない
+            print("  → 問題を抽出できなかったため、既存の問題を残します")
+            continue
+
+        counts = replace_questions(conn, pdf_id, questions, use_ocr, content_hash)
+        for key, count in counts.items():
+            totals[key] += count
+        processed += 1
+        print(
+            f"  → {len(questions)}問（追加 {counts['inserted']}・更新 {counts['updated']}・"
+            f"変更なし {counts['unchanged']}・削除 {counts['deleted']}）"
+        )
+        if counts['answers_cleared']:
+            print(f"  → 問題文が変わったため {counts['answers_cleared']}問の正解・解説を消しました（正解データを登録し直してください）")
+
+    print(f"\n完了！抽出し直したPDF: {processed}件 / 最新のためスキップ: {skipped}件")
+    if dry_run:
+        conn.close()
+        return
+    print(
+        f"問題の追加 {totals['inserted']}・更新 {totals['updated']}・"
+        f"変更なし {totals['unchanged']}・削除 {totals['deleted']}・正解を消した問題 {totals['answers_cleared']}"
+    )
+
+    # 各ジャンルの問題数を表示（集計テーブルから）
+    genre_counts = get_question_counts(cursor)['genre']
+
+    print("\nジャンル別問題数（うち正解あり）:")
+    for genre, (count, answered) in sorted(genre_counts.items(), key=lambda item: -item[1][0]):
+        print(f"  {genre}: {count}問（{answered}問）")
+
     conn.close()
 
+
+def main():
+    parser = argparse.ArgumentParser(description='抽出時の情報が古いPDFのみを抽出し直す')
+    parser.add_argument('--db', default='takken_exam.db', help='データベースファイル')
+    parser.add_argument('--force', action='store_true', help='全てのPDFを抽出し直す（正解は残す）')
+    parser.add_argument('--dry-run', action='store_true', help='抽出し直すPDFの一覧のみを表示')
+    parser.add_argument('--no-ocr', action='store_true', help='OCRを使用しない')
+    args = parser.parse_args()
+
+    configure_logging()
+    reprocess_database(args.db, use_ocr=not args.no_ocr, force=args.force, dry_run=args.dry_run)
+
+
 if __name__ == "__main__":
-    reset_database()
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成データ生成モジュール
+本試験と同じレイアウト（表紙・【問N】と1〜4の選択肢・最終ページの正解表）の試験PDFと、
+同じ内容の問題を大量に登録したデータベースを作成します。大規模データでのベンチマークや負荷試験に使用します
+
+使用方法:
+    python synthetic_corpus.py pdf --exams 3 --out synthetic_pdfs
+    python synthetic_corpus.py db --questions 100000 --db synthetic_exam.db
+    TAKKEN_DB=synthetic_exam.db python app.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import sqlite3
+from typing import List, Dict, Iterator, Optional
+
+# Windows環境での文字エンコーディング設定
+if sys.platform.startswith('win'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 本試験の出題順（問題番号の範囲とジャンル）
+EXAM_LAYOUT = [
+    (range(1, 15), 'civil_law'),
+    (range(15, 23), 'legal_restrictions'),
+    (range(23, 26), 'others'),
+    (range(26, 46), 'takken_law'),
+    (range(46, 51), 'others'),
+]
+
+# 年度（新しい順、令和6年〜平成元年）
+YEAR_LABELS = [f'令和{n}年' for n in range(6, 1, -1)] + ['令和元年'] + \
+              [f'平成{n}年' for n in range(31, 1, -1)] + ['平成元年']
+
+PARTIES = ['Ａ', 'Ｂ', 'Ｃ', 'Ｄ', 'Ｅ']
+
+# ジャンルごとの問題文（分類キーワードを含む）と選択肢の文例
+# 問題文は選択肢より先に分類されるため、法令制限・その他の問題文には民法のキーワードを含めない
+QUESTION_BANK = {
+    'civil_law': {
+        'stems': [
+            '{a}が{b}に対して甲土地を売却する契約を締結した場合に関する次の記述のうち、民法の規定及び判例によれば、正しいものはどれか。',
+            '{a}所有の甲建物について{b}が賃借人となる賃貸借に関する次の記述のうち、民法の規定によれば、誤っているものはどれか。',
+            '{a}が{b}に対する債権を担保するために甲土地に抵当権の設定を受けた場合に関する次の記述のうち、民法の規定及び判例によれば、正しいものはどれか。',
+            '時効に関する次の記述のうち、民法の規定及び判例によれば、誤っているものはどれか。',
+            '{a}が死亡し、{b}及び{c}が相続人となった場合における所有権の帰属に関する次の記述のうち、民法の規定によれば、正しいものはどれか。',
+            '請負契約に関する次の記述のうち、民法の規定及び判例によれば、正しいものはどれか。',
+        ],
+        'options': [
+            '{a}は、{b}に対して相当の期間を定めて履行の催告をし、その期間内に履行がないときは、契約を解除することができる。',
+            '{b}は、登記を備えなければ、甲土地の所有権の取得を{c}に対抗することができない。',
+            '{a}が意思表示をした時に{b}の詐欺を知らなかった場合でも、{a}はその意思表示を取り消すことができない。',
+            '債権者が権利を行使することができることを知った時から{n}年間行使しないときは、その債権は時効によって消滅する。',
+            '賃借人{b}は、賃貸人{a}の承諾を得なければ、その賃借権を譲り渡すことができない。',
+            '抵当権者は、利息その他の定期金を請求する権利を有するときは、その満期となった最後の{n}年分についてのみ抵当権を行使することができる。',
+            '{c}は、相続の開始があったことを知った時から{n}か月以内に、単純承認若しくは限定承認又は相続の放棄をしなければならない。',
+            '注文者{a}は、請負人{b}が仕事を完成しない間は、いつでも損害を賠償して契約の解除をすることができる。',
+        ],
+    },
+    'legal_restrictions': {
+        'stems': [
+            '都市計画法に関する次の記述のうち、正しいものはどれか。',
+            '建築基準法に関する次の記述のうち、誤っているものはどれか。',
+            '国土利用計画法第23条の届出（以下この問において「事後届出」という。）に関する次の記述のうち、正しいものはどれか。',
+            '農地法（以下この問において「法」という。）に関する次の記述のうち、正しいものはどれか。',
+            '土地区画整理法に関する次の記述のうち、誤っているものはどれか。',
+            '宅地造成等規制法に関する次の記述のうち、正しいものはどれか。なお、この問において「都道府県知事」とは、指定都市等にあってはその長をいうものとする。',
+        ],
+        'options': [
+            '市街化調整区域内において行う開発行為で、その規模が{m}㎡以上のものは、都道府県知事の許可を受けなければならない。',
+            '第一種低層住居専用地域内においては、建築物の高さは、{n}ｍ又は12ｍのうち当該地域に関する都市計画において定められた建築物の高さの限度を超えてはならない。',
+            '事後届出に係る土地の利用目的について、都道府県知事は、{n}週間以内に勧告をすることができる。',
+            '農業者が自己の所有する農地に住宅を建設する場合には、法第4条第1項の許可を受けなければならない。',
+            '換地計画において定められた保留地は、換地処分の公告があった日の翌日において、施行者が取得する。',
+            '建蔽率の限度が10分の8とされている地域内で、かつ、防火地域内にある耐火建築物については、建蔽率の制限は適用されない。',
+            '地区計画の区域のうち地区整備計画が定められている区域内において、建築物の建築を行おうとする者は、行為に着手する日の{n}日前までに、市町村長に届け出なければならない。',
+            '宅地造成工事規制区域内において、切土をする土地の面積が{m}㎡を超える工事については、都道府県知事の許可を受けなければならない。',
+        ],
+    },
+    'takken_law': {
+        'stems': [
+            '宅地建物取引業者{a}が行う業務に関する次の記述のうち、宅地建物取引業法の規定によれば、正しいものはどれか。',
+            '宅地建物取引士に関する次の記述のうち、宅地建物取引業法の規定によれば、誤っているものはどれか。',
+            '宅建業者が行う重要事項説明に関する次の記述のうち、宅地建物取引業法の規定によれば、正しいものはどれか。',
+            '宅地建物取引業者{a}が、{b}から宅地の売却の依頼を受け、{b}と媒介契約を締結した場合に関する次の記述のうち、宅地建物取引業法の規定によれば、正しいものはどれか。',
+            '宅地建物取引業法第37条の規定により交付すべき書面（以下この問において「37条書面」という。）に関する次の記述のうち、正しいものはどれか。',
+            '宅建業者の営業保証金に関する次の記述のうち、宅地建物取引業法の規定によれば、正しいものはどれか。',
+        ],
+        'options': [
+            '{a}は、専任媒介契約の有効期間を{n}か月を超えるものとして締結することはできない。',
+            '宅地建物取引士は、重要事項の説明をするときは、説明の相手方から請求がなくても、宅地建物取引士証を提示しなければならない。',
+            '{a}は、自ら売主となる宅地の売買契約において、代金の額の10分の2を超える額の手付を受領することができない。',
+            '宅地建物取引業者は、事務所ごとに、業務に従事する者{n}名に1名以上の割合で、成年者である専任の宅地建物取引士を置かなければならない。',
+            '営業保証金の還付により営業保証金が不足した場合、{a}は、免許権者から通知を受けた日から{n}週間以内にその不足額を供託しなければならない。',
+            '{a}は、37条書面に宅地建物取引士をして記名させなければならないが、その内容を説明させる必要はない。',
+            '{b}が宅地建物取引業者である場合でも、{a}は、{b}に対して重要事項説明書を交付しなければならない。',
+            '宅地建物取引業者は、その事務所ごとに、その業務に関する帳簿を備え、取引の終了後{n}年間保存しなければならない。',
+        ],
+    },
+    'others': {
+        'stems': [
+            '不動産取得税に関する次の記述のうち、正しいものはどれか。',
+            '地価公示法に関する次の記述のうち、正しいものはどれか。',
+            '独立行政法人住宅金融支援機構（以下この問において「機構」という。）に関する次の記述のうち、誤っているものはどれか。',
+            '宅地建物取引業者が行う広告に関する次の記述のうち、不当景品類及び不当表示防止法の規定によれば、正しいものはどれか。',
+            '土地に関する次の記述のうち、最も不適当なものはどれか。',
+            '建物の構造及び材料に関する次の記述のうち、最も不適当なものはどれか。',
+            '印紙税に関する次の記述のうち、正しいものはどれか。',
+        ],
+        'options': [
+            '不動産取得税の課税標準となるべき額が、土地の取得にあっては{m}万円に満たない場合においては、不動産取得税が課されない。',
+            '土地鑑定委員会は、標準地の単位面積当たりの価格を判定したときは、速やかに官報で公示しなければならない。',
+            '機構は、災害により住宅が滅失した場合におけるその住宅に代わるべき住宅の建設又は購入に係る貸付金について、元金据置期間を設けることができる。',
+            '新築分譲マンションの広告において、徒歩による所要時間は、道路距離{n}ｍにつき1分間を要するものとして算出した数値を表示する。',
+            '台地の縁辺部は、崖崩れの危険があるため、宅地として利用する場合には注意を要する。',
+            '鉄筋コンクリート造に使用される鉄筋に対するコンクリートのかぶり厚さは、耐力壁にあっては{n}cm以上としなければならない。',
+            '記載金額が{m}万円の土地の賃貸借契約書には、印紙税が課されない。',
+            '木造建築物の構造耐力上主要な部分である柱で最下階の部分に使用するものの下部には、土台を設けなければならない。',
+        ],
+    },
+}
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    """文例の当事者・数値を埋める"""
+    a, b, c = rng.sample(PARTIES, 3)
+    return template.format(a=a, b=b, c=c, n=rng.randint(2, 10), m=rng.choice([300, 500, 1000, 3000]))
+
+
+def generate_question(rng: random.Random, genre: str, question_number: int, year: str) -> Dict[str, any]:
+    """1問分の問題を作成（pdf_processor の抽出結果と同じ形式に正解を加えたもの）"""
+    bank = QUESTION_BANK[genre]
+    return {
+        'question_number': question_number,
+        'question_text': _fill(rng.choice(bank['stems']), rng),
+        'options': [_fill(template, rng) for template in rng.sample(bank['options'], 4)],
+        'genre': genre,
+        'year': year,
+        'correct_answer': str(rng.randint(1, 4)),
+    }
+
+
+def generate_exam(exam_index: int, seed: int = 0) -> Dict[str, any]:
+    """
+    1回分の試験（50問）を作成
+
+    同じ exam_index と seed からは常に同じ試験が作られるため、PDFとデータベースの内容が一致します
+
+    Returns:
+        {'name': 試験名, 'year': 年度, 'questions': [問題, ...]}
+    """
+    rng = random.Random(seed * 1_000_003 + exam_index)
+    year = YEAR_LABELS[exam_index % len(YEAR_LABELS)]
+    questions = [
+        generate_question(rng, genre, number, year)
+        for numbers, genre in EXAM_LAYOUT
+        for number in numbers
+    ]
+    return {'name': f'synthetic_{exam_index:06d}', 'year': year, 'questions': questions}
+
+
+def iter_exams(question_count: int, seed: int = 0) -> Iterator[Dict[str, any]]:
+    """指定した問題数になるまで試験を作成（最後の試験は途中の問題までで打ち切る）"""
+    exam_index = 0
+    remaining = question_count
+    while remaining > 0:
+        exam = generate_exam(exam_index, seed)
+        exam['questions'] = exam['questions'][:remaining]
+        remaining -= len(exam['questions'])
+        exam_index += 1
+        yield exam
+
+
+def write_exam_pdf(file_path: str, exam: Dict[str, any], questions_per_page: int = 2):
+    """
+    試験PDFを作成
+
+    表紙（年度）、各ページに【問N】と1〜4の選択肢、ページ下部に「― N ―」と〈年度〉、
+    最終ページに「(N) 正解」形式の正解表を配置します
+    """
+    import fitz  # PyMuPDF
+
+    font = fitz.Font('cjk')
+    doc = fitz.open()
+    year = exam['year']
+    exam_year = year[:-1] + '年度' if year.endswith('年') else year
+
+    cover = doc.new_page()
+    writer = fitz.TextWriter(cover.rect)
+    writer.append((72, 120), '宅地建物取引士資格試験', font=font, fontsize=20)
+    writer.append((72, 160), exam_year, font=font, fontsize=16)
+    writer.append((72, 200), f"問題は、1ページから{(len(exam['questions']) + 1) // questions_per_page}ページまでの{len(exam['questions'])}問です。", font=font, fontsize=10)
+    writer.write_text(cover)
+
+    questions = exam['questions']
+    for page_index in range(0, len(questions), questions_per_page):
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        block_height = (page.rect.height - 100) / questions_per_page
+        for slot, question in enumerate(questions[page_index:page_index + questions_per_page]):
+            top = 50 + slot * block_height
+            lines = [f"【問    {question['question_number']}】    {question['question_text']}"]
+            lines += [f"{number}    {option}" for number, option in enumerate(question['options'], 1)]
+            writer.fill_textbox(
+                fitz.Rect(50, top, page.rect.width - 50, top + block_height - 10),
+                '\n'.join(lines), font=font, fontsize=9
+            )
+        page_number = page_index // questions_per_page + 1
+        writer.append((page.rect.width / 2 - 20, page.rect.height - 40), f'― {page_number} ―', font=font, fontsize=9)
+        writer.append((page.rect.width - 120, page.rect.height - 40), f'〈{exam_year}〉', font=font, fontsize=9)
+        writer.write_text(page)
+
+    # 正解表（1ページに2列×25問、問題数が多い場合は複数ページ）
+    for key_start in range(0, len(questions), 50):
+        key_page = doc.new_page()
+        writer = fitz.TextWriter(key_page.rect)
+        writer.append((72, 50), '《模範解答》', font=font, fontsize=14)
+        for index, question in enumerate(questions[key_start:key_start + 50]):
+            column, row = divmod(index, 25)
+            answer = chr(ord('０') + int(question['correct_answer']))  # 正解は全角数字（本試験の正解表と同じ）
+            writer.append(
+                (72 + column * 240, 90 + row * 24),
+                f"({question['question_number']})  {answer}  {year}  問{question['question_number']}",
+                font=font, fontsize=10
+            )
+        writer.write_text(key_page)
+
+    doc.save(file_path, garbage=3, deflate=True)
+    doc.close()
+
+
+def write_pdfs(out_dir: str, exams: int, seed: int = 0) -> List[str]:
+    """
+    試験PDFと、期待される抽出結果（JSON）を出力
+
+    Returns:
+        作成したPDFのパスのリスト
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for exam_index in range(exams):
+        exam = generate_exam(exam_index, seed)
+        pdf_path = os.path.join(out_dir, f"{exam['name']}.pdf")
+        write_exam_pdf(pdf_path, exam)
+        with open(os.path.join(out_dir, f"{exam['name']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(exam, f, ensure_ascii=False, indent=2)
+        paths.append(pdf_path)
+    return paths
+
+
+def write_database(db_path: str, question_count: int, seed: int = 0, batch_size: int = 10000) -> int:
+    """
+    合成データのデータベースを作成（試験1回ごとに pdf_files を1件登録）
+
+    アプリと同じスキーマを作成してから、問題を batch_size 件ずつまとめて1トランザクションで登録します
+    （問題数の集計は登録後にまとめて作成）
+
+    Returns:
+        登録した問題数
+    """
+    from app import app, init_db
+    from question_stats import drop_count_triggers, rebuild_counts, create_count_triggers
+
+    init_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # 一時的なデータの一括登録のため、ディスクへの同期を省略する
+    cursor.execute('PRAGMA synchronous=OFF')
+    cursor.execute('BEGIN')
+    # 1問ごとに集計を更新せず、登録後にまとめて集計する
+    drop_count_triggers(cursor)
+
+    inserted = 0
+    rows = []
+    for exam in iter_exams(question_count, seed):
+        cursor.execute(
+            'INSERT INTO pdf_files (filename, original_name, file_path, content_hash) VALUES (?, ?, ?, ?)',
+            (f"{exam['name']}.pdf", f"{exam['name']}.pdf", os.path.join(app.config['UPLOAD_FOLDER'], f"{exam['name']}.pdf"), None)
+        )
+        pdf_id = cursor.lastrowid
+        for question in exam['questions']:
+            rows.append((
+                pdf_id, question['question_number'], question['question_text'], question['genre'],
+                json.dumps(question['options'], ensure_ascii=False), question['correct_answer'], question['year']
+            ))
+        if len(rows) >= batch_size:
+            inserted += _insert_questions(cursor, rows)
+            rows = []
+    inserted += _insert_questions(cursor, rows)
+    rebuild_counts(cursor)
+    create_count_triggers(cursor)
+
+    conn.commit()
+    conn.close()
+    return inserted
+
+
+def _insert_questions(cursor, rows) -> int:
+    cursor.executemany(
+        'INSERT INTO questions (pdf_id, question_number, question_text, genre, options, correct_answer, year) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        rows
+    )
+    return len(rows)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='合成データ（試験PDF・データベース）の作成')
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード（同じシードからは同じデータが作られる）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pdf_parser = subparsers.add_parser('pdf', help='試験PDFを作成')
+    pdf_parser.add_argument('--exams', type=int, default=3, help='作成する試験の数（1回50問）')
+    pdf_parser.add_argument('--out', default='synthetic_pdfs', help='出力先ディレクトリ')
+
+    db_parser = subparsers.add_parser('db', help='問題を大量に登録したデータベースを作成')
+    db_parser.add_argument('--questions', type=int, default=100000, help='問題数')
+    db_parser.add_argument('--db', default='synthetic_exam.db', help='出力先のデータベースファイル')
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    if args.command == 'pdf':
+        paths = write_pdfs(args.out, args.exams, args.seed)
+        print(f"{len(paths)}件の試験PDFを {args.out} に作成しました（{time.perf_counter() - start:.1f}秒）")
+    else:
+        if os.path.exists(args.db):
+            print(f"既存のデータベースに追加します: {args.db}")
+        count = write_database(args.db, args.questions, args.seed)
+        print(f"{count}問を {args.db} に登録しました（{time.perf_counter() - start:.1f}秒）")
+        print(f"アプリで使用する場合: TAKKEN_DB={args.db} python app.py")
+
+
+if __name__ == "__main__":
+    main()
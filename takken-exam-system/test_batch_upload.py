@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+import subprocess
+from concurrent.futures import Future
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import batch_upload
+from app import init_db
+from ingest import save_pdf_record
+from ingest_pool import current_owner
+
+
+def _dead_owner():
+    """終了したプロセスのPIDと起動時刻"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid, 0.0
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'takken_exam.db')
+    init_db(path)
+    return path
+
+
+def _add_item(cursor, batch_id, file_path, status, owner):
+    pdf_id = save_pdf_record(cursor, os.path.basename(file_path), os.path.basename(file_path), file_path, None)
+    cursor.execute(
+        '''INSERT INTO upload_batch_items (batch_id, original_name, status, pdf_id, owner_pid, owner_started, started_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        (batch_id, os.path.basename(file_path), status, pdf_id, *owner, 1.0)
+    )
+    return cursor.lastrowid
+
+
+def test_recover_after_restart(db_path, tmp_path, monkeypatch):
+    """再起動で失われた処理待ち・処理中のファイルを投入し直し、PDFがないものは失敗にする"""
+    submitted = []
+    monkeypatch.setattr(batch_upload, '_submit_jobs', lambda db, jobs: submitted.extend(jobs))
+
+    pdf_path = tmp_path / 'exam.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('INSERT INTO upload_batches (total) VALUES (4)')
+    batch_id = cursor.lastrowid
+    dead = _dead_owner()
+    running = _add_item(cursor, batch_id, str(pdf_path), 'running', dead)
+    queued = _add_item(cursor, batch_id, str(pdf_path), 'queued', (None, None))  # 列の追加前に投入したもの
+    missing = _add_item(cursor, batch_id, str(tmp_path / 'missing.pdf'), 'queued', dead)
+    alive = _add_item(cursor, batch_id, str(pdf_path), 'running', current_owner())
+    conn.commit()
+
+    assert batch_upload.recover_orphaned_items(db_path, force=True) == 2
+    assert sorted(job[0] for job in submitted) == [running, queued]
+
+    cursor.execute('SELECT id, status, started_at, owner_pid FROM upload_batch_items')
+    rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    assert rows[running] == ('queued', None, os.getpid())
+    assert rows[queued] == ('queued', None, os.getpid())
+    assert rows[missing][0] == 'failed'
+    assert rows[alive][0] == 'running'
+
+    # 引き継いだファイルはこのプロセスのものになるため、もう一度確認しても投入し直さない
+    assert batch_upload.recover_orphaned_items(db_path, force=True) == 0
+    progress = batch_upload.get_batch_progress(conn, batch_id)
+    assert progress['counts']['failed'] == 1
+    assert progress['queue']['queued'] == 2
+    conn.close()
+
+
+def test_failed_item_can_be_uploaded_again(db_path, tmp_path, monkeypatch):
+    """抽出に失敗したPDFは、同じ内容をアップロードし直すと重複にせず取り込み直す"""
+    submitted = []
+    monkeypatch.setattr(batch_upload, '_submit_jobs', lambda db, jobs: submitted.extend(jobs))
+
+    def upload():
+        pdf_path = tmp_path / f'exam{len(submitted)}.pdf'
+        pdf_path.write_bytes(b'%PDF-1.4 same content')
+        return batch_upload.start_batch([('exam.pdf', str(pdf_path), 'hash')], db_path)
+
+    upload()
+    item_id, pdf_id = submitted[0][:2]
+    future = Future()
+    future.set_exception(RuntimeError('抽出の制限時間を超えました'))
+    batch_upload._finish_item(future, db_path, item_id, pdf_id)
+
+    batch_id = upload()
+    assert len(submitted) == 2
+    conn = sqlite3.connect(db_path)
+    progress = batch_upload.get_batch_progress(conn, batch_id)
+    conn.close()
+    assert progress['counts'].get('duplicate', 0) == 0
+    assert progress['queue']['queued'] == 1
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import init_db
+from exam_browse import get_exam_page
+
+
+@pytest.fixture
+def cursor(tmp_path):
+    db_path = str(tmp_path / 'takken_exam.db')
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # 令和2年は10月試験と12月試験で同じ問題番号が2問ずつある（問1〜問4 × 2、問題IDは交互）
+    for number in range(1, 5):
+        for _ in range(2):
+            cursor.execute("INSERT INTO questions (question_text, year, question_number) VALUES ('問題文', '令和2年', ?)", (number,))
+    for number in range(1, 4):
+        cursor.execute("INSERT INTO questions (question_text, year, question_number) VALUES ('問題文', '令和5年', ?)", (number,))
+    yield cursor
+    conn.close()
+
+
+def _keys(page):
+    return [(q['question_number'], q['id']) for q in page['questions']]
+
+
+def test_first_and_last_page(cursor):
+    """先頭のページに前のページはなく、最後のページに次のページはない"""
+    page = get_exam_page(cursor, '令和5年', 1, page_size=2)
+    assert [number for number, _ in _keys(page)] == [1, 2]
+    assert page['prev'] is None
+    assert page['next'] is not None and page['next'][0] == 3
+
+    last = get_exam_page(cursor, '令和5年', *page['next'], page_size=2)
+    assert [number for number, _ in _keys(last)] == [3]
+    assert last['next'] is None
+    assert last['prev'] == _keys(page)[0]
+
+    # 問題数がちょうどページの大きさの場合も次のページはない
+    exact = get_exam_page(cursor, '令和5年', 1, page_size=3)
+    assert len(exact['questions']) == 3 and exact['next'] is None
+
+
+def test_same_number_split_across_pages(cursor):
+    """同じ問題番号の問題がページの境目で分かれても、問題IDで続きから表示する"""
+    page = get_exam_page(cursor, '令和2年', 1, page_size=3)
+    keys = _keys(page)
+    assert [number for number, _ in keys] == [1, 1, 2]
+    assert page['next'][0] == 2 and page['next'][1] > keys[-1][1]
+
+    following = get_exam_page(cursor, '令和2年', *page['next'], page_size=3)
+    assert _keys(following)[0] == page['next']
+    assert following['prev'] == keys[0]
+
+
+def test_walk_forward_and_back(cursor):
+    """次のページを順にたどると全問を重複なく表示し、前のページをたどると同じページに戻る"""
+    cursor.execute("SELECT question_number, id FROM questions WHERE year = '令和2年' ORDER BY question_number, id")
+    expected = [tuple(row) for row in cursor.fetchall()]
+
+    pages, start = [], (1, 0)
+    while start is not None:
+        page = get_exam_page(cursor, '令和2年', *start, page_size=3)
+        pages.append(_keys(page))
+        start = page['next']
+    assert [key for keys in pages for key in keys] == expected
+
+    backward = []
+    while page['prev'] is not None:
+        page = get_exam_page(cursor, '令和2年', *page['prev'], page_size=3)
+        backward.append(_keys(page))
+    assert backward[::-1] == pages[:-1]
+
+
+def test_start_in_middle_and_empty_year(cursor):
+    """途中の問題番号から表示でき、問題のない年度・番号では空のページを返す"""
+    page = get_exam_page(cursor, '令和2年', 3, page_size=10)
+    assert [number for number, _ in _keys(page)] == [3, 3, 4, 4]
+    assert page['next'] is None
+    assert page['prev'] == (1, 1)
+
+    assert get_exam_page(cursor, '令和5年', 10) == {'year': '令和5年', 'questions': [], 'next': None, 'prev': (1, 9)}
+    assert get_exam_page(cursor, '平成元年', 1) == {'year': '平成元年', 'questions': [], 'next': None, 'prev': None}
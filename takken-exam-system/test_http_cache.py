@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import os
+import sys
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import app, init_db
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'takken_exam.db')
+    monkeypatch.setitem(app.config, 'DATABASE', db_path)
+    init_db(db_path)
+    return app.test_client()
+
+
+def _add_question(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO questions (question_text, year, question_number) VALUES ('問題文', '令和5年', 1)")
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize('path', ['/', '/files'])
+def test_etag_not_modified(client, path):
+    """ETagが一致する再表示は本文なしの304を返し、問題が変わるとETagも変わる"""
+    response = client.get(path)
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and weak
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get(path, headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.get_etag() == (etag, True)
+
+    _add_question(app.config['DATABASE'])
+    response = client.get(path, headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_flash_suppresses_etag(client):
+    """表示待ちのメッセージがあるページはキャッシュさせない"""
+    etag = client.get('/files').get_etag()[0]
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'ファイルが正常にアップロードされました。')]
+    response = client.get('/files', headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
+    assert 'ファイルが正常にアップロードされました。' in response.get_data(as_text=True)
+
+
+def test_compression(client, monkeypatch):
+    """Accept-Encodingでgzipを受け付ける場合はページを圧縮する"""
+    monkeypatch.setattr('http_cache.brotli', None)
+    plain = client.get('/files')
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.data) >= 1024
+
+    response = client.get('/files', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert response.get_etag() == plain.get_etag()
+
+
+def test_random_question_not_stored(client):
+    """表示のたびに別の問題を出題するページはETagを付けず、ブラウザに保存させない"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("INSERT INTO questions (question_text, options, correct_answer, genre) VALUES ('問題文', '[]', '1', 'civil_law')")
+    conn.commit()
+    conn.close()
+    response = client.get('/question/civil_law')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert response.get_etag() == (None, None)
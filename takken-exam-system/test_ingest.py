@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import init_db
+from ingest import save_pdf_record, save_questions, replace_questions
+
+
+def _question(number, text):
+    return {'question_number': number, 'question_text': text, 'options': ['1', '2', '3', '4'],
+            'genre': 'civil_law', 'year': '令和5年'}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / 'takken_exam.db')
+    init_db(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def test_replace_questions_counts(conn):
+    """追加・更新・変更なし・削除と、問題文が変わったため正解を消した件数を返す"""
+    cursor = conn.cursor()
+    pdf_id = save_pdf_record(cursor, 'a.pdf', 'a.pdf', 'uploads/a.pdf', None)
+    save_questions(cursor, pdf_id, [_question(1, '問1の本文'), _question(2, '問2の本文'),
+                                    _question(3, '問3の本文'), _question(4, '問4の本文')])
+    cursor.execute("UPDATE questions SET correct_answer = '1', explanation = '解説' WHERE pdf_id = ?", (pdf_id,))
+
+    counts = replace_questions(conn, pdf_id, [
+        _question(1, '問1の本文'),          # 変更なし
+        _question(2, '問2の\n本文'),        # 改行の違いのみ（正解は残す）
+        _question(3, '問4の本文'),          # 番号がずれて別の問題になった（正解を消す）
+        _question(5, '問5の本文'),          # 追加
+    ])
+    assert counts == {'inserted': 1, 'updated': 2, 'unchanged': 1, 'deleted': 1, 'answers_cleared': 1}
+
+    cursor.execute('SELECT question_number, correct_answer, explanation FROM questions WHERE pdf_id = ? ORDER BY question_number',
+                   (pdf_id,))
+    assert cursor.fetchall() == [(1, '1', '解説'), (2, '1', '解説'), (3, None, None), (5, None, None)]
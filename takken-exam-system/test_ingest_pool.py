@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import threading
+import sqlite3
+import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from ingest_pool import IngestPool, LocalSlots, SharedSlots, BudgetExceeded, WorkerDied, init_slot_table
+
+
+def _sleep_job(seconds):
+    """ワーカープロセスで実行する処理（開始・終了時刻を返す）"""
+    start = time.time()
+    time.sleep(seconds)
+    return start, time.time()
+
+
+def _busy_job(seconds):
+    """CPUを使い続ける処理"""
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+    return 'done'
+
+
+def _memory_job(megabytes):
+    """メモリを確保して保持する処理"""
+    data = bytearray(megabytes * 1024 * 1024)
+    time.sleep(5)
+    return len(data)
+
+
+def _exit_job():
+    """処理の途中でワーカープロセスが終了する"""
+    os._exit(1)
+
+
+def _pid_job():
+    return os.getpid()
+
+
+def _always_ok():
+    return True
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'slots.db')
+    conn = sqlite3.connect(path)
+    init_slot_table(conn.cursor())
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_shared_slots_capacity(db_path):
+    """別々の SharedSlots（別のプロセスのプール）でも同時実行数をまとめて数える"""
+    first = SharedSlots(db_path, capacity=2, ocr_slots=1)
+    second = SharedSlots(db_path, capacity=2, ocr_slots=1)
+
+    ocr_slot = first.acquire(True, _always_ok)
+    assert ocr_slot is not None
+    assert second.acquire(True, _always_ok) is None  # OCRの枠はホスト全体で1つ
+    text_slot = second.acquire(False, _always_ok)
+    assert text_slot is not None
+    assert first.acquire(False, _always_ok) is None  # 同時実行数の上限
+
+    first.release(ocr_slot)
+    assert second.acquire(True, _always_ok) is not None
+
+
+def test_shared_slots_first_job_ignores_load(db_path):
+    """ホスト全体で処理中のものがなければ負荷に関係なく開始し、2件目以降は負荷を確認する"""
+    slots = SharedSlots(db_path, capacity=4)
+    slot = slots.acquire(False, lambda: False)
+    assert slot is not None
+    assert SharedSlots(db_path, capacity=4).acquire(False, lambda: False) is None
+
+
+def test_shared_slots_remove_dead_owner(db_path):
+    """異常終了したプロセスが取ったままの枠は解放する"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    conn = sqlite3.connect(db_path)
+    conn.execute('INSERT INTO ingest_slots (pid, started, ocr, acquired_at) VALUES (?, ?, ?, ?)',
+                 (process.pid, 0.0, 1, time.time()))
+    conn.commit()
+    conn.close()
+
+    assert SharedSlots(db_path, capacity=1).acquire(True, _always_ok) is not None
+
+
+def test_pools_share_capacity(db_path):
+    """枠を共有する2つのプールは、合わせて同時実行数までしか処理しない"""
+    pools = [
+        IngestPool(1, slots=SharedSlots(db_path, capacity=1), wall_seconds=0, cpu_seconds=0, rss_mb=0)
+        for _ in range(2)
+    ]
+    try:
+        futures = [pool.submit(_sleep_job, 0.5) for pool in pools]
+        (start1, end1), (start2, end2) = sorted(future.result(timeout=30) for future in futures)
+    finally:
+        for pool in pools:
+            pool.shutdown()
+    assert start2 >= end1
+
+
+@pytest.mark.parametrize('resource, limits, job, args', [
+    ('wall', {'wall_seconds': 1}, _sleep_job, (30,)),
+    ('cpu', {'cpu_seconds': 1}, _busy_job, (30,)),
+    ('rss', {'rss_mb': 200}, _memory_job, (400,)),
+])
+def test_budget_kills_worker(resource, limits, job, args):
+    """上限を超えたワーカーは強制終了し、次の処理は起動し直したワーカーで続行する"""
+    budget = {'wall_seconds': 0, 'cpu_seconds': 0, 'rss_mb': 0}
+    budget.update(limits)
+    pool = IngestPool(1, **budget)
+    try:
+        first_pid = pool.submit(_pid_job).result(timeout=30)
+        start = time.monotonic()
+        with pytest.raises(BudgetExceeded) as excinfo:
+            pool.submit(job, *args).result(timeout=30)
+        assert excinfo.value.resource == resource
+        assert time.monotonic() - start < 15
+        assert pool.submit(_pid_job).result(timeout=30) != first_pid
+    finally:
+        pool.shutdown()
+
+
+def test_worker_died():
+    """ワーカーが異常終了した場合はその処理のみ失敗させる"""
+    pool = IngestPool(1, wall_seconds=0, cpu_seconds=0, rss_mb=0)
+    try:
+        with pytest.raises(WorkerDied):
+            pool.submit(_exit_job).result(timeout=30)
+        assert pool.submit(_sleep_job, 0).result(timeout=30)
+    finally:
+        pool.shutdown()
+
+
+class _BlockingSlots(LocalSlots):
+    """枠の取得がほかのプロセスのロックで待たされている状態を再現する"""
+
+    def __init__(self):
+        super().__init__(1)
+        self.entered = threading.Event()
+        self.unblock = threading.Event()
+
+    def acquire(self, ocr, load_ok):
+        self.entered.set()
+        self.unblock.wait(30)
+        return super().acquire(ocr, load_ok)
+
+
+def test_submit_not_blocked_by_slot_acquire():
+    """枠の取得を待っている間も、submit() はすぐに戻る"""
+    slots = _BlockingSlots()
+    pool = IngestPool(1, slots=slots, wall_seconds=0, cpu_seconds=0, rss_mb=0)
+    try:
+        first = pool.submit(_sleep_job, 0)
+        assert slots.entered.wait(10)
+        start = time.monotonic()
+        second = pool.submit(_sleep_job, 0)
+        assert time.monotonic() - start < 1
+        slots.unblock.set()
+        assert first.result(timeout=30) and second.result(timeout=30)
+    finally:
+        slots.unblock.set()
+        pool.shutdown()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import init_db
+from mock_exam import load_genre_pools
+
+
+def _add_question(conn, genre, answer):
+    cursor = conn.execute(
+        'INSERT INTO questions (question_text, genre, correct_answer) VALUES (?, ?, ?)',
+        (f'{genre}の問題', genre, answer)
+    )
+    return cursor.lastrowid
+
+
+def test_genre_pools_follow_bank_version(tmp_path):
+    """別の接続（再処理・正解データの登録スクリプト）で問題を変更しても、次の読み込みで反映される"""
+    db_path = str(tmp_path / 'takken_exam.db')
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    first = _add_question(conn, 'civil_law', '1')
+    second = _add_question(conn, 'civil_law', '2')
+    unanswered = _add_question(conn, 'takken_law', None)
+    conn.commit()
+
+    assert load_genre_pools(conn) == {'civil_law': [first, second]}
+    assert load_genre_pools(conn) is load_genre_pools(conn)  # 変更がなければ読み込み直さない
+
+    other = sqlite3.connect(db_path)
+    other.execute('DELETE FROM questions WHERE id = ?', (first,))
+    other.execute('UPDATE questions SET correct_answer = ? WHERE id = ?', ('3', unanswered))
+    other.commit()
+    other.close()
+
+    assert load_genre_pools(conn) == {'civil_law': [second], 'takken_law': [unanswered]}
+    conn.close()
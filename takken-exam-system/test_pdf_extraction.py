@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import extract_questions_from_pdf
+from pdf_processor import extract_questions_from_pdf
 import glob
 
 def test_existing_pdfs():
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import pickle
+import logging
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import pdf_processor
+from pdf_processor import PDFAnalysis, configure_logging, shutdown_logging, extract_questions_from_pdf
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='forkのない環境')
+def test_logging_after_fork(tmp_path):
+    """fork した子プロセス（preload_app のgunicornワーカー）のログもファイルに書き出される"""
+    log_file = tmp_path / 'pdf_processing.log'
+    configure_logging(level=logging.INFO, log_file=str(log_file), console=False)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            pdf_processor.logger.info('子プロセスのログ')
+            shutdown_logging()
+            os._exit(0)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+        pdf_processor.logger.info('親プロセスのログ')
+        shutdown_logging()
+        text = log_file.read_text(encoding='utf-8')
+        assert '子プロセスのログ' in text
+        assert '親プロセスのログ' in text
+    finally:
+        shutdown_logging()
+
+
+def _analysis():
+    return PDFAnalysis(
+        file_path='test.pdf',
+        page_texts=['問1', '正解表'],
+        questions=[{'question_number': 1, 'question_text': '問題文', 'options': ['1', '2', '3', '4'], 'year': '令和5年'}],
+        answers={1: '3'},
+    )
+
+
+def test_analysis_is_read_only():
+    """解析結果の問題と正解表は変更できない"""
+    analysis = _analysis()
+    with pytest.raises(TypeError):
+        analysis.questions[0]['question_text'] = '変更'
+    with pytest.raises(TypeError):
+        analysis.answers[2] = '1'
+    with pytest.raises(AttributeError):
+        analysis.questions[0]['options'].append('5')
+    assert pickle.loads(pickle.dumps(analysis)) == analysis
+
+
+def test_extract_returns_copies(monkeypatch):
+    """extract_questions_from_pdf の結果を変更しても、共有している解析結果には影響しない"""
+    analysis = _analysis()
+
+    class Processor:
+        def analyze_pdf(self, source):
+            return analysis
+
+    monkeypatch.setattr(pdf_processor, 'get_processor', lambda use_ocr: Processor())
+    questions = extract_questions_from_pdf('test.pdf')
+    questions[0]['question_text'] = '変更'
+    questions[0]['options'].append('5')
+
+    assert analysis.questions[0]['question_text'] == '問題文'
+    assert extract_questions_from_pdf('test.pdf')[0]['options'] == ['1', '2', '3', '4']
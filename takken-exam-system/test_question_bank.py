@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import random
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import init_db
+from ingest import save_pdf_record
+from question_bank import build_snapshot, QuestionBankSnapshot, SnapshotLoader, DatabaseQuestionBank
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """2年度・2つのPDFの問題（正解データのないものを含む）を登録したデータベース"""
+    path = str(tmp_path / 'takken_exam.db')
+    init_db(path)
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    genres = ['civil_law', 'takken_law', 'others']
+    for pdf_index, year in enumerate(['令和5年', '令和4年']):
+        pdf_id = save_pdf_record(cursor, f'{pdf_index}.pdf', f'{year}.pdf', f'uploads/{pdf_index}.pdf', None)
+        for number in range(1, 26):
+            cursor.execute(
+                '''INSERT INTO questions (pdf_id, question_text, options, correct_answer, genre, question_number, year)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (pdf_id, f'{year} 問{number}「民法」', json.dumps([f'選択肢{i}' for i in range(1, 5)], ensure_ascii=False),
+                 None if number % 7 == 0 else str(number % 4 + 1), genres[number % 3], number, year)
+            )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_snapshot_round_trip(db_path, tmp_path):
+    """スナップショットから読んだ内容がデータベースから読んだ内容と一致する"""
+    directory = str(tmp_path / 'snapshots')
+    path = build_snapshot(db_path, directory)
+    snapshot = QuestionBankSnapshot(path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    database = DatabaseQuestionBank(cursor)
+
+    assert snapshot.question_count == 50
+    assert snapshot.question_counts() == database.question_counts()
+    assert snapshot.files() == database.files()
+
+    cursor.execute('SELECT id, question_text, correct_answer, genre FROM questions')
+    for question_id, text, answer, genre in cursor.fetchall():
+        question = snapshot.get(question_id)
+        assert (question['question_text'], question['correct_answer'], question['genre']) == (text, answer, genre)
+        assert question['options'] == [f'選択肢{i}' for i in range(1, 5)]
+        assert (question_id in snapshot.pool(genre)) == (answer is not None)
+    assert snapshot.get(10 ** 6) is None
+
+    rng = random.Random(0)
+    for _ in range(20):
+        assert snapshot.random_question('civil_law', rng)['correct_answer'] is not None
+    assert snapshot.random_question('unknown') is None
+
+    # 年度の閲覧は先頭から最後のページまでデータベースと同じ順にたどれる
+    for year in ('令和5年', '令和4年'):
+        key = (1, 0)
+        while key is not None:
+            page = snapshot.exam_page(year, *key, page_size=10)
+            assert page == database.exam_page(year, *key, page_size=10)
+            key = page['next']
+    assert snapshot.exam_page('令和5年', 26)['questions'] == []
+    conn.close()
+    snapshot.close()
+
+
+def test_snapshot_versions(db_path, tmp_path):
+    """内容が変わらなければ作成せず、変わった場合は新しいバージョンに切り替わる"""
+    directory = str(tmp_path / 'snapshots')
+    assert build_snapshot(db_path, directory) is not None
+    assert build_snapshot(db_path, directory) is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('UPDATE questions SET correct_answer = ? WHERE question_number = 7', ('1',))
+    conn.commit()
+    conn.close()
+
+    assert build_snapshot(db_path, directory) is not None
+    snapshot = SnapshotLoader(directory).current()
+    assert snapshot.version == 2
+    assert snapshot.question_counts()['answered'] == 50 - 6 + 2  # 問7・14・21（2年度分）のうち問7に正解を登録
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import init_db
+from question_stats import get_question_counts, get_pdf_counts, rebuild_counts, get_bank_version
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / 'takken_exam.db')
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _snapshot(cursor):
+    return get_question_counts(cursor), get_pdf_counts(cursor)
+
+
+def _add(cursor, pdf_id, genre, year, answer=None):
+    cursor.execute('INSERT INTO questions (pdf_id, question_text, genre, year, correct_answer) VALUES (?, ?, ?, ?, ?)',
+                   (pdf_id, '問題文', genre, year, answer))
+    return cursor.lastrowid
+
+
+def test_count_triggers(conn):
+    """問題の追加・更新・削除のたびに集計が問題テーブルと一致する"""
+    cursor = conn.cursor()
+    first = _add(cursor, 1, 'civil_law', '令和5年', '1')
+    second = _add(cursor, 1, 'civil_law', '令和5年')
+    third = _add(cursor, 2, 'takken_law', '令和4年', '2')
+
+    counts, pdf_counts = _snapshot(cursor)
+    assert counts == {
+        'total': 3, 'answered': 2,
+        'genre': {'civil_law': (2, 1), 'takken_law': (1, 1)},
+        'year': {'令和5年': (2, 1), '令和4年': (1, 1)},
+    }
+    assert pdf_counts == {1: (2, 1), 2: (1, 1)}
+
+    # 正解の登録・ジャンルとPDFの変更
+    cursor.execute("UPDATE questions SET correct_answer = '3' WHERE id = ?", (second,))
+    cursor.execute("UPDATE questions SET genre = 'others', pdf_id = 2 WHERE id = ?", (first,))
+    # 問題文のみの更新では集計は変わらない
+    cursor.execute("UPDATE questions SET question_text = '新しい問題文' WHERE id = ?", (third,))
+    counts, pdf_counts = _snapshot(cursor)
+    assert counts['answered'] == 3
+    assert counts['genre'] == {'civil_law': (1, 1), 'others': (1, 1), 'takken_law': (1, 1)}
+    assert pdf_counts == {1: (1, 1), 2: (2, 2)}
+
+    # 問題がなくなった年度の行は残さない
+    cursor.execute('DELETE FROM questions WHERE id = ?', (third,))
+    counts, pdf_counts = _snapshot(cursor)
+    assert counts['year'] == {'令和5年': (2, 2)}
+    assert pdf_counts == {1: (1, 1), 2: (1, 1)}
+
+    # トリガーで更新した集計は、問題テーブルから集計し直した結果と同じ
+    incremental = _snapshot(cursor)
+    rebuild_counts(cursor)
+    assert _snapshot(cursor) == incremental
+
+
+def test_counts_empty(conn):
+    """問題が1問もない場合も全体の集計は0で返す"""
+    cursor = conn.cursor()
+    assert get_question_counts(cursor) == {'total': 0, 'answered': 0, 'genre': {}, 'year': {}}
+    _add(cursor, 1, 'civil_law', '令和5年', '1')
+    cursor.execute('DELETE FROM questions')
+    assert get_question_counts(cursor) == {'total': 0, 'answered': 0, 'genre': {}, 'year': {}}
+
+
+def test_bank_version(conn):
+    """問題・PDFを変更するたびに問題バンクのバージョンが上がる"""
+    cursor = conn.cursor()
+    version = get_bank_version(cursor)
+    question_id = _add(cursor, 1, 'civil_law', '令和5年')
+    assert get_bank_version(cursor) == version + 1
+    cursor.execute("UPDATE questions SET question_text = '新しい問題文' WHERE id = ?", (question_id,))
+    cursor.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+    assert get_bank_version(cursor) == version + 3
+    cursor.execute("INSERT INTO pdf_files (filename, original_name, file_path) VALUES ('a.pdf', 'a.pdf', 'uploads/a.pdf')")
+    assert get_bank_version(cursor) == version + 4
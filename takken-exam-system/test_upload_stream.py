@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import app
+from upload_stream import UploadStream, InvalidUploadError, FILE_SIGNATURES, SIGNATURE_SEARCH_BYTES
+
+
+def test_signature_split_across_chunks(tmp_path):
+    """シグネチャがチャンクの境界で分かれていても受け付ける"""
+    stream = UploadStream(str(tmp_path), FILE_SIGNATURES['pdf'])
+    stream.write(b'\n%PD')
+    stream.write(b'F-1.4\n' + b'x' * 4096)
+    assert stream.verified
+    stream.commit(str(tmp_path / 'a.pdf'))
+    assert (tmp_path / 'a.pdf').stat().st_size == stream.size
+    assert list(tmp_path.glob('*.part')) == []
+
+
+def test_signature_rejected_while_receiving(tmp_path):
+    """先頭にシグネチャがないファイルは受信の途中で打ち切り、一時ファイルを残さない"""
+    stream = UploadStream(str(tmp_path), FILE_SIGNATURES['pdf'])
+    stream.write(b'x' * (SIGNATURE_SEARCH_BYTES - 1))
+    with pytest.raises(InvalidUploadError):
+        stream.write(b'x' * 1024)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_short_file_rejected_on_commit(tmp_path):
+    """シグネチャを確認できないまま終わった短いファイルは保存しない"""
+    stream = UploadStream(str(tmp_path), FILE_SIGNATURES['pdf'])
+    stream.write(b'not a pdf')
+    with pytest.raises(InvalidUploadError):
+        stream.commit(str(tmp_path / 'a.pdf'))
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('filename, data', [
+    ('exam.pdf', b'MZ' + b'\0' * 4096),   # 拡張子はPDFだが中身が違う
+    ('exam.exe', b'%PDF-1.4\n'),          # 対象外の拡張子
+])
+def test_upload_rejects_invalid_file(tmp_path, monkeypatch, filename, data):
+    """PDFでないアップロードはアップロード画面に戻し、uploads/ に何も残さない"""
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    client = app.test_client()
+    response = client.post('/upload', data={'file': (io.BytesIO(data), filename)}, content_type='multipart/form-data')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/upload')
+    assert list(tmp_path.iterdir()) == []
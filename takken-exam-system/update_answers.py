@@ -3,10 +3,8 @@
 
 import sys
 import os
-import re
 import sqlite3
-import jaconv
-from pdf_processor import EnhancedPDFProcessor
+from pdf_processor import extract_answer_key
 
 # Windows環境での文字エンコーディング設定
 if sys.platform.startswith('win'):
@@ -19,35 +17,10 @@ def extract_answer_key_from_pdf(pdf_path):
         print(f"PDFファイルが見つかりません: {pdf_path}")
         return {}
     
-    # 最終ページのテキストを抽出
-    import fitz  # PyMuPDF
-    doc = fitz.open(pdf_path)
-    last_page_num = len(doc) - 1
-    last_page = doc[last_page_num]
-    last_page_text = last_page.get_text()
-    doc.close()
-    
     print(f"=== {pdf_path} から正解を抽出中 ===")
     
-    # 正解パターンを検索（表形式に対応）
-    answer_patterns = [
-        # (1) １ や (1) 1 のような括弧付き番号形式
-        r'\((\d+)\)\s*([1-4１-４])',
-    ]
-    
-    answers = {}
-    
-    for pattern in answer_patterns:
-        matches = re.findall(pattern, last_page_text, re.MULTILINE)
-        if matches:
-            print(f"パターン '{pattern}' で {len(matches)} 件の正解を発見")
-            for match in matches:
-                question_num = int(match[0])
-                answer = match[1]
-                # 全角数字を半角に変換
-                answer = jaconv.z2h(answer, digit=True)
-                answers[question_num] = answer
-            break
+    # 最終ページのみを読む（テキストがない場合は正解表の範囲のみをOCR）
+    answers = extract_answer_key(pdf_path)
     
     print(f"抽出された正解数: {len(answers)}")
     return answers
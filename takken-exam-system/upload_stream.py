@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ストリーミングアップロードモジュール
+アップロード中のファイルをチャンク単位でディスクに書き込み、同時にハッシュ計算とファイル形式の検証を行います
+"""
+
+import os
+import hashlib
+import tempfile
+from typing import Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import UnsupportedMediaType
+
+# 拡張子ごとのファイル先頭のシグネチャ
+FILE_SIGNATURES = {
+    'pdf': b'%PDF-',
+    'zip': b'PK\x03\x04',
+}
+
+# シグネチャを探す範囲（PDFは先頭1024バイト以内にヘッダーがあればよい）
+SIGNATURE_SEARCH_BYTES = 1024
+
+
+class InvalidUploadError(UnsupportedMediaType):
+    """アップロードされたファイルの形式が拡張子と一致しない"""
+
+    description = 'アップロードされたファイルの形式が正しくありません'
+
+
+class UploadStream:
+    """
+    アップロード中のファイルを一時ファイルに直接書き込むストリーム
+
+    書き込みと同時にSHA-256を計算し、先頭のシグネチャが拡張子と一致しない場合は
+    受信の途中でも InvalidUploadError を送出して書き込みを中止します。
+    メモリ使用量はファイルサイズによらずチャンク1つ分です。
+    """
+
+    def __init__(self, directory: str, signature: bytes):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._signature = signature
+        self._head = b''
+        self._verified = False
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data: bytes) -> int:
+        if not self._verified:
+            self._check_signature(data)
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def _check_signature(self, data: bytes):
+        """先頭部分にシグネチャがあるかを確認"""
+        self._head += data[:SIGNATURE_SEARCH_BYTES - len(self._head)]
+        if self._signature in self._head:
+            self._verified = True
+        elif len(self._head) >= SIGNATURE_SEARCH_BYTES:
+            self.discard()
+            raise InvalidUploadError()
+
+    @property
+    def verified(self) -> bool:
+        """シグネチャの確認が済んでいるかどうか"""
+        return self._verified
+
+    @property
+    def content_hash(self) -> str:
+        """書き込んだ内容のSHA-256（16進数）"""
+        return self._hash.hexdigest()
+
+    def commit(self, file_path: str):
+        """一時ファイルを保存先に移動"""
+        if not self._verified:
+            self.discard()
+            raise InvalidUploadError()
+        self._file.close()
+        os.replace(self.temp_path, file_path)
+        self.committed = True
+
+    def discard(self):
+        """一時ファイルを削除"""
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    # FileStorage から使われるファイルオブジェクトのメソッドは一時ファイルに委譲する
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def signature_for(filename: Optional[str]) -> Optional[bytes]:
+    """ファイル名の拡張子から期待するシグネチャを返す（対象外の拡張子はNone）"""
+    if not filename or '.' not in filename:
+        return None
+    return FILE_SIGNATURES.get(filename.rsplit('.', 1)[1].lower())
+
+
+class StreamingUploadRequest(Request):
+    """ファイルパートを UploadStream に直接書き込むリクエストクラス"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        signature = signature_for(filename)
+        if signature is None:
+            if not filename:
+                # ファイル未選択の空パート
+                return tempfile.SpooledTemporaryFile(max_size=1024)
+            raise InvalidUploadError()
+
+        stream = UploadStream(current_app.config['UPLOAD_FOLDER'], signature)
+        self.__dict__.setdefault('upload_streams', []).append(stream)
+        return stream
+
+    def discard_uncommitted_uploads(self):
+        """保存されなかったアップロードの一時ファイルを削除（リクエスト終了時に呼び出す）"""
+        for stream in self.__dict__.get('upload_streams', []):
+            if not stream.committed:
+                stream.discard()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本番環境用のWSGIエントリーポイント
+
+Linux/macOS:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Windows（gunicornは非対応のため waitress を使用）:
+    python wsgi.py
+"""
+
+import os
+
+from app import create_app
+
+application = create_app()
+
+if __name__ == '__main__':
+    from waitress import serve
+
+    serve(
+        application,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        threads=int(os.environ.get('WEB_THREADS', 8)),
+    )